@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+"""
+AssetCache class - fonts and icons of the weather clock, loaded once
+Parsing arial.ttf (about 1 MB) and decoding an icon PNG for every widget update adds
+up to dozens of loads per minute with MQTT driven widgets. The cache loads every font
+size and every icon (converted to RGBA) once and hands out the same objects afterwards.
+Cached images are shared: callers may paste or crop them, but must not draw into or
+close them.
+
+GlyphAtlas renders the big digit strings (125 pt clock and temperature) from glyph masks
+rasterized once, instead of running FreeType for the whole string on every update.
+It only uses PIL - the atlas is built before the window is shown, NumPy is loaded later.
+"""
+import os
+import glob
+import math
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+# Characters of the clock and temperature strings
+GLYPH_CHARSET = "0123456789:-."
+
+
+# ---------- AssetCache class ----------
+class AssetCache:
+    def __init__(self, base_dir, font_file='arial.ttf', icon_dir='Icons'):
+        """Initialize an empty cache (see preload)
+
+        Args:
+            base_dir: Directory of the weather clock script
+            font_file: Default TrueType font, relative to base_dir
+            icon_dir: Icon directory, relative to base_dir
+        """
+        self.base_dir = base_dir
+        self.font_file = font_file
+        self.icon_dir = os.path.join(base_dir, icon_dir)
+        self._fonts = {}   # (font file, size) -> FreeTypeFont
+        self._icons = {}   # icon name (file name without .png) -> RGBA image
+        self._atlases = {}  # (font file, size, charset) -> GlyphAtlas
+        self.stats = {'font_hits': 0, 'font_misses': 0, 'icon_hits': 0, 'icon_misses': 0}
+
+    def preload(self, font_sizes=(), icons=None, atlas_sizes=()):
+        """Load fonts and icons ahead of the first widget update.
+
+        Args:
+            font_sizes: Sizes of the default font to load
+            icons: Icon names to load, None = every PNG in the icon directory
+            atlas_sizes: Font sizes to build a digit GlyphAtlas for
+        """
+        for size in font_sizes:
+            self.font(size)
+        for size in atlas_sizes:
+            self.atlas(size)
+        if icons is None:
+            icons = sorted(os.path.splitext(os.path.basename(path))[0]
+                           for path in glob.glob(os.path.join(self.icon_dir, '*.png')))
+        for name in icons:
+            self.icon(name)
+        # Counters should only show what happened after startup
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def font(self, size, font_file=None):
+        """Return the font in the given size, parsing the font file only on first use."""
+        key = (font_file or self.font_file, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            self.stats['font_hits'] += 1
+            return font
+        self.stats['font_misses'] += 1
+        font = ImageFont.truetype(os.path.join(self.base_dir, key[0]), size)
+        self._fonts[key] = font
+        return font
+
+    def icon(self, name):
+        """Return an icon as shared RGBA image, e.g. icon('clear-day-big').
+
+        Returns:
+            PIL.Image or None if the icon file does not exist
+        """
+        icon = self._icons.get(name)
+        if icon is not None:
+            self.stats['icon_hits'] += 1
+            return icon
+        self.stats['icon_misses'] += 1
+        try:
+            with Image.open(os.path.join(self.icon_dir, name + '.png')) as image:
+                icon = image.convert('RGBA')
+        except OSError as e:
+            print(f"Could not load icon {name}: {e}")
+            return None
+        self._icons[name] = icon
+        return icon
+
+    def atlas(self, size, font_file=None, charset=GLYPH_CHARSET):
+        """Return the GlyphAtlas of the font in the given size, rasterizing it on first use."""
+        key = (font_file or self.font_file, size, charset)
+        atlas = self._atlases.get(key)
+        if atlas is None:
+            atlas = GlyphAtlas(self.font(size, font_file), charset)
+            self._atlases[key] = atlas
+        return atlas
+
+    def report(self):
+        """Return a one-line summary of the cache counters."""
+        return (f"Asset cache: {len(self._fonts)} fonts, {len(self._icons)} icons, "
+                f"{len(self._atlases)} glyph atlases, "
+                f"font hits/misses {self.stats['font_hits']}/{self.stats['font_misses']}, "
+                f"icon hits/misses {self.stats['icon_hits']}/{self.stats['icon_misses']}")
+
+
+# ---------- GlyphAtlas class ----------
+class GlyphAtlas:
+    def __init__(self, font, charset=GLYPH_CHARSET):
+        """Rasterize the glyphs of charset once into a sprite sheet (8 bit coverage masks)
+
+        Args:
+            font: PIL FreeTypeFont
+            charset: Characters to pre-render, strings with other characters fall back to draw.text
+        """
+        self.font = font
+        self.charset = charset
+        self.stats = {'atlas': 0, 'fallback': 0}
+        self._colors = {}  # (image mode, fill, size) -> solid block of the text color
+
+        masks = {}
+        for char in charset:
+            mask, (left, top) = font.getmask2(char, mode='L')
+            masks[char] = (Image.frombytes('L', mask.size, bytes(mask)), left, top)
+
+        # One sheet, all glyphs side by side on a common baseline; row 0 = highest glyph top
+        self.top = min(top for _, _, top in masks.values())
+        height = max(top + pixels.height for pixels, _, top in masks.values()) - self.top
+        self.sheet = Image.new('L', (sum(pixels.width for pixels, _, _ in masks.values()), height), 0)
+        self._glyphs = {}  # char -> (sheet x, width, left bearing, advance)
+        sheet_x = 0
+        for char, (pixels, left, top) in masks.items():
+            self.sheet.paste(pixels, (sheet_x, top - self.top))
+            self._glyphs[char] = (sheet_x, pixels.width, left, font.getlength(char))
+            sheet_x += pixels.width
+        # Full height strips of the sheet, ready to paste
+        self._strips = {char: self.sheet.crop((sheet_x, 0, sheet_x + width, height))
+                        for char, (sheet_x, width, _, _) in self._glyphs.items()}
+
+        # Pair kerning in pixels, as FreeType applies it when laying out the whole string
+        self._kerning = {}
+        for first in charset:
+            for second in charset:
+                kerning = (font.getlength(first + second) - self._glyphs[first][3]
+                           - self._glyphs[second][3])
+                if kerning:
+                    self._kerning[(first, second)] = kerning
+
+    def render(self, text):
+        """Compose the coverage mask of a string from the sheet.
+
+        Returns:
+            tuple: (mask as PIL 'L' image, (x, y) offset of the mask from the text origin),
+                   None if text contains characters outside the charset
+        """
+        glyphs = self._glyphs
+        placed = []
+        pen = 0.0
+        previous = None
+        for char in text:
+            glyph = glyphs.get(char)
+            if glyph is None:
+                return None
+            if previous is not None:
+                pen += self._kerning.get((previous, char), 0.0)
+            # Pen positions are 26.6 fixed point, FreeType rounds them to whole pixels
+            placed.append((math.floor(pen + 0.5) + glyph[2], char, glyph[1]))
+            pen += glyph[3]
+            previous = char
+        if not placed:
+            return None
+
+        left = min(x for x, _, _ in placed)
+        right = max(x + width for x, _, width in placed)
+        height = self.sheet.height
+        mask = Image.new('L', (right - left, height), 0)
+        filled = 0  # Right edge of the glyphs drawn so far
+        for x, char, width in placed:
+            box = (x - left, 0, x - left + width, height)
+            strip = self._strips[char]
+            if box[0] < filled:
+                # Overlapping glyphs keep the higher coverage, like FreeType's string bitmap
+                strip = ImageChops.lighter(mask.crop(box), strip)
+            mask.paste(strip, box)
+            filled = max(filled, box[2])
+        return mask, (left, self.top)
+
+    def draw_text(self, image, xy, text, fill):
+        """Drop-in for ImageDraw.Draw(image).text(xy, text, font=font, fill=fill), identical pixels.
+
+        Args:
+            image: Target PIL image
+            xy: Text origin (top left, integer pixels)
+            text: String to draw
+            fill: Text color
+        """
+        rendered = self.render(text)
+        if rendered is None:
+            self.stats['fallback'] += 1
+            ImageDraw.Draw(image).text(xy, text, font=self.font, fill=fill)
+            return
+        self.stats['atlas'] += 1
+        mask, (dx, dy) = rendered
+        # Pasting a block of the color through the mask blends exactly like draw.text,
+        # but is about three times faster than filling through the mask
+        key = (image.mode, fill, mask.size)
+        color = self._colors.get(key)
+        if color is None:
+            if len(self._colors) >= 64:
+                self._colors.clear()  # A handful of colors and string widths are in use
+            color = Image.new(image.mode, mask.size, fill)
+            self._colors[key] = color
+        image.paste(color, (xy[0] + dx, xy[1] + dy), mask)
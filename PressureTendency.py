@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+PressureTendency class - air pressure tendency of the last 3 hours, updated per sample
+The last 3 hours are split into three sliding 1 hour windows (WMO: the tendency of the
+3 hours before the observation). Every window keeps the running sums of a linear
+regression (n, sum t, sum p, sum t*p, sum t*t); a new sample is added to the newest
+window and samples older than the window start move on to the next older window,
+so each sample is added and removed three times - O(1) per sample, no list of readings
+is walked again. The slopes (hPa per hour) are classified as falling, steady or rising
+and a 3x3x3 table gives the tendency icon (WMO pressure characteristic, icons 0-8).
+"""
+import math
+from collections import deque
+
+# Icon for the (oldest, middle, newest) window: 0 = falling, 1 = steady, 2 = rising
+TENDENCY_ICONS = (
+    (("pressure_tendency_7", "pressure_tendency_6", "pressure_tendency_5"),
+     ("pressure_tendency_7", "pressure_tendency_4", "pressure_tendency_4"),
+     ("pressure_tendency_7", "pressure_tendency_4", "pressure_tendency_3")),
+    (("pressure_tendency_8", "pressure_tendency_4", "pressure_tendency_4"),
+     ("pressure_tendency_4", "pressure_tendency_4", "pressure_tendency_4"),
+     ("pressure_tendency_4", "pressure_tendency_4", "pressure_tendency_3")),
+    (("pressure_tendency_8", "pressure_tendency_4", "pressure_tendency_2"),
+     ("pressure_tendency_4", "pressure_tendency_4", "pressure_tendency_2"),
+     ("pressure_tendency_0", "pressure_tendency_1", "pressure_tendency_2")),
+)
+STEADY_ICON = "pressure_tendency_4"  # Shown until all windows hold enough samples
+
+REBASE_INTERVAL = 86400  # Seconds after which the sums are recomputed around a new time origin
+
+
+# ---------- PressureTendency class ----------
+class PressureTendency:
+    def __init__(self, window=3600, windows=3, threshold=0.6):
+        """Initialize empty windows
+
+        Args:
+            window: Window length in seconds
+            windows: Number of windows (the tendency covers window * windows seconds)
+            threshold: Slope in hPa per hour above which the pressure counts as rising
+                       (below -threshold as falling)
+        """
+        self.window = window
+        self.threshold = threshold
+        self._samples = [deque() for _ in range(windows)]  # (time, pressure), oldest window first
+        self._sums = [[0, 0.0, 0.0, 0.0, 0.0] for _ in range(windows)]  # n, st, sp, stp, stt
+        self._origin = None  # Time origin of the sums (hours relative to it keep them small)
+        self._last = None
+
+    def append(self, pressure, when):
+        """Add a sample (O(1) amortized).
+
+        Args:
+            pressure: Pressure in hPa
+            when: Epoch seconds, samples older than the newest one are ignored
+
+        Returns:
+            bool: False if the sample was ignored (out of order, NaN or infinite)
+        """
+        if not math.isfinite(pressure) or (self._last is not None and when < self._last):
+            return False  # One NaN in the sums would spoil every slope until the next rebase
+        self._last = when
+        if self._origin is None or when - self._origin > REBASE_INTERVAL:
+            self._rebase(when)
+        self._add(len(self._samples) - 1, when, pressure)
+
+        # Slide: samples leave each window at its start and enter the next older one
+        start = when - self.window
+        for index in range(len(self._samples) - 1, -1, -1):
+            samples = self._samples[index]
+            while samples and samples[0][0] <= start:
+                sample_time, sample_pressure = samples.popleft()
+                self._add(index, sample_time, sample_pressure, -1)
+                if index > 0:
+                    self._add(index - 1, sample_time, sample_pressure)
+            start -= self.window
+        return True
+
+    def _add(self, index, when, pressure, sign=1):
+        if sign > 0:
+            self._samples[index].append((when, pressure))
+        t = (when - self._origin) / 3600.0
+        sums = self._sums[index]
+        sums[0] += sign
+        sums[1] += sign * t
+        sums[2] += sign * pressure
+        sums[3] += sign * t * pressure
+        sums[4] += sign * t * t
+
+    def _rebase(self, origin):
+        """Recompute the sums around a new origin (bounds rounding drift, once a day)."""
+        self._origin = origin
+        for index, samples in enumerate(self._samples):
+            self._sums[index] = [0, 0.0, 0.0, 0.0, 0.0]
+            old, self._samples[index] = samples, deque()
+            for when, pressure in old:
+                self._add(index, when, pressure)
+
+    def slopes(self):
+        """Regression slope of every window in hPa per hour, oldest first (None = too few samples)."""
+        slopes = []
+        for n, st, sp, stp, stt in self._sums:
+            denominator = n * stt - st * st
+            # Nearly identical times: no usable slope
+            slopes.append((n * stp - st * sp) / denominator if n >= 2 and denominator > 1e-9 else None)
+        return slopes
+
+    def classes(self):
+        """Window classes, 0 = falling, 1 = steady, 2 = rising (None = too few samples)."""
+        return [None if slope is None else 0 if slope <= -self.threshold else 1 if slope <= self.threshold else 2
+                for slope in self.slopes()]
+
+    def icon(self):
+        """Name of the tendency icon (3 windows: TENDENCY_ICONS, otherwise STEADY_ICON)."""
+        classes = self.classes()
+        if len(classes) != 3 or None in classes:
+            return STEADY_ICON
+        return TENDENCY_ICONS[classes[0]][classes[1]][classes[2]]
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+
+"""
+RadarArchive class - compressed on-disk archive of processed radar crops
+Every processed area-of-interest crop (raw counts plus gain/offset and timestamp)
+is appended to a single data file, each frame compressed on its own. A small
+fixed-size index maps frame times to file offsets, so any frame can be read back
+with one seek and one decompress for replay or analysis. Retention rules thin out
+old frames (e.g. hourly maxima after 7 days) in a compaction job that runs on a
+background thread.
+"""
+import os
+import json
+import zlib
+import time
+import struct
+import bisect
+import threading
+import numpy as np
+from datetime import datetime, timezone
+
+
+# Record in the data file: header, JSON metadata, zlib compressed raw counts
+RECORD_MAGIC = b'RFRM'
+RECORD_HEADER = struct.Struct('<4sII')   # magic, metadata length, payload length
+
+# Index record: frame time (epoch seconds), record offset, record length,
+# aggregation interval in seconds (0 = original frame)
+INDEX_RECORD = struct.Struct('<qqqq')
+
+# Default retention: everything for 7 days, hourly maxima up to 90 days, older frames are removed
+# Each rule is (maximum age in seconds, aggregation interval in seconds, 0 = keep every frame)
+DEFAULT_RETENTION = ((7 * 86400, 0), (90 * 86400, 3600))
+
+
+# ---------- RadarArchive class ----------
+class RadarArchive:
+    DATA_FILENAME = 'frames.dat'
+    INDEX_FILENAME = 'frames.idx'
+
+    def __init__(self, directory='radar_archive', retention=DEFAULT_RETENTION, compression_level=6,
+                 read_only=False):
+        """Open (or create) an archive directory
+
+        Args:
+            directory: Directory holding the data and index file
+            retention: Tuple of (max_age_seconds, interval_seconds) rules sorted by age,
+                       frames older than the last rule are removed
+            compression_level: zlib level used for new frames (1 = fastest, 9 = smallest)
+            read_only: Only read frames, e.g. from a tool while the weather clock keeps appending
+                       (a compaction by the writer does not disturb the open data file)
+        """
+        self.directory = directory
+        self.retention = tuple(retention)
+        self.compression_level = compression_level
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, self.DATA_FILENAME)
+        self.index_path = os.path.join(directory, self.INDEX_FILENAME)
+
+        # Appends, reads and the final file swap of a compaction are serialized by this lock
+        self._lock = threading.Lock()
+        self._entries = []   # Sorted list of (time, offset, length, interval) tuples
+        self._data_file = None
+        self._index_file = None
+        self._open()
+
+        self._compaction_thread = None
+        self._compaction_stop = threading.Event()
+        self.stats = {'frames_appended': 0, 'frames_read': 0, 'compactions': 0,
+                      'frames_removed': 0, 'frames_aggregated': 0}
+
+    def _open(self):
+        """Open the files and load the index, dropping entries of an interrupted append."""
+        if self.read_only:
+            self._data_file = open(self.data_path, 'rb')
+            with open(self.index_path, 'rb') as f:
+                index_bytes = f.read()
+            usable = len(index_bytes) - len(index_bytes) % INDEX_RECORD.size
+            self._entries = sorted(INDEX_RECORD.iter_unpack(index_bytes[:usable]))
+            return
+
+        # Recover from an interrupted compaction
+        data_tmp = self.data_path + '.compact'
+        index_tmp = self.index_path + '.compact'
+        if os.path.exists(index_tmp):
+            if os.path.exists(data_tmp):
+                os.remove(data_tmp)     # Not swapped yet, the old files are still complete
+                os.remove(index_tmp)
+            else:
+                os.replace(index_tmp, self.index_path)  # New data file is in place, finish the swap
+        elif os.path.exists(data_tmp):
+            os.remove(data_tmp)
+        self._data_file = open(self.data_path, 'a+b')
+        self._data_file.seek(0, os.SEEK_END)
+        data_size = self._data_file.tell()
+
+        entries = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                index_bytes = f.read()
+            usable = len(index_bytes) - len(index_bytes) % INDEX_RECORD.size
+            for entry in INDEX_RECORD.iter_unpack(index_bytes[:usable]):
+                if entry[1] + entry[2] <= data_size:  # Record completely written
+                    entries.append(entry)
+            if len(entries) * INDEX_RECORD.size != len(index_bytes):
+                # Rewrite the index without the broken tail
+                with open(self.index_path, 'wb') as f:
+                    f.write(b''.join(INDEX_RECORD.pack(*entry) for entry in entries))
+        entries.sort()
+        self._entries = entries
+        self._index_file = open(self.index_path, 'ab')
+
+    def _close_files(self):
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+    @staticmethod
+    def _encode_record(meta, raw_data, compression_level):
+        """Build a data file record from metadata and a raw count array."""
+        raw_data = np.ascontiguousarray(raw_data)
+        meta = dict(meta, dtype=raw_data.dtype.str, shape=list(raw_data.shape))
+        meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+        payload = zlib.compress(raw_data.tobytes(), compression_level)
+        return RECORD_HEADER.pack(RECORD_MAGIC, len(meta_bytes), len(payload)) + meta_bytes + payload
+
+    @staticmethod
+    def _decode_record(record):
+        """Split a data file record into (metadata dict, raw count array)."""
+        magic, meta_length, payload_length = RECORD_HEADER.unpack_from(record)
+        if magic != RECORD_MAGIC:
+            raise ValueError("Corrupt radar archive record")
+        start = RECORD_HEADER.size
+        meta = json.loads(record[start:start + meta_length].decode('utf-8'))
+        start += meta_length
+        payload = zlib.decompress(record[start:start + payload_length])
+        raw_data = np.frombuffer(payload, dtype=np.dtype(meta['dtype'])).reshape(meta['shape'])
+        return meta, raw_data
+
+    @staticmethod
+    def _epoch(when):
+        """Epoch seconds of a datetime (naive values are taken as UTC) or a number."""
+        if isinstance(when, datetime):
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+            return int(when.timestamp())
+        return int(when)
+
+    def append(self, data_time, raw_data, meta):
+        """Append one processed crop. A frame whose time is already archived is ignored.
+
+        Args:
+            data_time: Nominal composite time (UTC datetime)
+            raw_data: Cropped raw counts (2-D integer array)
+            meta: JSON-serializable dict with everything needed to process the counts again
+                  (gain, offset, nodata, undetect, crop offsets, grid geometry)
+
+        Returns:
+            bool: True if the frame was stored
+        """
+        epoch = self._epoch(data_time)
+        record = self._encode_record(meta, raw_data, self.compression_level)  # Compress outside the lock
+        with self._lock:
+            if self._data_file is None or self.read_only:
+                return False
+            position = bisect.bisect_left(self._entries, (epoch,))
+            if position < len(self._entries) and self._entries[position][0] == epoch:
+                return False  # Same composite loaded again (e.g. after a restart)
+            self._data_file.seek(0, os.SEEK_END)
+            offset = self._data_file.tell()
+            # Data first, then the index entry - an interrupted append leaves no dangling entry
+            self._data_file.write(record)
+            self._data_file.flush()
+            entry = (epoch, offset, len(record), 0)
+            self._index_file.write(INDEX_RECORD.pack(*entry))
+            self._index_file.flush()
+            if not self._entries or epoch > self._entries[-1][0]:
+                self._entries.append(entry)
+            else:
+                bisect.insort(self._entries, entry)
+            self.stats['frames_appended'] += 1
+        return True
+
+    def times(self, start=None, end=None):
+        """Return the times of all archived frames in [start, end] as UTC datetimes."""
+        with self._lock:
+            epochs = [entry[0] for entry in self._entries]
+        low = bisect.bisect_left(epochs, self._epoch(start)) if start is not None else 0
+        high = bisect.bisect_right(epochs, self._epoch(end)) if end is not None else len(epochs)
+        return [datetime.fromtimestamp(epoch, tz=timezone.utc) for epoch in epochs[low:high]]
+
+    def get_frame(self, when, exact=False):
+        """Read the frame at the given time (or the newest one before it).
+
+        Args:
+            when: UTC datetime or epoch seconds
+            exact: If True, only a frame with exactly this time is returned
+
+        Returns:
+            dict: {'time': datetime, 'raw_data': array, 'meta': dict,
+                   'interval': aggregation interval in seconds (0 = original frame)}
+            or None if there is no such frame
+        """
+        epoch = self._epoch(when)
+        with self._lock:
+            position = bisect.bisect_right(self._entries, (epoch, float('inf'))) - 1
+            if position < 0 or self._data_file is None:
+                return None
+            entry = self._entries[position]
+            if exact and entry[0] != epoch:
+                return None
+            # One seek and one read per frame
+            self._data_file.seek(entry[1])
+            record = self._data_file.read(entry[2])
+            self.stats['frames_read'] += 1
+        meta, raw_data = self._decode_record(record)  # Decompress outside the lock
+        return {'time': datetime.fromtimestamp(entry[0], tz=timezone.utc), 'raw_data': raw_data,
+                'meta': meta, 'interval': entry[3]}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _plan_compaction(self, entries, now):
+        """Decide what happens to every entry under the retention rules.
+
+        Returns:
+            list: Sorted output items, each ('copy', entry) or ('aggregate', time, interval, entries)
+            int: Number of removed frames
+        """
+        plan = []
+        removed = 0
+        groups = {}   # (interval, bucket start) -> entries
+        copies = []   # Entries already at the resolution of their rule or coarser
+        for entry in entries:
+            age = now - entry[0]
+            rule = next((r for r in self.retention if age <= r[0]), None)
+            if rule is None:
+                removed += 1
+                continue
+            interval = rule[1]
+            if interval <= entry[3]:
+                copies.append(entry)
+            else:
+                bucket = entry[0] - entry[0] % interval
+                groups.setdefault((interval, bucket), []).append(entry)
+        for entry in copies:
+            # An hour straddling a rule boundary is aggregated in several runs: merge the
+            # earlier aggregate of the bucket into the new one, so each bucket keeps one entry
+            key = (entry[3], entry[0])
+            if entry[3] and key in groups:
+                groups[key].append(entry)
+            else:
+                plan.append((entry[0], ('copy', entry)))
+        for (interval, bucket), members in groups.items():
+            plan.append((bucket, ('aggregate', bucket, interval, members)))
+        plan.sort(key=lambda item: item[0])
+        return [item for _, item in plan], removed
+
+    def _aggregate(self, reader, members):
+        """Maximum of the raw counts of several frames, grouped by crop geometry.
+
+        Returns:
+            list: (meta, raw_data) per geometry found in the group
+        """
+        results = {}
+        for entry in members:
+            reader.seek(entry[1])
+            meta, raw_data = self._decode_record(reader.read(entry[2]))
+            geometry = json.dumps({k: v for k, v in meta.items() if k != 'time'}, sort_keys=True)
+            nodata = raw_data.dtype.type(meta['nodata'])
+            if geometry not in results:
+                results[geometry] = (meta, raw_data.copy())
+                continue
+            maximum = results[geometry][1]
+            # No-data never wins against a measured value, counts grow with the reflectivity (gain > 0)
+            both_valid = (maximum != nodata) & (raw_data != nodata)
+            np.maximum(maximum, raw_data, out=maximum, where=both_valid)
+            np.copyto(maximum, raw_data, where=(maximum == nodata))
+        return list(results.values())
+
+    def compact(self, now=None):
+        """Apply the retention rules and rewrite the archive.
+
+        The new files are written without holding the lock, so appends and reads continue
+        meanwhile; frames appended during the rewrite are carried over before the swap.
+
+        Args:
+            now: Reference time (UTC datetime or epoch seconds), default current time
+
+        Returns:
+            dict: {'kept': n, 'aggregated': n, 'removed': n} frame counts
+        """
+        if self.read_only:
+            raise ValueError("Radar archive opened read-only")
+        now = self._epoch(now) if now is not None else int(time.time())
+        with self._lock:
+            snapshot = list(self._entries)
+        plan, removed = self._plan_compaction(snapshot, now)
+        result = {'kept': 0, 'aggregated': 0, 'removed': removed}
+        if removed == 0 and all(item[0] == 'copy' for item in plan):
+            return result  # Nothing to do
+
+        data_tmp = self.data_path + '.compact'
+        index_tmp = self.index_path + '.compact'
+        new_entries = []
+        with open(self.data_path, 'rb') as reader, open(data_tmp, 'wb') as data_out:
+            for item in plan:
+                if item[0] == 'copy':
+                    entry = item[1]
+                    reader.seek(entry[1])
+                    records = [(entry[0], entry[3], reader.read(entry[2]))]
+                    result['kept'] += 1
+                else:
+                    _, bucket, interval, members = item
+                    bucket_time = datetime.fromtimestamp(bucket, tz=timezone.utc).isoformat()
+                    records = [(bucket, interval,
+                                self._encode_record(dict(meta, time=bucket_time), raw_data,
+                                                    self.compression_level))
+                               for meta, raw_data in self._aggregate(reader, members)]
+                    result['aggregated'] += len(members)
+                for epoch, interval, record in records:
+                    new_entries.append((epoch, data_out.tell(), len(record), interval))
+                    data_out.write(record)
+
+            with self._lock:
+                # Carry over frames appended while the new file was written
+                known = set(snapshot)
+                for entry in self._entries:
+                    if entry not in known:
+                        reader.seek(entry[1])
+                        record = reader.read(entry[2])
+                        new_entries.append((entry[0], data_out.tell(), entry[2], entry[3]))
+                        data_out.write(record)
+                data_out.flush()
+                os.fsync(data_out.fileno())
+                new_entries.sort()
+                with open(index_tmp, 'wb') as index_out:
+                    index_out.write(b''.join(INDEX_RECORD.pack(*entry) for entry in new_entries))
+                    index_out.flush()
+                    os.fsync(index_out.fileno())
+                self._close_files()
+                # Data file first - _open() finishes the index swap if a crash happens in between
+                os.replace(data_tmp, self.data_path)
+                os.replace(index_tmp, self.index_path)
+                self._open()
+                self.stats['compactions'] += 1
+                self.stats['frames_removed'] += result['removed']
+                self.stats['frames_aggregated'] += result['aggregated']
+        return result
+
+    def start_compaction(self, interval=3600):
+        """Run compact() every interval seconds on a background thread."""
+        if self._compaction_thread is not None:
+            return
+
+        def run():
+            while not self._compaction_stop.wait(interval):
+                try:
+                    result = self.compact()
+                    if result['removed'] or result['aggregated']:
+                        print(f"Radar archive compacted: {result['aggregated']} frames aggregated, "
+                              f"{result['removed']} removed")
+                except Exception as e:
+                    print(f"Radar archive compaction failed: {e}")
+
+        self._compaction_stop.clear()
+        self._compaction_thread = threading.Thread(target=run, name='RadarArchiveCompaction', daemon=True)
+        self._compaction_thread.start()
+
+    def close(self):
+        """Stop the compaction thread and close the files."""
+        if self._compaction_thread is not None:
+            self._compaction_stop.set()
+            self._compaction_thread.join(timeout=60)
+            self._compaction_thread = None
+        with self._lock:
+            self._close_files()
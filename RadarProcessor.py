@@ -3,31 +3,74 @@
 """
 RadarProcessor class for DWD radar data processing and visualization
 Requires pyproj for accurate coordinate transformations
+
+Heavy modules are imported where they are first needed, so importing this module
+(and opening the weather clock window) stays fast: h5py on the first HDF5 read,
+requests on the first download, pyproj on the first projection and matplotlib on
+the first background/city layer render.
 """
-import requests
-import h5py
 import numpy as np
 import os
 import io
 import math
+import hashlib
 import gc
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from PIL import Image
-
-# Use non-GUI backend to avoid display errors on headless systems / Pi
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from matplotlib.colors import ListedColormap, LinearSegmentedColormap, BoundaryNorm
+from RadarArchive import RadarArchive
 
 # ---------- RadarProcessor class ----------
 class RadarProcessor:
+    # Meteorological color scheme (dBZ reflectivity scale)
+    # Standard weather radar colors from light blue (weak) to magenta (extreme)
+    DBZ_BOUNDARIES = [0, 1, 5.5, 10, 14.5, 19, 23.5, 28, 32.5, 37, 41.5, 46, 50.5, 55, 60, 65, 75, 85]
+    DBZ_COLORS = [
+        '#99ffff00',  # 0-1 dBZ: Transparent (very light precipitation)
+        '#99ffff',    # 1-5.5 dBZ: Light blue (drizzle)
+        '#33ffff',    # 5.5-10 dBZ: Cyan (light rain)
+        '#00caca',    # 10-14.5 dBZ: Teal (light-moderate rain)
+        '#009934',    # 14.5-19 dBZ: Green (moderate rain)
+        '#4dbf1a',    # 19-23.5 dBZ: Light green (moderate-heavy rain)
+        '#99cc00',    # 23.5-28 dBZ: Yellow-green (heavy rain)
+        '#cce600',    # 28-32.5 dBZ: Yellow (very heavy rain)
+        '#ffff00',    # 32.5-37 dBZ: Bright yellow (intense rain)
+        '#ffc400',    # 37-41.5 dBZ: Orange-yellow (very intense)
+        '#ff8900',    # 41.5-46 dBZ: Orange (severe rain/small hail)
+        '#ff0000',    # 46-50.5 dBZ: Red (severe weather)
+        '#b40000',    # 50.5-55 dBZ: Dark red (large hail)
+        '#4848ff',    # 55-60 dBZ: Blue (very large hail)
+        '#0000ca',    # 60-65 dBZ: Dark blue (giant hail)
+        '#990099',    # 65-75 dBZ: Purple (extreme hail)
+        '#ff33ff'     # 75+ dBZ: Magenta (tornado/extreme weather)
+    ]
+    OVERLAY_ALPHA = 0.7  # Semi-transparent radar overlay
+    
+    # Render presets trading quality for speed (see set_render_preset and benchmark.py presets)
+    #   blur:          'none', 'box' (uniform kernel approximating the Gaussian) or 'gaussian'
+    #   interpolation: 'nearest' (radar cell lookup) or 'bilinear'
+    #   supersample:   2 = colorize 2x2 sub-pixels and average them (smooth color class edges)
+    RENDER_PRESETS = {
+        'fast':     {'blur': 'none',     'interpolation': 'nearest',  'supersample': 1},
+        'balanced': {'blur': 'box',      'interpolation': 'bilinear', 'supersample': 1},
+        'quality':  {'blur': 'gaussian', 'interpolation': 'bilinear', 'supersample': 2},
+    }
+    
     def __init__(self, satellite_source='simple', zoom_level=11,
                  center_lon=8.862, center_lat=48.806,
                  image_width_pixels=512, image_height_pixels=512,
-                 cities=None):
+                 cities=None, render_workers=None, render_preset='quality',
+                 archive_dir=None):
         """Initialize the radar processor with configurable parameters
         
         Requires pyproj for accurate coordinate transformations.
+        render_workers sets the number of threads for blur/colorize/composite
+        (None = number of CPU cores, at most 4; 1 = single-threaded).
+        render_preset is one of RENDER_PRESETS ('fast', 'balanced', 'quality').
+        archive_dir enables the on-disk frame archive (see RadarArchive), None = off.
         """
         
         # Define available background map types and tile sources
@@ -79,9 +122,79 @@ class RadarProcessor:
         
         # Data freshness tracking for automatic updates
         self.last_modified = None  # Timestamp of last radar data update
+        self.data_time = None      # Nominal time of the loaded composite (UTC datetime)
+        
+        # Optional archive of every processed crop for replay/analysis, compacted hourly in the background
+        self.archive = None
+        if archive_dir:
+            try:
+                self.archive = RadarArchive(archive_dir)
+                self.archive.start_compaction()
+            except OSError as e:
+                print(f"Radar archive disabled: {e}")
+                self.archive = None
+        
+        # Instrumentation: frame counters and duration of the last run of each stage (ms)
+        self.stats = {'frames_loaded': 0, 'frames_skipped': 0, 'renders': 0}
+        self.stage_timings = {}
+        
+        # Content hash of the last processed AOI crop (identical republished frames are skipped)
+        self._last_frame_hash = None
+        self.last_load_skipped = False  # True if the last load found unchanged data
+        
+        # Geometry cache - projection results are reused while the radar grid and crop stay the same
+        self._bounds_cache = {}      # (grid parameters, area bounds) -> crop slice bounds
+        self._geometry_key = None    # Key of the geometry the current lons/lats belong to
+        
+        # Point time-series for configured cities (sampled every frame without rendering)
+        self.city_kernel_radius = 1     # Neighbourhood radius in radar cells (1 -> 3x3 kernel)
+        self.city_series_length = 36    # Number of frames kept per city (3 hours at 5 minutes)
+        self.city_names = []            # City order used by the time-series arrays
+        self.city_cell_indices = None   # Flat indices into scaled_data, shape (cities, kernel cells)
+        self.city_cell_valid = None     # Mask of kernel cells that fall inside the cropped grid
+        self._reset_city_series()
         
         # Calculate geographic area bounds from center point and image dimensions
         self._calculate_area_bounds()
+        
+        # Projection of the current radar grid, needed to build per-viewport remap tables
+        self._projection = None           # Grid origin and pixel size in radar projection coordinates
+        self._reverse_transformer = None  # pyproj transformer WGS84 -> radar projection
+        
+        # Per-frame shared render state (all viewports are rendered from the same arrays)
+        self.frame_counter = 0   # Incremented for every successfully loaded frame
+        self._smoothed_frame = None
+        self._smoothed = {}      # (sigma, blur) -> smoothed dBZ of frame _smoothed_frame
+        # Guards the frame state (data, time, projection, smoothing cache) against HTTP tile threads
+        self._frame_lock = threading.RLock()
+        
+        # On-demand XYZ overlay tiles, memoized per (frame, z, x, y) in a bounded LRU
+        self.tile_cache_size = 256        # Maximum number of encoded tiles kept in memory
+        self._xyz_tile_cache = OrderedDict()
+        self._xyz_tile_lock = threading.Lock()
+        self._empty_tile_png = None       # Shared fully transparent tile
+        
+        # Dirty-region compositing: block size used to diff consecutive overlays
+        self.dirty_block_size = 32
+        
+        # Recent overlays per viewport, kept as uint8 color class images (1 byte per pixel)
+        self.overlay_history_length = 12
+        
+        # Banded rendering: blur, colorize and composite split into horizontal bands on a thread pool
+        if render_workers is None:
+            render_workers = min(4, os.cpu_count() or 1)
+        self.render_workers = max(1, int(render_workers))  # May be changed at any time
+        self._render_pool = None
+        self._render_pool_workers = 0
+        
+        # Quality/speed preset, may be switched at runtime with set_render_preset()
+        self.render_preset = 'quality'
+        self.set_render_preset(render_preset)
+        
+        # Named viewports, each with its own background, cities and remap caches
+        # The 'default' viewport follows the constructor parameters
+        self.viewports = {}
+        self.add_viewport('default')
 
     def _calculate_required_radar_bounds(self, projdef, ll_lon, ll_lat, xscale, yscale, rows, cols):
         """Calculate the minimum radar pixel bounds needed to cover the area of interest.
@@ -92,10 +205,16 @@ class RadarProcessor:
         Returns:
             tuple: (row_start, row_end, col_start, col_end) pixel bounds
         """
+        # Reuse previous result - pyproj setup is expensive on the Pi
+        union_bounds = self._get_union_bounds()
+        cache_key = (projdef, float(ll_lon), float(ll_lat), xscale, yscale, rows, cols, union_bounds)
+        if cache_key in self._bounds_cache:
+            return self._bounds_cache[cache_key]
+        
         from pyproj import CRS, Transformer
         
-        # Get area of interest bounds with a safety buffer
-        lon_min, lon_max, lat_min, lat_max = self.area_bounds
+        # Get area of interest bounds (union of all viewports) with a safety buffer
+        lon_min, lon_max, lat_min, lat_max = union_bounds
         buffer_degrees = 0.1  # 0.1 degree buffer (~11km) for safety
         lon_min_buf = lon_min - buffer_degrees
         lon_max_buf = lon_max + buffer_degrees  
@@ -164,7 +283,9 @@ class RadarProcessor:
             #print(f"Radar crop: [{row_min}:{row_max+1}, {col_min}:{col_max+1}] = {crop_rows}x{crop_cols}")
             #print(f"Memory reduction: {reduction_factor:.1f}x ({original_pixels:,} -> {cropped_pixels:,} pixels)")
             
-            return row_min, row_max + 1, col_min, col_max + 1  # Return as slice bounds
+            bounds = (row_min, row_max + 1, col_min, col_max + 1)  # Slice bounds
+            self._bounds_cache[cache_key] = bounds
+            return bounds
             
         except Exception as e:
             print(f"Error calculating radar bounds: {e}")
@@ -186,11 +307,62 @@ class RadarProcessor:
             # psutil not available, use simpler approach or skip logging
             pass
 
+    def set_render_preset(self, name):
+        """Switch the render preset, e.g. to 'fast' while the CPU is hot or busy.
+        
+        Takes effect with the next render; the dirty-region compositing only
+        redraws the areas that look different with the new preset.
+        
+        Args:
+            name: Preset name from RENDER_PRESETS
+            
+        Returns:
+            bool: True if the preset is known and active
+        """
+        if name not in self.RENDER_PRESETS:
+            print(f"Unknown render preset '{name}', keeping '{self.render_preset}'")
+            return False
+        self.render_preset = name
+        return True
+
+    def _get_render_pool(self):
+        """Return the thread pool for banded rendering, or None when single-threaded."""
+        if self.render_workers <= 1:
+            return None
+        if self._render_pool is None or self._render_pool_workers != self.render_workers:
+            if self._render_pool is not None:
+                self._render_pool.shutdown(wait=False)
+            self._render_pool = ThreadPoolExecutor(max_workers=self.render_workers,
+                                                   thread_name_prefix='RadarRender')
+            self._render_pool_workers = self.render_workers
+        return self._render_pool
+
+    def _for_row_bands(self, func, rows):
+        """Call func(row_start, row_end) for horizontal bands covering rows 0..rows-1.
+        
+        With render_workers > 1 the bands are processed on a thread pool. NumPy releases
+        the GIL inside its array loops, so the bands run on several cores. Every band must
+        only write its own rows of a preallocated output, so the result is identical to
+        the single-threaded path.
+        """
+        pool = self._get_render_pool()
+        bands = min(self.render_workers, rows)
+        if pool is None or bands < 2:
+            func(0, rows)
+            return
+        edges = np.linspace(0, rows, bands + 1).astype(int)
+        futures = [pool.submit(func, int(start), int(end)) for start, end in zip(edges[:-1], edges[1:])]
+        for future in futures:
+            future.result()  # Re-raises exceptions from the band
+
     def _gaussian_blur_numpy(self, data, sigma=1.5):
         """Apply Gaussian blur to smooth radar data using NumPy-only implementation.
         
         Uses separable kernel approach: blur horizontally first, then vertically.
         This is more efficient than 2D convolution for Gaussian kernels.
+        Each pass adds the shifted, weighted rows/columns of a zero padded copy
+        (same result as np.convolve with mode='same'), processed in row bands.
+        The vertical pass reads radius halo rows above and below each band.
         """
         if sigma <= 0:
             return data  # No blurring needed
@@ -204,20 +376,80 @@ class RadarProcessor:
         # Ensure data is float16 for consistent processing, clamping to valid range
         data_clamped = np.clip(data, -65500, 65500)
         data_f16 = data_clamped.astype(np.float16)
+        rows, cols = data_f16.shape
+        weights = [float(w) for w in kernel]  # Products and sums in float32, like float16 np.convolve
+        
+        # Apply horizontal blur (zero padding left and right, rows are independent)
+        padded = np.zeros((rows, cols + 2 * radius), dtype=np.float32)
+        padded[:, radius:radius + cols] = data_f16
+        temp = np.empty((rows, cols), dtype=np.float16)
+        
+        def horizontal_band(start, end):
+            acc = weights[0] * padded[start:end, 0:cols]
+            for k in range(1, len(weights)):
+                acc += weights[k] * padded[start:end, k:k + cols]
+            temp[start:end] = acc
         
-        # Apply horizontal blur (convolve each row)
-        temp = np.apply_along_axis(
-            lambda m: np.convolve(m, kernel, mode='same'),  # Same size output
-            axis=1,  # Apply to each row (horizontal direction)
-            arr=data_f16
-        ).astype(np.float16)
+        self._for_row_bands(horizontal_band, rows)
         
-        # Apply vertical blur (convolve each column)
-        result = np.apply_along_axis(
-            lambda m: np.convolve(m, kernel, mode='same'),  # Same size output
-            axis=0,  # Apply to each column (vertical direction)
-            arr=temp
-        ).astype(np.float16)
+        # Apply vertical blur (zero padding top and bottom, bands read halo rows)
+        padded = np.zeros((rows + 2 * radius, cols), dtype=np.float32)
+        padded[radius:radius + rows] = temp
+        result = np.empty((rows, cols), dtype=np.float16)
+        
+        def vertical_band(start, end):
+            acc = weights[0] * padded[start:end]
+            for k in range(1, len(weights)):
+                acc += weights[k] * padded[start + k:end + k]
+            result[start:end] = acc
+        
+        self._for_row_bands(vertical_band, rows)
+        
+        return result
+
+    def _box_blur_numpy(self, data, sigma=1.5):
+        """Approximate the Gaussian blur with a single separable box filter.
+        
+        The box width is chosen so that its variance matches sigma ((w^2 - 1) / 12 = sigma^2).
+        Every pass only adds w shifted slices and scales once, instead of one
+        multiply-add per Gaussian tap over a kernel of 6 * sigma + 1 taps.
+        """
+        if sigma <= 0:
+            return data.astype(np.float32)
+        
+        width = int(round(math.sqrt(12 * sigma ** 2 + 1)))
+        width += 1 - width % 2  # Odd width keeps the filter centered
+        radius = width // 2
+        scale = 1.0 / width
+        
+        data_f32 = np.clip(data, -65500, 65500).astype(np.float32)
+        rows, cols = data_f32.shape
+        
+        # Horizontal pass (zero padding like the Gaussian blur)
+        padded = np.zeros((rows, cols + 2 * radius), dtype=np.float32)
+        padded[:, radius:radius + cols] = data_f32
+        temp = np.empty((rows, cols), dtype=np.float32)
+        
+        def horizontal_band(start, end):
+            acc = padded[start:end, 0:cols].copy()
+            for k in range(1, width):
+                acc += padded[start:end, k:k + cols]
+            temp[start:end] = acc * scale
+        
+        self._for_row_bands(horizontal_band, rows)
+        
+        # Vertical pass (bands read halo rows)
+        padded = np.zeros((rows + 2 * radius, cols), dtype=np.float32)
+        padded[radius:radius + rows] = temp
+        result = np.empty((rows, cols), dtype=np.float32)
+        
+        def vertical_band(start, end):
+            acc = padded[start:end].copy()
+            for k in range(1, width):
+                acc += padded[start + k:end + k]
+            result[start:end] = acc * scale
+        
+        self._for_row_bands(vertical_band, rows)
         
         return result
 
@@ -227,21 +459,30 @@ class RadarProcessor:
         Uses zoom level to determine scale, then calculates the geographic area
         that will be covered by the requested image size in pixels.
         """
+        self.area_bounds = self._compute_area_bounds(self.center_lon, self.center_lat, self.zoom_level,
+                                                     self.image_width_pixels, self.image_height_pixels)
+
+    def _compute_area_bounds(self, center_lon, center_lat, zoom_level, width_pixels, height_pixels):
+        """Compute geographic bounds for an arbitrary center, zoom level and image size.
+        
+        Returns:
+            tuple: (west, east, south, north) in decimal degrees
+        """
         # Base scale reference: zoom 10 covers ~39km per 256px tile at equator
         base_km_per_tile = 39.0  # Kilometers per tile at zoom level 10
         tile_size_px = 256       # Standard tile size in pixels
         
         # Adjust for latitude (Earth is not flat - distance varies with latitude)
-        cos_lat = np.cos(np.radians(self.center_lat))  # Correction factor for longitude
+        cos_lat = np.cos(np.radians(center_lat))  # Correction factor for longitude
         base_km_per_tile_at_lat = base_km_per_tile * cos_lat  # Actual km/tile at this latitude
         
         # Calculate scale factor based on zoom level difference from reference (zoom 10)
-        scale_factor = 2 ** (10 - self.zoom_level)  # Higher zoom = smaller area
+        scale_factor = 2 ** (10 - zoom_level)  # Higher zoom = smaller area
         km_per_px = (base_km_per_tile_at_lat * scale_factor) / tile_size_px  # km per pixel
         
         # Calculate total area coverage in kilometers
-        total_width_km = self.image_width_pixels * km_per_px   # Image width in km
-        total_height_km = self.image_height_pixels * km_per_px # Image height in km
+        total_width_km = width_pixels * km_per_px   # Image width in km
+        total_height_km = height_pixels * km_per_px # Image height in km
         
         # Convert from kilometers to degrees (approximate conversion)
         # 1 degree latitude ≈ 111 km everywhere
@@ -250,15 +491,63 @@ class RadarProcessor:
         half_height_deg = (total_height_km / 2) / 111.0             # Half-height in degrees
         
         # Calculate geographic bounds around center point
-        lon_min = self.center_lon - half_width_deg  # Western boundary
-        lon_max = self.center_lon + half_width_deg  # Eastern boundary
-        lat_min = self.center_lat - half_height_deg # Southern boundary
-        lat_max = self.center_lat + half_height_deg # Northern boundary
+        lon_min = center_lon - half_width_deg  # Western boundary
+        lon_max = center_lon + half_width_deg  # Eastern boundary
+        lat_min = center_lat - half_height_deg # Southern boundary
+        lat_max = center_lat + half_height_deg # Northern boundary
+        
+        # Return as tuple: (west, east, south, north)
+        return (float(lon_min), float(lon_max), float(lat_min), float(lat_max))
+
+    def add_viewport(self, name, center_lon=None, center_lat=None, zoom_level=None,
+                     image_width_pixels=None, image_height_pixels=None, satellite_source=None):
+        """Add a named viewport that is rendered from the same decoded radar frame.
         
-        # Store as tuple: (west, east, south, north)
-        self.area_bounds = (lon_min, lon_max, lat_min, lat_max)
+        All viewports share one download, decode and crop (the crop covers the union
+        of all viewports). Each viewport keeps its own background, cities and remap
+        caches. Parameters left at None are taken from the processor itself.
+        A viewport added after data has been loaded is fully covered from the next load on.
+        
+        Args:
+            name: Unique viewport name (used with create_smooth_heatmap_grid)
+            center_lon, center_lat: Viewport center in decimal degrees
+            zoom_level: Zoom level [8-12]
+            image_width_pixels, image_height_pixels: Output image size
+            satellite_source: Background type, None to follow self.satellite_source
+        """
+        viewport = {
+            'name': name,
+            'center_lon': float(center_lon if center_lon is not None else self.center_lon),
+            'center_lat': float(center_lat if center_lat is not None else self.center_lat),
+            'zoom_level': max(8, min(12, zoom_level if zoom_level is not None else self.zoom_level)),
+            'image_width_pixels': int(image_width_pixels or self.image_width_pixels),
+            'image_height_pixels': int(image_height_pixels or self.image_height_pixels),
+            'satellite_source': satellite_source,
+            # Render caches (rebuilt on demand when their key changes)
+            'background': None, 'background_key': None,  # Opaque RGBA map background
+            'cities_layer': None, 'cities_key': None,    # Transparent RGBA city markers
+            'remap': None, 'remap_key': None,            # Output pixel -> radar cell table
+            # Recent frames as color class images, newest last (see get_overlay_history)
+            'overlay_history': deque(maxlen=self.overlay_history_length),
+        }
+        viewport['area_bounds'] = self._compute_area_bounds(
+            viewport['center_lon'], viewport['center_lat'], viewport['zoom_level'],
+            viewport['image_width_pixels'], viewport['image_height_pixels'])
+        self.viewports[name] = viewport
+        return viewport
+
+    def remove_viewport(self, name):
+        """Remove a named viewport (the 'default' viewport cannot be removed)."""
+        if name != 'default':
+            self.viewports.pop(name, None)
+
+    def _get_union_bounds(self):
+        """Return the geographic bounds covering all viewports (west, east, south, north)."""
+        bounds = [vp['area_bounds'] for vp in self.viewports.values()] or [self.area_bounds]
+        return (min(b[0] for b in bounds), max(b[1] for b in bounds),
+                min(b[2] for b in bounds), max(b[3] for b in bounds))
 
-    def download_hdf5_data(self, use_local=True):
+    def download_hdf5_data(self, use_local=True, local_filename="composite_hx_test.hd5"):
         """Download HDF5 radar data from DWD or use local file.
         
         This method handles dual data source capability:
@@ -267,13 +556,15 @@ class RadarProcessor:
         
         Args:
             use_local: If True, try local file first; if False, download from server
+            local_filename: HDF5 file used in local mode (e.g. an archived composite)
             
         Returns:
             bytes: Raw HDF5 data, or None if failed to load/download
         """
+        import requests  # Deferred - only needed once the first download starts
+        
         if use_local:
             # Local file mode - load from disk for testing or offline operation
-            local_filename = "composite_hx_test.hd5"  # Expected local file name
             
             if os.path.exists(local_filename):
                 try:
@@ -324,7 +615,7 @@ class RadarProcessor:
                 print(f"Unexpected error during radar data download: {e}")
                 return None
 
-    def load_and_process_data(self, use_local=True, server_modified=None):
+    def load_and_process_data(self, use_local=True, server_modified=None, local_filename="composite_hx_test.hd5"):
         """Load and process HDF5 radar data from file or server.
         
         This method handles the complete workflow:
@@ -336,12 +627,17 @@ class RadarProcessor:
         Args:
             use_local: If True, try local file first before downloading
             server_modified: Timestamp of server data for caching
+            local_filename: HDF5 file used in local mode
             
         Returns:
             bool: True if data loaded successfully, False otherwise
         """
+        self.last_load_skipped = False
+        
         # Step 1: Get raw HDF5 data (from file or download)
-        hdf5_data = self.download_hdf5_data(use_local)
+        stage_start = time.perf_counter()
+        hdf5_data = self.download_hdf5_data(use_local, local_filename)
+        self._record_stage('download', stage_start)
         if hdf5_data is None:
             return False  # Failed to get data
         
@@ -349,16 +645,48 @@ class RadarProcessor:
         if server_modified is not None:
             self.last_modified = server_modified
         
-        # Step 2: Create in-memory file object for HDF5 parsing
-        try:
-            memory_file = io.BytesIO(hdf5_data)  # Convert bytes to file-like object
-        except Exception as e:
-            print(f"Error creating memory file from data: {e}")
+        # Steps 2-3: Parse the HDF5 structure and read only the area of interest
+        stage_start = time.perf_counter()
+        crop = self.read_crop(hdf5_data)
+        if crop is None:
+            return False
+        raw_data, meta, data_time = crop
+        
+        if not self._process_crop(raw_data, meta, data_time, stage_start):
             return False
         
+        # Keep every new frame in the on-disk archive (not republished identical data)
+        if self.archive is not None and data_time is not None and not self.last_load_skipped:
+            try:
+                self.archive.append(data_time, raw_data, meta)
+            except OSError as e:
+                print(f"Could not archive radar frame: {e}")
+        return True  # Success
+
+    def read_crop(self, hdf5_data):
+        """Read the area-of-interest crop and its scaling/geometry from an HDF5 composite.
+        
+        Only the rows/columns covering the viewports are read. The crop bounds come from
+        the geometry cache, so pyproj runs once per radar grid and area.
+        
+        Args:
+            hdf5_data: HDF5 file content (bytes) or a filename
+            
+        Returns:
+            tuple: (raw counts, meta dict, data_time) or None on error
+        """
+        # Step 2: Create in-memory file object for HDF5 parsing (files are opened directly)
+        if isinstance(hdf5_data, (bytes, bytearray)):
+            try:
+                hdf5_data = io.BytesIO(hdf5_data)  # Convert bytes to file-like object
+            except Exception as e:
+                print(f"Error creating memory file from data: {e}")
+                return None
+        
         # Step 3: Parse HDF5 structure and extract metadata first (for area calculation)
+        import h5py  # Deferred to the first ingest, h5py takes a while to load on the Pi
         try:
-            with h5py.File(memory_file, "r") as f:
+            with h5py.File(hdf5_data, "r") as f:
                 # Extract geographic reference information and grid info FIRST
                 ll_lon = f["/where"].attrs["LL_lon"]  # Lower-left longitude
                 ll_lat = f["/where"].attrs["LL_lat"]  # Lower-left latitude
@@ -388,12 +716,8 @@ class RadarProcessor:
                 
                 # Load ONLY the required subset of radar data (massive memory savings!)
                 #print(f"Loading cropped radar data: [{row_start}:{row_end}, {col_start}:{col_end}]")
-                self.raw_data = f["/dataset1/data1/data"][row_start:row_end, col_start:col_end]
-                #print(f"Cropped data shape: {self.raw_data.shape} (vs {full_shape} full)")
-                
-                # Store crop offset for coordinate adjustment
-                self.crop_row_offset = row_start
-                self.crop_col_offset = col_start
+                raw_data = f["/dataset1/data1/data"][row_start:row_end, col_start:col_end]
+                #print(f"Cropped data shape: {raw_data.shape} (vs {full_shape} full)")
                 
                 # Extract scaling parameters to convert raw values to dBZ
                 gain = f["/dataset1/data1/what"].attrs["gain"]       # Scaling factor
@@ -401,39 +725,178 @@ class RadarProcessor:
                 nodata = f["/dataset1/data1/what"].attrs["nodata"]   # No-data marker
                 undetect = f["/dataset1/data1/what"].attrs["undetect"] # Below detection threshold
                 
+                # Nominal time of the composite, used to stamp the city time-series
+                data_time = self._parse_data_time(f["/what"].attrs)
+                
         except Exception as e:
             print(f"Error reading HDF5 file: {e}")
             print("The file might be corrupted or in an unexpected format")
-            return False
+            return None
+        
+        meta = {
+            'projdef': projdef, 'll_lon': float(ll_lon), 'll_lat': float(ll_lat),
+            'xscale': xscale, 'yscale': yscale, 'full_rows': int(rows), 'full_cols': int(cols),
+            'row_start': int(row_start), 'col_start': int(col_start),
+            'gain': float(gain), 'offset': float(offset), 'nodata': float(nodata), 'undetect': float(undetect),
+            'time': data_time.isoformat() if data_time is not None else None,
+        }
+        return raw_data, meta, data_time
+
+    def _process_crop(self, raw_data, meta, data_time, stage_start):
+        """Scale, project and sample a cropped radar array (from HDF5 or the archive).
+        
+        Args:
+            raw_data: Cropped raw counts
+            meta: Crop geometry and scaling (see load_and_process_data / RadarArchive.append)
+            data_time: Nominal time of the composite (UTC datetime)
+            stage_start: time.perf_counter() value taken when decoding started
+            
+        Returns:
+            bool: True if the crop is now the current frame (or identical to it)
+        """
+        projdef = meta['projdef']
+        row_start, col_start = meta['row_start'], meta['col_start']
+        gain, offset = meta['gain'], meta['offset']
+        nodata, undetect = meta['nodata'], meta['undetect']
+        
+        # Skip everything downstream if the area of interest did not change
+        # (DWD sometimes republishes LATEST with a new Last-Modified but the same data)
+        frame_hash = hashlib.blake2b(raw_data.tobytes(), digest_size=16)
+        frame_hash.update(repr((projdef, row_start, col_start, raw_data.shape,
+                                float(gain), float(offset), float(nodata), float(undetect))).encode('utf-8'))
+        frame_hash = frame_hash.digest()
+        if frame_hash == self._last_frame_hash and self.scaled_data is not None:
+            self._record_stage('decode', stage_start)
+            self.stats['frames_skipped'] += 1
+            self.last_load_skipped = True
+            return True  # Current data is still valid
+        
+        # Frame state is replaced under the frame lock: HTTP tile threads must never see the
+        # new time or data with the old projection (or a half-updated smoothing cache)
+        with self._frame_lock:
+            self.raw_data = raw_data
+            self.data_time = data_time
+        
+            # Store crop offset for coordinate adjustment
+            self.crop_row_offset = row_start
+            self.crop_col_offset = col_start
+        
+            # Get cropped radar data dimensions
+            rows, cols = self.raw_data.shape  # Cropped dimensions, much smaller than full grid
+        
+            # Step 4: Apply scaling to convert raw values to meteorological units (dBZ)
+            # Use float32 for better precision, then convert to float16 for storage
+            # This avoids precision issues that can vary between platforms/NumPy versions
+            scaled_f32 = self.scale_counts(self.raw_data, gain, offset, nodata, undetect)
+        
+            # Convert to float16 only after proper scaling and special value handling
+            # This ensures consistent behavior across different platforms/NumPy versions
+            self.scaled_data = scaled_f32.astype(np.float16)
+            self._record_stage('decode', stage_start)
+        
+            # Step 5: Setup coordinate transformation from radar grid to lat/lon
+            stage_start = time.perf_counter()
+            try:
+                # Store full grid dimensions for coordinate calculations
+                self.full_rows = meta['full_rows']
+                self.full_cols = meta['full_cols']
+            
+                self.setup_projection(projdef, float(meta['ll_lon']), float(meta['ll_lat']), 
+                                    float(meta['xscale']), float(meta['yscale']), rows, cols)
+            except Exception as e:
+                print(f"Error setting up coordinate projection: {e}")
+                self._last_frame_hash = None
+                return False
+            self._record_stage('projection', stage_start)
         
-        # Get cropped radar data dimensions
-        rows, cols = self.raw_data.shape  # Cropped dimensions, much smaller than full grid
+            # Step 6: Sample the configured cities (a few array lookups, no rendering)
+            self._update_city_series()
         
-        # Step 4: Apply scaling to convert raw values to meteorological units (dBZ)
-        # Use float32 for better precision, then convert to float16 for storage
-        # This avoids precision issues that can vary between platforms/NumPy versions
-        scaled_f32 = self.raw_data.astype(np.float32) * np.float32(gain) + np.float32(offset)
+            self._last_frame_hash = frame_hash
+            self.stats['frames_loaded'] += 1
+            self.frame_counter += 1  # Invalidates per-frame render state shared by the viewports
+            return True  # Success
+
+    @staticmethod
+    def scale_counts(raw_data, gain, offset, nodata, undetect):
+        """Convert raw radar counts to dBZ.
+        
+        Returns:
+            numpy.ndarray: float32 dBZ, -32 below the detection threshold, NaN for no data
+        """
+        scaled = raw_data.astype(np.float32) * np.float32(gain) + np.float32(offset)
         
         # Mark special values before final conversion
-        scaled_f32[self.raw_data == undetect] = -32.0   # Below radar detection threshold
-        scaled_f32[self.raw_data == nodata] = np.nan    # No data available (NaN)
+        scaled[raw_data == undetect] = -32.0   # Below radar detection threshold
+        scaled[raw_data == nodata] = np.nan    # No data available (NaN)
+        return scaled
+
+    def load_archived_frame(self, when, exact=False):
+        """Make an archived frame the current frame, e.g. for replay or analysis.
         
-        # Convert to float16 only after proper scaling and special value handling
-        # This ensures consistent behavior across different platforms/NumPy versions
-        self.scaled_data = scaled_f32.astype(np.float16)
+        Runs the same processing as a fresh download; the archive is not written to.
         
-        # Step 5: Setup coordinate transformation from radar grid to lat/lon
-        try:
-            # Store full grid dimensions for coordinate calculations
-            self.full_rows = full_shape[0]
-            self.full_cols = full_shape[1]
+        Args:
+            when: UTC datetime of the frame (the newest frame before it is used unless exact)
+            exact: Only accept a frame with exactly this time
             
-            self.setup_projection(projdef, float(ll_lon), float(ll_lat), 
-                                float(xscale), float(yscale), rows, cols)
-            return True  # Success
-        except Exception as e:
-            print(f"Error setting up coordinate projection: {e}")
+        Returns:
+            bool: True if the frame was found and processed
+        """
+        self.last_load_skipped = False
+        if self.archive is None:
+            print("No radar archive configured")
+            return False
+        stage_start = time.perf_counter()
+        try:
+            frame = self.archive.get_frame(when, exact)
+        except (OSError, ValueError) as e:
+            print(f"Error reading archived radar frame: {e}")
             return False
+        if frame is None:
+            return False
+        return self._process_crop(frame['raw_data'], frame['meta'], frame['time'], stage_start)
+
+    def _record_stage(self, stage, start):
+        """Store the duration of a processing stage in milliseconds.
+        
+        Args:
+            stage: Stage name ('download', 'decode', 'projection', 'blur', 'render')
+            start: time.perf_counter() value taken when the stage started
+        """
+        self.stage_timings[stage] = (time.perf_counter() - start) * 1000.0
+
+    def _parse_data_time(self, what_attrs):
+        """Read the nominal composite time from the HDF5 /what group.
+        
+        Returns:
+            datetime: UTC timestamp of the composite, or None if not available
+        """
+        try:
+            date = what_attrs["date"]
+            hhmmss = what_attrs["time"]
+            if isinstance(date, bytes):
+                date = date.decode('utf-8')
+            if isinstance(hhmmss, bytes):
+                hhmmss = hhmmss.decode('utf-8')
+            return datetime.strptime(date + hhmmss, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+        except (KeyError, ValueError) as e:
+            print(f"Could not read composite time: {e}")
+            return None
+
+    def read_data_time(self, filename):
+        """Read only the nominal composite time of a local HDF5 file (no data is decoded).
+        
+        Returns:
+            datetime: UTC timestamp of the composite, or None if not readable
+        """
+        import h5py
+        try:
+            with h5py.File(filename, "r") as f:
+                return self._parse_data_time(f["/what"].attrs)
+        except (OSError, KeyError) as e:
+            print(f"Could not read {filename}: {e}")
+            return None
 
     def setup_projection(self, projdef, ll_lon, ll_lat, xscale, yscale, rows, cols):
         """Setup coordinate transformation from radar grid to geographic coordinates.
@@ -450,6 +913,12 @@ class RadarProcessor:
             rows: Number of radar grid rows
             cols: Number of radar grid columns
         """
+        # Skip the whole transformation if the grid and crop did not change since last frame
+        geometry_key = (projdef, ll_lon, ll_lat, xscale, yscale, rows, cols,
+                        self.crop_row_offset, self.crop_col_offset, self.full_rows)
+        if geometry_key == self._geometry_key and self.lons is not None:
+            return
+        
         # Store projection info for compatibility
         self.radar_crs = projdef
         self.transformer = None
@@ -468,6 +937,15 @@ class RadarProcessor:
         # Calculate projected coordinates of the grid origin (lower-left corner)
         grid_origin_x, grid_origin_y = reverse_transformer.transform(ll_lon, ll_lat)
         
+        # Keep projection for the per-viewport remap tables
+        self._reverse_transformer = reverse_transformer
+        self._projection = {
+            'grid_origin_x': grid_origin_x,
+            'grid_origin_y': grid_origin_y,
+            'xscale': xscale,
+            'yscale': yscale,
+        }
+        
         # Create coordinate grids for CROPPED radar pixels only
         # Adjust for crop offset to maintain correct geographic positioning
         #self._log_memory_usage("before coordinate grid creation")
@@ -499,9 +977,195 @@ class RadarProcessor:
         self.lats = lats_temp.astype(np.float32)
         del lons_temp, lats_temp  # Free temporary arrays
         
+        # Precompute city sample cells once per geometry
+        self._compute_city_cells(reverse_transformer, grid_origin_x, grid_origin_y,
+                                 xscale, yscale, rows, cols)
+        self._geometry_key = geometry_key
+        
         gc.collect()  # Force garbage collection
         #self._log_memory_usage("after coordinate optimization")
 
+    def _compute_city_cells(self, reverse_transformer, grid_origin_x, grid_origin_y,
+                            xscale, yscale, rows, cols):
+        """Find the radar cells (plus a small neighbourhood kernel) around every city.
+        
+        The result is a (cities, kernel cells) array of flat indices into the cropped
+        radar grid, so sampling all cities per frame is a single fancy-index lookup.
+        
+        Args:
+            reverse_transformer: pyproj transformer from WGS84 to the radar projection
+            grid_origin_x, grid_origin_y: Projected coordinates of the grid origin
+            xscale, yscale: Pixel size in meters
+            rows, cols: Dimensions of the cropped radar grid
+        """
+        names = list(self.cities.keys())
+        if names != self.city_names:
+            # City list changed - start a fresh time-series store
+            self.city_names = names
+            self._reset_city_series()
+        
+        if not names:
+            self.city_cell_indices = None
+            self.city_cell_valid = None
+            return
+        
+        # City coordinates (both (lon, lat) and (lon, lat, color) formats)
+        city_lons = np.array([self.cities[name][0] for name in names], dtype=np.float64)
+        city_lats = np.array([self.cities[name][1] for name in names], dtype=np.float64)
+        proj_x, proj_y = reverse_transformer.transform(city_lons, city_lats)
+        
+        # Invert the pixel center formulas used in setup_projection, then remove the crop offset
+        center_cols = np.rint((np.asarray(proj_x) - grid_origin_x) / xscale - 0.5).astype(np.int64) - self.crop_col_offset
+        center_rows = np.rint(self.full_rows - 1 + 0.5 - (np.asarray(proj_y) - grid_origin_y) / yscale).astype(np.int64) - self.crop_row_offset
+        
+        # Square neighbourhood kernel around the center cell
+        r = self.city_kernel_radius
+        offsets = np.arange(-r, r + 1)
+        kernel_rows, kernel_cols = np.broadcast_arrays(center_rows[:, None, None] + offsets[None, :, None],
+                                                       center_cols[:, None, None] + offsets[None, None, :])
+        kernel_rows = kernel_rows.reshape(len(names), -1)
+        kernel_cols = kernel_cols.reshape(len(names), -1)
+        
+        # Cells outside the cropped grid are masked out (city outside the area of interest)
+        self.city_cell_valid = ((kernel_rows >= 0) & (kernel_rows < rows) &
+                                (kernel_cols >= 0) & (kernel_cols < cols))
+        self.city_cell_indices = np.where(self.city_cell_valid,
+                                          kernel_rows * cols + kernel_cols, 0)
+
+    def _reset_city_series(self):
+        """Allocate an empty ring buffer for the city time-series."""
+        n = len(self.city_names)
+        self.city_series_times = np.zeros(self.city_series_length, dtype=np.float64)  # Epoch seconds
+        self.city_series_dbz = np.full((n, self.city_series_length), np.nan, dtype=np.float32)
+        self.city_series_head = 0   # Next write position
+        self.city_series_count = 0  # Number of valid frames
+
+    def _update_city_series(self):
+        """Append the current frame's dBZ sample for each city to the time-series store."""
+        if self.city_cell_indices is None or self.scaled_data is None:
+            return
+        
+        # Frame timestamp: composite time, then server time, then local time
+        if self.data_time is not None:
+            timestamp = self.data_time.timestamp()
+        elif self.last_modified is not None:
+            timestamp = self.last_modified.timestamp()
+        else:
+            timestamp = time.time()
+        
+        # The same frame loaded twice must not be counted twice
+        if self.city_series_count > 0:
+            last = (self.city_series_head - 1) % self.city_series_length
+            if self.city_series_times[last] == timestamp:
+                return
+        
+        # One gather for all cities, then the maximum within each kernel
+        samples = self.scaled_data.ravel()[self.city_cell_indices].astype(np.float32)
+        samples[~self.city_cell_valid] = np.nan
+        dbz = np.fmax.reduce(samples, axis=1)  # NaN-ignoring maximum, NaN if no valid cell
+        
+        self.city_series_times[self.city_series_head] = timestamp
+        self.city_series_dbz[:, self.city_series_head] = dbz
+        self.city_series_head = (self.city_series_head + 1) % self.city_series_length
+        self.city_series_count = min(self.city_series_count + 1, self.city_series_length)
+
+    @staticmethod
+    def dbz_to_rain_rate(dbz):
+        """Convert reflectivity to rain rate with the Marshall-Palmer relation Z = 200 * R^1.6.
+        
+        Args:
+            dbz: Reflectivity in dBZ (scalar or NumPy array)
+            
+        Returns:
+            Rain rate in mm/h (0 below 1 dBZ, the first visible radar color)
+        """
+        dbz = np.asarray(dbz, dtype=np.float32)
+        with np.errstate(invalid='ignore'):
+            rate = (np.power(10.0, dbz / 10.0) / 200.0) ** (1.0 / 1.6)
+            rate = np.where(dbz >= 1.0, rate, 0.0)
+        return rate.astype(np.float32)
+
+    def get_city_series(self, city):
+        """Return the recorded time-series of one city in chronological order.
+        
+        Args:
+            city: City name as configured in the cities dictionary
+            
+        Returns:
+            tuple: (times, dbz, rain_rate) NumPy arrays (epoch seconds, dBZ, mm/h),
+                   or None if the city is unknown
+        """
+        if city not in self.city_names:
+            return None
+        
+        index = self.city_names.index(city)
+        count = self.city_series_count
+        order = (self.city_series_head - count + np.arange(count)) % self.city_series_length
+        dbz = self.city_series_dbz[index, order]
+        return self.city_series_times[order], dbz, self.dbz_to_rain_rate(dbz)
+
+    def get_city_rain_duration(self, city, min_rain_rate=0.1, frame_interval=300):
+        """Return for how many minutes it has been raining at a city (e.g. "rain in Leonberg for 20 min").
+        
+        Args:
+            city: City name as configured in the cities dictionary
+            min_rain_rate: Rain rate in mm/h counted as rain
+            frame_interval: Seconds between two radar frames (DWD: 5 minutes)
+            
+        Returns:
+            float: Minutes of the current rain period, each rainy frame counts one interval
+                   (the newest frame alone gives frame_interval), 0 if it is dry now
+        """
+        series = self.get_city_series(city)
+        if series is None or len(series[0]) == 0:
+            return 0.0
+        
+        times, _, rain_rate = series
+        raining = rain_rate >= min_rain_rate
+        if not raining[-1]:
+            return 0.0
+        
+        # Walk back to the first frame of the current rain period - a dry frame or a gap
+        # in the series (frames missed while offline) ends it, unknown weather is not rain
+        dry = np.nonzero(~raining)[0]
+        start = dry[-1] + 1 if len(dry) else 0
+        gaps = np.nonzero(np.diff(times) > 1.5 * frame_interval)[0]  # Half an interval of jitter
+        if len(gaps):
+            start = max(start, gaps[-1] + 1)
+        return float(times[-1] - times[start] + frame_interval) / 60.0
+
+    def get_analysis(self):
+        """Summarize the current frame as JSON-serializable dictionary.
+        
+        Returns:
+            dict: Frame time, area statistics and the latest sample of every city
+        """
+        analysis = {
+            'time': self.data_time.isoformat() if self.data_time is not None else None,
+            'last_modified': self.last_modified.isoformat() if self.last_modified is not None else None,
+            'frame': self.frame_counter,
+            'max_dbz': None,
+            'rain_fraction': None,
+            'cities': {},
+        }
+        
+        if self.scaled_data is not None:
+            data = self.scaled_data.astype(np.float32)
+            if np.any(~np.isnan(data)):
+                analysis['max_dbz'] = round(float(np.nanmax(data)), 1)
+            analysis['rain_fraction'] = round(float(np.mean(data >= 1.0)), 4)  # Visible echo share
+        
+        for city in self.city_names:
+            times, dbz, rain_rate = self.get_city_series(city)
+            if len(times) == 0:
+                continue
+            analysis['cities'][city] = {
+                'dbz': None if np.isnan(dbz[-1]) else round(float(dbz[-1]), 1),
+                'rain_rate': round(float(rain_rate[-1]), 2),
+                'rain_minutes': self.get_city_rain_duration(city),
+            }
+        return analysis
+
     def check_for_new_data(self):
         """Check if new radar data is available on DWD server using efficient HEAD request.
         
@@ -513,6 +1177,8 @@ class RadarProcessor:
                   - has_new_data: True if server has newer data than our cache
                   - server_timestamp: Last-Modified time from server, or None if unavailable
         """
+        import requests
+        
         url = "https://opendata.dwd.de/weather/radar/composite/hx/composite_hx_LATEST-hd5"
         
         try:
@@ -552,7 +1218,7 @@ class RadarProcessor:
             print(f"Unexpected error checking for new radar data: {e}")
             return False, None
 
-    def get_area_cities(self):
+    def get_area_cities(self, bounds=None):
         """Filter cities to only those visible within the current map area bounds.
         
         Implements two-pass filtering:
@@ -563,11 +1229,14 @@ class RadarProcessor:
         - Legacy format: {"CityName": (longitude, latitude)}
         - Enhanced format: {"CityName": (longitude, latitude, color)}
         
+        Args:
+            bounds: Map bounds (west, east, south, north), defaults to self.area_bounds
+        
         Returns:
             dict: Filtered cities in format {"CityName": (lon, lat, color)}
         """
         # Extract current map boundaries
-        lon_min, lon_max, lat_min, lat_max = self.area_bounds
+        lon_min, lon_max, lat_min, lat_max = bounds if bounds is not None else self.area_bounds
         
         area_cities = {}  # Will store cities visible in current map area
         
@@ -648,6 +1317,27 @@ class RadarProcessor:
         
         return (x, y)  # Return tile coordinates as integers
 
+    def _num2deg(self, x, y, zoom):
+        """Convert tile coordinates back to latitude/longitude (inverse of _deg2num).
+        
+        Works on scalars and NumPy arrays; fractional tile coordinates address
+        positions inside a tile (e.g. x + 0.5 is the horizontal tile center).
+        
+        Args:
+            x, y: Tile coordinates (tile corners for integer values)
+            zoom: Zoom level
+            
+        Returns:
+            tuple: (lat_deg, lon_deg)
+        """
+        n = 2.0 ** zoom
+        # Longitude: linear conversion from tile X to degrees
+        lon_deg = np.asarray(x, dtype=np.float64) / n * 360.0 - 180.0
+        # Latitude: inverse Mercator projection from tile Y to degrees
+        lat_rad = np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y, dtype=np.float64) / n)))
+        lat_deg = np.degrees(lat_rad)
+        return lat_deg, lon_deg
+
     def _get_tile_cache_path(self, x, y, z, tile_source):
         """Generate file path for cached map tile.
         
@@ -738,6 +1428,8 @@ class RadarProcessor:
         Returns:
             PIL.Image: RGB tile image (256x256 pixels), or None if download failed
         """
+        import requests
+        
         # Step 1: Check if tile is already cached locally
         cached_tile = self._load_cached_tile(x, y, z, tile_source)
         if cached_tile is not None:
@@ -795,7 +1487,7 @@ class RadarProcessor:
             print(f"Failed to download tile {x},{y},{z} from {tile_source}: {e}")
             return None
 
-    def _create_tile_background(self, ax, tile_source='osm'):
+    def _create_tile_background(self, ax, tile_source='osm', bounds=None):
         """Create map background by downloading and stitching multiple tiles.
         
         This method implements the complete tile-based mapping pipeline:
@@ -811,9 +1503,13 @@ class RadarProcessor:
         Args:
             ax: Matplotlib axes object to draw the background on
             tile_source: Map service ('osm', 'esri_satellite', 'esri_topo', etc.)
+            bounds: Map bounds (west, east, south, north), defaults to self.area_bounds
+            
+        Returns:
+            bool: True if all tiles were available (result may be cached)
         """
         # Extract geographic boundaries of current map view
-        lon_min, lon_max, lat_min, lat_max = self.area_bounds
+        lon_min, lon_max, lat_min, lat_max = bounds if bounds is not None else self.area_bounds
         
         #print(f"Creating tile background with source: {tile_source}")  # Debug
         #print(f"Area bounds: {lon_min:.4f}, {lon_max:.4f}, {lat_min:.4f}, {lat_max:.4f}")
@@ -878,8 +1574,8 @@ class RadarProcessor:
         # Step 4: Handle complete download failure
         if successful_downloads == 0:
             print("Failed to download any tiles, falling back to simple background")
-            self._create_simple_background(ax, 'simple')  # Use offline background
-            return
+            self._create_simple_background(ax, 'simple', bounds)  # Use offline background
+            return False
         
         # Step 5: Stitch individual tiles into single background image
         tile_width = 256   # Standard tile size (pixels)
@@ -904,20 +1600,11 @@ class RadarProcessor:
         
         # Step 6: Calculate geographic extent of stitched image
         # Convert tile boundaries back to lat/lon for matplotlib
-        def num2deg(x, y, z):
-            """Convert tile coordinates back to lat/lon (inverse of _deg2num)."""
-            n = 2.0 ** z
-            # Longitude: linear conversion from tile X to degrees
-            lon_deg = x / n * 360.0 - 180.0
-            # Latitude: inverse Mercator projection from tile Y to degrees
-            lat_rad = math.atan(math.sinh(math.pi * (1 - 2 * y / n)))
-            lat_deg = math.degrees(lat_rad)
-            return lat_deg, lon_deg
-        
-        # Calculate actual geographic extent of the stitched tile mosaic
         # Add 1 to get tile boundaries (not centers)
-        tile_lat_min, tile_lon_min = num2deg(min_x, max_y + 1, zoom)      # Bottom-left
-        tile_lat_max, tile_lon_max = num2deg(max_x + 1, min_y, zoom)      # Top-right
+        tile_lat_min, tile_lon_min = self._num2deg(min_x, max_y + 1, zoom)      # Bottom-left
+        tile_lat_max, tile_lon_max = self._num2deg(max_x + 1, min_y, zoom)      # Top-right
+        tile_lat_min, tile_lon_min = float(tile_lat_min), float(tile_lon_min)
+        tile_lat_max, tile_lon_max = float(tile_lat_max), float(tile_lon_max)
         
         # Step 7: Display stitched background in matplotlib with proper coordinates
         ax.imshow(np.array(stitched),
@@ -928,8 +1615,10 @@ class RadarProcessor:
         
         # Set figure background to white (clean appearance)
         ax.figure.patch.set_facecolor('white')
+        
+        return successful_downloads == total_tiles
 
-    def _create_simple_background(self, ax, background_type):
+    def _create_simple_background(self, ax, background_type, bounds=None):
         """Create offline map backgrounds without requiring external tile downloads.
         
         This provides fallback capability when network is unavailable or tile
@@ -945,9 +1634,13 @@ class RadarProcessor:
         Args:
             ax: Matplotlib axes object to draw background on
             background_type: Style of background to generate
+            bounds: Map bounds (west, east, south, north), defaults to self.area_bounds
+            
+        Returns:
+            bool: Always True (offline backgrounds are deterministic and can be cached)
         """
         # Get current map boundaries for coordinate-aware backgrounds
-        lon_min, lon_max, lat_min, lat_max = self.area_bounds
+        lon_min, lon_max, lat_min, lat_max = bounds if bounds is not None else self.area_bounds
         
         if background_type == 'simple':
             # Clean, minimalist background - light gray
@@ -1004,141 +1697,99 @@ class RadarProcessor:
             # Default background for unknown types - neutral gray
             ax.set_facecolor('#f0f0f0')  # Standard gray background
             ax.figure.patch.set_facecolor('#f0f0f0')  # Match figure background
-
-    def create_smooth_heatmap_grid(self, satellite_source=None, sigma=2.0):
-        """Generate complete radar visualization with background map and smooth weather overlay.
         
-        This is the main visualization method that combines all components:
-        1. Create properly sized matplotlib figure for exact pixel output
-        2. Generate background map (tiles or simple graphics)
-        3. Process and overlay radar data with meteorological color scheme
-        4. Add city markers with customizable colors
-        5. Export as PIL image with precise dimensions
-        
-        The method handles missing data gracefully and provides fallbacks for
-        network issues, coordinate problems, and other edge cases.
+        return True
+
+    def _new_viewport_figure(self, viewport, transparent=False):
+        """Create a matplotlib figure whose axes map the viewport bounds onto its exact pixel grid.
         
         Args:
-            satellite_source: Background type ('osm', 'esri_satellite', 'simple', etc.)
-            sigma: Gaussian blur sigma for radar smoothing (higher = smoother)
+            viewport: Viewport dictionary
+            transparent: If True, figure and axes backgrounds are fully transparent
             
         Returns:
-            PIL.Image: Complete weather radar map as RGBA image
+            tuple: (figure, axes)
         """
-        # Use instance default if no specific background requested
-        if satellite_source is None:
-            satellite_source = self.satellite_source
-        
-        # Extract geographic boundaries for current view
-        lon_min, lon_max, lat_min, lat_max = self.area_bounds
+        # matplotlib is the slowest import of all - load it with the first map layer
+        # (Figure + Agg canvas directly: no pyplot state, no GUI backend)
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
         
-        # Step 1: Create matplotlib figure with exact pixel dimensions
-        # Calculate figure size to achieve precise output dimensions
-        base_dpi = 100  # Use 100 DPI for predictable pixel-to-inch conversion
-        fig_width = self.image_width_pixels / base_dpi    # Width in inches
-        fig_height = self.image_height_pixels / base_dpi  # Height in inches
+        lon_min, lon_max, lat_min, lat_max = viewport['area_bounds']
         
-        # Create figure and axes with calculated dimensions
-        fig, ax = plt.subplots(figsize=(fig_width, fig_height))
+        # Use 100 DPI for predictable pixel-to-inch conversion
+        base_dpi = 100
+        fig = Figure(figsize=(viewport['image_width_pixels'] / base_dpi,
+                              viewport['image_height_pixels'] / base_dpi), dpi=base_dpi)
+        FigureCanvasAgg(fig)  # Attach Agg canvas (no pyplot state, no GUI backend)
         
-        # Set geographic coordinate system on axes
+        # Axes fill the whole figure without padding
+        ax = fig.add_axes([0, 0, 1, 1])
         ax.set_xlim(lon_min, lon_max)  # Longitude range (west to east)
         ax.set_ylim(lat_min, lat_max)  # Latitude range (south to north)
-        ax.set_aspect('equal', adjustable='box')  # Maintain geographic aspect ratio
+        ax.set_aspect('auto')          # Stretch bounds onto the full pixel grid
+        ax.axis('off')                 # Hide axis lines, ticks and labels
+        
+        if transparent:
+            fig.patch.set_alpha(0.0)
+        return fig, ax
+
+    def _figure_to_array(self, fig, viewport):
+        """Render a viewport figure and return its pixels as RGBA uint8 array (no PNG round trip)."""
+        lon_min, lon_max, lat_min, lat_max = viewport['area_bounds']
+        ax = fig.axes[0]
+        # Ensure coordinate limits are exactly as specified (imshow may autoscale)
+        ax.set_xlim(lon_min, lon_max)
+        ax.set_ylim(lat_min, lat_max)
+        fig.canvas.draw()
+        return np.array(fig.canvas.buffer_rgba(), dtype=np.uint8)  # Copy, figure can be freed
+
+    def _get_viewport_background(self, viewport, satellite_source):
+        """Return the cached opaque map background of a viewport, rendering it on first use.
+        
+        Args:
+            viewport: Viewport dictionary
+            satellite_source: Background type ('osm', 'esri_satellite', 'simple', etc.)
+            
+        Returns:
+            numpy.ndarray: RGBA uint8 image (height x width x 4)
+        """
+        key = (satellite_source, viewport['area_bounds'],
+               viewport['image_width_pixels'], viewport['image_height_pixels'])
+        if viewport['background_key'] == key:
+            return viewport['background']
         
-        # Step 2: Create background map layer
+        fig, ax = self._new_viewport_figure(viewport)
         if satellite_source in ['osm', 'esri_satellite', 'esri_topo', 'esri_street']:
             # Online tile-based backgrounds - download and stitch map tiles
-            self._create_tile_background(ax, satellite_source)
+            complete = self._create_tile_background(ax, satellite_source, viewport['area_bounds'])
         else:
             # Offline backgrounds - generate using matplotlib primitives
-            self._create_simple_background(ax, satellite_source)
-        
-        # Step 3: Add radar data overlay (if available)
-        # Check that we have all required radar data components
-        if hasattr(self, 'scaled_data') and self.scaled_data is not None and \
-           self.lons is not None and self.lats is not None:
-            
-            # Find radar pixels that fall within current map view
-            mask = ((self.lons >= lon_min) & (self.lons <= lon_max) &
-                    (self.lats >= lat_min) & (self.lats <= lat_max))
-            
-            if np.any(mask):  # At least some radar data in view
-                # Extract bounding box of radar data in current view
-                rows_in_area, cols_in_area = np.where(mask)
-                row_min, row_max = rows_in_area.min(), rows_in_area.max()
-                col_min, col_max = cols_in_area.min(), cols_in_area.max()
-                
-                # Extract subset of radar data covering the map area
-                data_subset = self.scaled_data[row_min:row_max + 1, col_min:col_max + 1]
-                
-                # Extract corresponding coordinate subsets for proper geographic positioning
-                lons_subset = self.lons[row_min:row_max + 1, col_min:col_max + 1]
-                lats_subset = self.lats[row_min:row_max + 1, col_min:col_max + 1]
-                
-                # Step 3a: Clean and prepare radar data for visualization
-                valid_data = data_subset.copy()
-                valid_data[np.isnan(valid_data)] = -50      # Replace NaN with low value
-                valid_data[valid_data < -10] = -50          # Remove noise below detection
-                
-                # Step 3b: Apply Gaussian smoothing to reduce pixelated appearance
-                smoothed_data = self._gaussian_blur_numpy(valid_data, sigma=sigma)
-                
-                # Step 3c: Mask very low values to make them transparent
-                smoothed_data = np.ma.masked_where(smoothed_data < -30, smoothed_data)
-                
-                # Define geographic extent using actual radar data boundaries (not map view)
-                # This ensures radar data is positioned at its correct geographic location
-                radar_lon_min = lons_subset.min()
-                radar_lon_max = lons_subset.max()
-                radar_lat_min = lats_subset.min()
-                radar_lat_max = lats_subset.max()
-                extent = [radar_lon_min, radar_lon_max, radar_lat_min, radar_lat_max]
-                
-                # Step 3d: Define meteorological color scheme (dBZ reflectivity scale)
-                # Standard weather radar colors from light blue (weak) to magenta (extreme)
-                dBZ_boundaries = [0, 1, 5.5, 10, 14.5, 19, 23.5, 28, 32.5, 37, 41.5, 46, 50.5, 55, 60, 65, 75, 85]
-                dBZ_colors = [
-                    '#99ffff00',  # 0-1 dBZ: Transparent (very light precipitation)
-                    '#99ffff',    # 1-5.5 dBZ: Light blue (drizzle)
-                    '#33ffff',    # 5.5-10 dBZ: Cyan (light rain)
-                    '#00caca',    # 10-14.5 dBZ: Teal (light-moderate rain)
-                    '#009934',    # 14.5-19 dBZ: Green (moderate rain)
-                    '#4dbf1a',    # 19-23.5 dBZ: Light green (moderate-heavy rain)
-                    '#99cc00',    # 23.5-28 dBZ: Yellow-green (heavy rain)
-                    '#cce600',    # 28-32.5 dBZ: Yellow (very heavy rain)
-                    '#ffff00',    # 32.5-37 dBZ: Bright yellow (intense rain)
-                    '#ffc400',    # 37-41.5 dBZ: Orange-yellow (very intense)
-                    '#ff8900',    # 41.5-46 dBZ: Orange (severe rain/small hail)
-                    '#ff0000',    # 46-50.5 dBZ: Red (severe weather)
-                    '#b40000',    # 50.5-55 dBZ: Dark red (large hail)
-                    '#4848ff',    # 55-60 dBZ: Blue (very large hail)
-                    '#0000ca',    # 60-65 dBZ: Dark blue (giant hail)
-                    '#990099',    # 65-75 dBZ: Purple (extreme hail)
-                    '#ff33ff'     # 75+ dBZ: Magenta (tornado/extreme weather)
-                ]
-                
-                # Create matplotlib colormap from our custom colors
-                dBZ_cmap = ListedColormap(dBZ_colors)
-                norm = BoundaryNorm(dBZ_boundaries, dBZ_cmap.N, clip=True)
-                
-                # Step 3e: Render radar data overlay with proper transparency
-                im = ax.imshow(
-                    smoothed_data,
-                    cmap=dBZ_cmap,          # Meteorological color scheme
-                    norm=norm,              # Boundary-based color mapping
-                    alpha=0.7,              # Semi-transparent overlay
-                    extent=extent,          # Geographic coordinates
-                    origin='upper',         # Standard image orientation
-                    aspect='auto',          # Allow non-square pixels
-                    interpolation='bilinear' # Smooth scaling
-                )
-        else:
-            # No radar data available - background only
-            print("No radar data available - showing background map only")
+            complete = self._create_simple_background(ax, satellite_source, viewport['area_bounds'])
+        background = self._figure_to_array(fig, viewport)
+        
+        # Only cache complete backgrounds - fallback tiles are retried on the next render
+        if complete:
+            viewport['background'] = background
+            viewport['background_key'] = key
+        return background
+
+    def _get_viewport_cities_layer(self, viewport):
+        """Return the cached transparent city marker layer of a viewport.
         
-        # Step 4: Add city markers with customizable colors
-        area_cities = self.get_area_cities()  # Get cities in current view
+        Returns:
+            numpy.ndarray: RGBA uint8 image (height x width x 4)
+        """
+        key = (tuple(self.cities.items()), viewport['area_bounds'],
+               viewport['image_width_pixels'], viewport['image_height_pixels'])
+        if viewport['cities_key'] == key:
+            return viewport['cities_layer']
+        
+        lon_min, lon_max, lat_min, lat_max = viewport['area_bounds']
+        fig, ax = self._new_viewport_figure(viewport, transparent=True)
+        
+        # Add city markers with customizable colors
+        area_cities = self.get_area_cities(viewport['area_bounds'])  # Get cities in current view
         
         for city, (lon, lat, color) in area_cities.items():
             # Double-check that city is within view (safety check)
@@ -1159,33 +1810,566 @@ class RadarProcessor:
                                  facecolor='black',          # Black background
                                  alpha=0.8))                 # Semi-transparent
         
-        # Step 5: Clean up axes appearance for map display
-        ax.set_xticks([])    # Remove longitude tick marks
-        ax.set_yticks([])    # Remove latitude tick marks
-        ax.axis('off')       # Hide axis lines and labels
+        viewport['cities_layer'] = self._figure_to_array(fig, viewport)
+        viewport['cities_key'] = key
+        return viewport['cities_layer']
+
+    def _get_viewport_remap(self, viewport):
+        """Return the cached remap table from viewport pixels to the cropped radar grid.
         
-        # Ensure coordinate limits are exactly as specified
-        ax.set_xlim(lon_min, lon_max)
-        ax.set_ylim(lat_min, lat_max)
+        Every output pixel center is converted to lon/lat (linear in the viewport bounds,
+        like the matplotlib axes), projected into the radar grid with pyproj and stored as
+        the upper-left source cell plus bilinear weights. The table only depends on the
+        geometry, so it is computed once and reused for all following frames.
+        
+        Returns:
+            dict: 'index' (flat upper-left cell, int32), 'wy'/'wx' (float32 weights),
+                  'valid' (bool mask of pixels covered by radar data), 'cols'
+        """
+        key = (self._geometry_key, viewport['area_bounds'],
+               viewport['image_width_pixels'], viewport['image_height_pixels'])
+        if viewport['remap_key'] == key:
+            return viewport['remap']
+        
+        lon_min, lon_max, lat_min, lat_max = viewport['area_bounds']
+        width = viewport['image_width_pixels']
+        height = viewport['image_height_pixels']
+        
+        # Geographic coordinates of all output pixel centers (row 0 = north)
+        pixel_lons = lon_min + (np.arange(width) + 0.5) / width * (lon_max - lon_min)
+        pixel_lats = lat_max - (np.arange(height) + 0.5) / height * (lat_max - lat_min)
+        lon_grid, lat_grid = np.meshgrid(pixel_lons, pixel_lats)
+        
+        viewport['remap'] = self._build_remap(lon_grid, lat_grid)
+        viewport['remap_key'] = key
+        return viewport['remap']
+
+    def _frame_state(self):
+        """Return references to the arrays and projection of the current frame.
+        
+        A frame load replaces these attributes (it does not modify the arrays), so a
+        render from the returned state sees one consistent frame without holding the
+        frame lock - HTTP tile threads do not block the GUI or the next frame load.
+        """
+        with self._frame_lock:
+            preset = self.RENDER_PRESETS[self.render_preset]
+            return {
+                'frame': self.frame_counter,
+                'data': self.scaled_data,
+                'lons': self.lons,
+                'lats': self.lats,
+                'projection': self._projection,
+                'transformer': self._reverse_transformer,
+                'crop_row_offset': self.crop_row_offset,
+                'crop_col_offset': self.crop_col_offset,
+                'full_rows': self.full_rows,
+                'blur': preset['blur'],
+                'interpolation': preset['interpolation'],
+            }
+
+    def _build_remap(self, lon_grid, lat_grid, state=None):
+        """Build a bilinear remap table for arbitrary output pixel coordinates.
+        
+        Args:
+            lon_grid, lat_grid: Longitude/latitude of every output pixel center
+            state: Frame state from _frame_state(), None = current frame
+            
+        Returns:
+            dict: Remap table as described in _get_viewport_remap
+        """
+        state = state or self._frame_state()
+        rows, cols = state['data'].shape
+        
+        # Project into the radar grid (inverse of the pixel center formulas in setup_projection)
+        proj_x, proj_y = state['transformer'].transform(lon_grid, lat_grid)
+        p = state['projection']
+        col_f = (np.asarray(proj_x) - p['grid_origin_x']) / p['xscale'] - 0.5 - state['crop_col_offset']
+        row_f = (state['full_rows'] - 0.5 - (np.asarray(proj_y) - p['grid_origin_y']) / p['yscale']
+                 - state['crop_row_offset'])
+        
+        valid = (row_f >= 0) & (row_f <= rows - 1) & (col_f >= 0) & (col_f <= cols - 1)
+        row0 = np.clip(np.floor(row_f), 0, max(rows - 2, 0)).astype(np.int32)
+        col0 = np.clip(np.floor(col_f), 0, max(cols - 2, 0)).astype(np.int32)
+        
+        return {
+            'index': row0 * cols + col0,
+            'wy': np.clip(row_f - row0, 0.0, 1.0).astype(np.float32),
+            'wx': np.clip(col_f - col0, 0.0, 1.0).astype(np.float32),
+            'valid': valid,
+            'cols': cols,
+        }
+
+    def _get_smoothed_data(self, sigma, state=None):
+        """Return cleaned and blurred dBZ data of a frame (shared by all viewports).
+        
+        The blur method follows the render preset of the frame state. The blur runs
+        outside the frame lock and is only cached if no new frame was loaded meanwhile.
+        
+        Args:
+            sigma: Blur strength
+            state: Frame state from _frame_state(), None = current frame
+            
+        Returns:
+            numpy.ndarray: float32 array with the shape of scaled_data
+        """
+        state = state or self._frame_state()
+        blur = state['blur']
+        key = (sigma, blur)
+        with self._frame_lock:
+            # One entry per sigma: the GUI (2.0) and the tiles (1.5) do not evict each other
+            if self._smoothed_frame != self.frame_counter:
+                self._smoothed = {}
+                self._smoothed_frame = self.frame_counter
+            smoothed = self._smoothed.get(key) if self._smoothed_frame == state['frame'] else None
+            if smoothed is not None:
+                return smoothed
+        
+        stage_start = time.perf_counter()
+        
+        # Clean and prepare radar data for visualization
+        valid_data = state['data'].copy()
+        valid_data[np.isnan(valid_data)] = -50      # Replace NaN with low value
+        valid_data[valid_data < -10] = -50          # Remove noise below detection
+        
+        # Apply smoothing to reduce pixelated appearance
+        if blur == 'gaussian':
+            smoothed = self._gaussian_blur_numpy(valid_data, sigma=sigma).astype(np.float32)
+        elif blur == 'box':
+            smoothed = self._box_blur_numpy(valid_data, sigma=sigma)
+        else:
+            smoothed = valid_data.astype(np.float32)
+        with self._frame_lock:
+            if self._smoothed_frame == state['frame']:
+                self._smoothed[key] = smoothed
+        self._record_stage('blur', stage_start)
+        return smoothed
+
+    def _remap_data(self, data, remap, rows=slice(None), interpolation='bilinear'):
+        """Bilinearly sample radar data at every viewport pixel using a remap table.
+        
+        Args:
+            rows: Optional slice of output rows to sample (for banded rendering)
+            interpolation: 'bilinear' or 'nearest' (value of the closest radar cell)
+        """
+        flat = data.ravel()
+        index = remap['index'][rows]
+        wy = remap['wy'][rows]
+        wx = remap['wx'][rows]
+        cols = remap['cols']
+        if interpolation == 'nearest':
+            return flat[index + (wy >= 0.5) * cols + (wx >= 0.5)]
+        top = flat[index] * (1.0 - wx) + flat[index + 1] * wx
+        bottom = flat[index + cols] * (1.0 - wx) + flat[index + cols + 1] * wx
+        return top * (1.0 - wy) + bottom * wy
+
+    def _get_dbz_palette(self):
+        """Return the dBZ palette as RGBA uint8 lookup table (overlay alpha already applied)."""
+        if getattr(self, '_dbz_palette', None) is None:
+            from matplotlib.colors import to_rgba
+            palette = np.array([to_rgba(color) for color in self.DBZ_COLORS], dtype=np.float64)
+            palette[:, 3] *= self.OVERLAY_ALPHA
+            self._dbz_palette = np.rint(palette * 255).astype(np.uint8)
+        return self._dbz_palette
+
+    def _classify(self, values, valid):
+        """Map dBZ values to color class indices with the same bins as a clipping BoundaryNorm.
+        
+        Values below the first boundary (and pixels without radar data) get the
+        transparent class 0, values above the last boundary the last class.
+        
+        Returns:
+            numpy.ndarray: uint8 class index per value (index into _get_dbz_palette)
+        """
+        class_index = np.searchsorted(np.asarray(self.DBZ_BOUNDARIES[1:-1], dtype=np.float32),
+                                      values, side='right').astype(np.uint8)
+        class_index[~valid] = 0
+        return class_index
+
+    def _classify_supersampled(self, values, valid, start, end):
+        """Classify rows start..end-1 at 2x2 sub-pixels.
+        
+        Sub-pixel values are interpolated between neighbouring output pixels
+        (edges clamped). The palette colors of the four sub-pixels are averaged
+        at blend time, so color class boundaries get anti-aliased edges.
+        
+        Args:
+            values, valid: Sampled dBZ values and validity mask including up to one
+                           halo row above and below the band
+            start, end: Band rows relative to the given arrays
+            
+        Returns:
+            numpy.ndarray: uint8 class indices of the band rows, shape (rows, width, 4)
+        """
+        # Neighbours in all four directions (clamped at the array edges)
+        left = np.concatenate((values[:, :1], values[:, :-1]), axis=1)
+        right = np.concatenate((values[:, 1:], values[:, -1:]), axis=1)
+        result = np.empty((end - start, values.shape[1], 4), dtype=np.uint8)
+        sub_index = 0
+        for horizontal in (0.75 * values + 0.25 * left, 0.75 * values + 0.25 * right):
+            up = np.concatenate((horizontal[:1], horizontal[:-1]), axis=0)
+            down = np.concatenate((horizontal[1:], horizontal[-1:]), axis=0)
+            for sub in (0.75 * horizontal + 0.25 * up, 0.75 * horizontal + 0.25 * down):
+                result[..., sub_index] = self._classify(sub[start:end], valid[start:end])
+                sub_index += 1
+        return result
+
+    def _overlay_layer(self, class_index):
+        """Apply the palette to a class index overlay (palette gather) for blending.
+        
+        Args:
+            class_index: uint8 array (height, width, samples) with 1 sample per pixel,
+                         or 4 supersampled sub-pixels whose colors are averaged
+            
+        Returns:
+            numpy.ndarray: Straight-alpha RGBA uint8 layer
+        """
+        palette = self._get_dbz_palette()
+        if class_index.shape[2] == 1:
+            return palette[class_index[..., 0]]
+        
+        # Alpha weighted color average, mean alpha
+        rgba = palette[class_index]  # (height, width, samples, 4)
+        alpha = rgba[..., 3:4].astype(np.uint32)
+        accum_rgb = (rgba[..., :3] * alpha).sum(axis=2)
+        accum_alpha = alpha.sum(axis=2)
+        samples = class_index.shape[2]
+        result = np.empty(class_index.shape[:2] + (4,), dtype=np.uint8)
+        result[..., :3] = (accum_rgb + accum_alpha // 2) // np.maximum(accum_alpha, 1)
+        result[..., 3] = (accum_alpha[..., 0] + samples // 2) // samples
+        return result
+
+    def _indexed_image(self, class_index):
+        """Build a palette mode ('P') PIL image with transparency from class indices.
+        
+        Args:
+            class_index: uint8 array (height, width)
+        """
+        palette = self._get_dbz_palette()
+        image = Image.fromarray(np.ascontiguousarray(class_index), 'P')
+        image.putpalette(palette[:, :3].ravel().tolist())
+        image.info['transparency'] = bytes(palette[:, 3].tolist())
+        return image
+
+    def _composite(self, base, layer):
+        """Alpha-blend a straight-alpha RGBA layer over an opaque RGBA base image.
+        
+        Returns:
+            numpy.ndarray: New RGBA uint8 image
+        """
+        alpha = layer[..., 3:4].astype(np.uint16)
+        result = base.copy()
+        result[..., :3] = ((layer[..., :3] * alpha + base[..., :3] * (255 - alpha) + 127) // 255).astype(np.uint8)
+        return result
+
+    def create_smooth_heatmap_grid(self, satellite_source=None, sigma=2.0, viewport='default'):
+        """Generate complete radar visualization with background map and smooth weather overlay.
+        
+        This is the main visualization method that combines all components:
+        1. Get the cached background map of the viewport (tiles or simple graphics)
+        2. Blur the radar data once per frame (shared by all viewports)
+        3. Remap it onto the viewport pixels and apply the meteorological color scheme
+        4. Blend overlay and cached city markers onto the background
+        5. Return as PIL image with precise dimensions
+        
+        The method handles missing data gracefully and provides fallbacks for
+        network issues, coordinate problems, and other edge cases.
+        
+        Args:
+            satellite_source: Background type ('osm', 'esri_satellite', 'simple', etc.)
+            sigma: Gaussian blur sigma for radar smoothing (higher = smoother)
+            viewport: Name of the viewport to render (see add_viewport)
+            
+        Returns:
+            PIL.Image: Complete weather radar map as RGBA image
+        """
+        vp = self.viewports[viewport]
+        stage_start = time.perf_counter()
+        
+        # Use viewport/instance default if no specific background requested
+        if satellite_source is None:
+            satellite_source = vp['satellite_source'] or self.satellite_source
+        
+        # Step 1: Background map layer (rendered once per viewport)
+        background = self._get_viewport_background(vp, satellite_source)
+        
+        # Step 2-3: Radar data overlay (if available)
+        if self.scaled_data is not None and self._projection is not None:
+            remap = self._get_viewport_remap(vp)
+            smoothed_data = self._get_smoothed_data(sigma)
+            preset = self.RENDER_PRESETS[self.render_preset]
+            height, width = background.shape[:2]
+            samples = 4 if preset['supersample'] > 1 else 1
+            overlay = np.empty((height, width, samples), dtype=np.uint8)
+            
+            def classify_band(start, end):
+                if samples > 1:
+                    # One halo row above and below for the sub-pixel interpolation
+                    halo_start, halo_end = max(0, start - 1), min(height, end + 1)
+                    rows = slice(halo_start, halo_end)
+                    values = self._remap_data(smoothed_data, remap, rows, preset['interpolation'])
+                    overlay[start:end] = self._classify_supersampled(
+                        values, remap['valid'][rows], start - halo_start, end - halo_start)
+                else:
+                    rows = slice(start, end)
+                    overlay[rows, :, 0] = self._classify(
+                        self._remap_data(smoothed_data, remap, rows, preset['interpolation']),
+                        remap['valid'][rows])
+            
+            self._for_row_bands(classify_band, height)
+        else:
+            # No radar data available - background only
+            print("No radar data available - showing background map only")
+            overlay = np.zeros(background.shape[:2] + (1,), dtype=np.uint8)
+        
+        # Step 4: Blend overlay and city markers, only where the overlay changed
+        output = self._update_viewport_output(vp, background, overlay,
+                                              self._get_viewport_cities_layer(vp))
+        if self.scaled_data is not None:
+            self._store_overlay_history(vp, overlay)
+        
+        # Step 5: Convert to PIL Image (copy - the output buffer is updated in place next frame)
+        image = Image.fromarray(output.copy(), 'RGBA')
+        self.stats['renders'] += 1
+        self._record_stage('render', stage_start)
+        return image
+
+    def _update_viewport_output(self, viewport, background, overlay, cities):
+        """Recompose the cached output buffer of a viewport only where the overlay changed.
+        
+        The overlay is a uint8 color class image (height, width, samples); the palette
+        is only applied when a region is blended (see _overlay_layer).
+        The new overlay is compared with the previous one in blocks of
+        dirty_block_size pixels. Only changed blocks are re-blended into the cached
+        output buffer, and the changed areas are stored in viewport['dirty_rects']
+        as (x0, y0, x1, y1) rectangles so the GUI can update just those regions.
+        
+        Returns:
+            numpy.ndarray: The viewport's RGBA output buffer
+        """
+        height, width = overlay.shape[:2]
+        block = self.dirty_block_size
+        layers_key = (id(background), id(cities))  # Cached layers keep their identity
+        output = viewport.get('output')
+        previous = viewport.get('overlay')
+        
+        if (output is None or previous is None or previous.shape != overlay.shape or
+                viewport.get('output_layers_key') != layers_key):
+            # First frame or background/cities changed - full composite
+            output = np.empty_like(background)
+            
+            def composite_band(start, end):
+                rows = slice(start, end)
+                output[rows] = self._composite(self._composite(background[rows], self._overlay_layer(overlay[rows])),
+                                               cities[rows])
+            
+            self._for_row_bands(composite_band, height)
+            dirty_rects = [(0, 0, width, height)]
+        else:
+            # Compare the class indices, then reduce to a block mask
+            changed = (overlay != previous).any(axis=2)
+            blocks_y = -(-height // block)
+            blocks_x = -(-width // block)
+            padded = np.zeros((blocks_y * block, blocks_x * block), dtype=bool)
+            padded[:height, :width] = changed
+            dirty_blocks = padded.reshape(blocks_y, block, blocks_x, block).any(axis=(1, 3))
+            
+            # Rows of blocks are recomposed in bands, rectangles collected per block row
+            rects_per_row = [[] for _ in range(blocks_y)]
+            
+            def recompose_block_rows(start_by, end_by):
+                for by in range(start_by, end_by):
+                    row = dirty_blocks[by]
+                    bx = 0
+                    while bx < blocks_x:
+                        if not row[bx]:
+                            bx += 1
+                            continue
+                        # Merge horizontally adjacent dirty blocks into one rectangle
+                        start = bx
+                        while bx < blocks_x and row[bx]:
+                            bx += 1
+                        x0, x1 = start * block, min(bx * block, width)
+                        y0, y1 = by * block, min((by + 1) * block, height)
+                        region = (slice(y0, y1), slice(x0, x1))
+                        output[region] = self._composite(
+                            self._composite(background[region], self._overlay_layer(overlay[region])),
+                            cities[region])
+                        rects_per_row[by].append((x0, y0, x1, y1))
+            
+            self._for_row_bands(recompose_block_rows, blocks_y)
+            dirty_rects = [rect for rects in rects_per_row for rect in rects]
+        
+        viewport['output'] = output
+        viewport['overlay'] = overlay
+        viewport['output_layers_key'] = layers_key
+        viewport['dirty_rects'] = dirty_rects
+        return output
+
+    def _store_overlay_history(self, viewport, overlay):
+        """Keep the class image of a newly rendered frame in the viewport's history.
+        
+        Supersampled overlays are stored with the highest class of their sub-pixels,
+        so every stored frame needs 1 byte per pixel.
+        """
+        class_index = overlay[..., 0].copy() if overlay.shape[2] == 1 else overlay.max(axis=2)
+        entry = {'frame': self.frame_counter, 'time': self.data_time, 'index': class_index, 'png': None}
+        history = viewport['overlay_history']
+        if history and history[-1]['frame'] == self.frame_counter:
+            history[-1] = entry  # Same frame rendered again (e.g. other preset)
+        else:
+            history.append(entry)
+
+    def get_overlay_history(self, viewport='default'):
+        """Return the recent overlays of a viewport.
+        
+        Returns:
+            list: (data_time, class index image) tuples, newest last. The uint8 images
+                  index into the dBZ palette (0 = transparent / no rain).
+        """
+        return [(entry['time'], entry['index']) for entry in list(self.viewports[viewport]['overlay_history'])]
+
+    def get_overlay_png(self, index=0, viewport='default'):
+        """Return a stored overlay as an indexed (palette) PNG with transparency.
+        
+        The PNG is encoded once per stored frame. Safe to call from HTTP server threads.
+        
+        Args:
+            index: 0 = newest frame, 1 = the one before, ...
+            viewport: Viewport name
+            
+        Returns:
+            tuple: (data_time, PNG bytes), or None if there is no such frame
+        """
+        history = list(self.viewports[viewport]['overlay_history'])
+        if not 0 <= index < len(history):
+            return None
+        entry = history[-1 - index]
+        if entry['png'] is None:
+            buf = io.BytesIO()
+            self._indexed_image(entry['index']).save(buf, format='PNG', optimize=True)
+            entry['png'] = buf.getvalue()
+        return entry['time'], entry['png']
+
+    def get_dirty_rects(self, viewport='default'):
+        """Return the regions changed by the last render of a viewport.
+        
+        Returns:
+            list: (x0, y0, x1, y1) rectangles in output pixels, empty if nothing changed
+        """
+        return self.viewports[viewport].get('dirty_rects', [])
+
+    def render_viewports(self, sigma=2.0):
+        """Render all viewports from the current frame.
+        
+        Returns:
+            dict: {viewport name: PIL.Image}
+        """
+        return {name: self.create_smooth_heatmap_grid(sigma=sigma, viewport=name)
+                for name in self.viewports}
+
+    def render_xyz_tile(self, z, x, y, sigma=1.5):
+        """Render a transparent 256x256 radar overlay tile for slippy-map clients.
         
-        # Remove all padding around the plot area
-        plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
+        The tile pixels are mapped back to lon/lat with the inverted Web Mercator
+        math of _deg2num and sampled directly from the decoded composite.
+        Only the cropped area of interest carries data, tiles outside are empty.
         
-        # Step 6: Export figure as PIL image with exact dimensions
-        buf = io.BytesIO()  # In-memory buffer for image data
+        Args:
+            z, x, y: Tile coordinates (XYZ / OSM scheme)
+            sigma: Gaussian blur sigma (same meaning as for the viewport render)
+            
+        Returns:
+            PIL.Image: Palette mode tile with transparency, or None if there is no
+                       radar data or the tile is invalid
+        """
+        return self._render_xyz_tile(z, x, y, sigma, self._frame_state())
+    
+    def _render_xyz_tile(self, z, x, y, sigma, state):
+        """Render a tile from a frame state (see render_xyz_tile), without the frame lock."""
+        n = 2 ** z
+        if not (0 <= z <= 20 and 0 <= x < n and 0 <= y < n):
+            return None
+        if state['data'] is None or state['projection'] is None:
+            return None
         
-        plt.savefig(buf, format='png',           # PNG format for quality
-                    dpi=base_dpi,                # Match our DPI calculation
-                    bbox_inches='tight',         # Tight bounding box
-                    pad_inches=0,                # No padding
-                    facecolor=fig.get_facecolor(), # Preserve background color
-                    transparent=False)           # Solid background
+        tile_size = 256
+        # Tile bounds; skip tiles that do not touch the cropped radar area at all
+        north, west = self._num2deg(x, y, z)
+        south, east = self._num2deg(x + 1, y + 1, z)
+        lons, lats = state['lons'], state['lats']
+        if (east < lons.min() or west > lons.max() or
+                north < lats.min() or south > lats.max()):
+            return self._indexed_image(np.zeros((tile_size, tile_size), dtype=np.uint8))
+        
+        # Pixel centers in fractional tile coordinates -> lon/lat
+        offsets = (np.arange(tile_size) + 0.5) / tile_size
+        pixel_lats, _ = self._num2deg(0, y + offsets, z)
+        _, pixel_lons = self._num2deg(x + offsets, 0, z)
+        lon_grid, lat_grid = np.meshgrid(pixel_lons, pixel_lats)
+        
+        remap = self._build_remap(lon_grid, lat_grid, state)
+        values = self._remap_data(self._get_smoothed_data(sigma, state), remap,
+                                  interpolation=state['interpolation'])
+        return self._indexed_image(self._classify(values, remap['valid']))
+
+    def _tile_frame_key(self):
+        """Key of the current frame and preset for the tile cache (caller holds the frame lock)."""
+        frame_key = self.data_time.isoformat() if self.data_time is not None else str(self.frame_counter)
+        return frame_key + '/' + self.render_preset  # Tiles look different with another preset
+
+    def get_xyz_tile_png(self, z, x, y, sigma=1.5):
+        """Return a radar overlay tile as PNG bytes, memoized per (frame, z, x, y).
         
-        # Convert matplotlib output to PIL Image
-        buf.seek(0)  # Reset buffer position to beginning
-        pil_image = Image.open(buf).convert("RGBA")  # RGBA for transparency support
+        Tiles are only rendered when requested and kept in a bounded LRU cache,
+        which is emptied as soon as a new radar frame has been loaded.
+        Safe to call from HTTP server threads.
         
-        # Clean up matplotlib resources
-        plt.close()
+        Args:
+            z, x, y: Tile coordinates (XYZ / OSM scheme)
+            sigma: Gaussian blur sigma
+            
+        Returns:
+            tuple: (frame key, PNG bytes), or None if the tile cannot be rendered
+        """
+        # The locks only cover the key, the cache lookup and the frame references -
+        # rendering and encoding run in parallel with other tiles and the GUI
+        with self._xyz_tile_lock, self._frame_lock:
+            frame_key = self._tile_frame_key()
+            cache_key = (frame_key, z, x, y, sigma)
+            
+            # A new frame invalidates all cached tiles
+            if self._xyz_tile_cache and next(iter(self._xyz_tile_cache))[0] != frame_key:
+                self._xyz_tile_cache.clear()
+            
+            png = self._xyz_tile_cache.get(cache_key)
+            if png is not None:
+                self._xyz_tile_cache.move_to_end(cache_key)  # Mark as most recently used
+                return frame_key, png
+            state = self._frame_state()
+        
+        # Key and tile come from the same frame state, even if a new frame is loaded meanwhile
+        tile = self._render_xyz_tile(z, x, y, sigma, state)
+        if tile is None:
+            return None
         
-        return pil_image  # Return final radar map image
+        if tile.getbbox() is None:
+            # Fully transparent - share one encoded empty tile
+            if self._empty_tile_png is None:
+                buf = io.BytesIO()
+                tile.save(buf, format='PNG')
+                self._empty_tile_png = buf.getvalue()
+            png = self._empty_tile_png
+        else:
+            buf = io.BytesIO()
+            tile.save(buf, format='PNG', compress_level=6)
+            png = buf.getvalue()
+        
+        with self._xyz_tile_lock, self._frame_lock:
+            # A tile of an older frame must not be stored under the key of the new one
+            if self.frame_counter == state['frame'] and self._tile_frame_key() == frame_key:
+                if self._xyz_tile_cache and next(iter(self._xyz_tile_cache))[0] != frame_key:
+                    self._xyz_tile_cache.clear()
+                self._xyz_tile_cache[cache_key] = png
+                while len(self._xyz_tile_cache) > self.tile_cache_size:
+                    self._xyz_tile_cache.popitem(last=False)  # Evict least recently used
+        return frame_key, png
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+"""
+RadarServer class - small built-in HTTP service for rendered radar frames
+Lets other displays in the house (tablets, a second Pi) show the same radar
+without each of them downloading and rendering the DWD composite again.
+"""
+import io
+import json
+import gzip
+import hashlib
+import threading
+import time
+import argparse
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PIL import features
+
+
+# ---------- HTTP request handler ----------
+class _RadarRequestHandler(BaseHTTPRequestHandler):
+    """Serve the frames and analysis results held by the owning RadarServer."""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive for clients polling every few seconds
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet - many clients poll frequently
+
+    def _handle(self, send_body):
+        radar_server = self.server.radar_server
+        radar_server.count('requests')
+        path = self.path.split('?', 1)[0]
+
+        if path in ('/radar.png', '/radar.webp'):
+            self._send_frame(radar_server.get_frame(0), path.rsplit('.', 1)[1], send_body)
+        elif path.startswith('/history/'):
+            # /history/<n>.png|webp with n = 0 for the newest frame
+            try:
+                index, fmt = path[len('/history/'):].split('.', 1)
+                frame = radar_server.get_frame(int(index))
+            except ValueError:
+                self._send_error(404, send_body)
+                return
+            self._send_frame(frame, fmt, send_body)
+        elif path.startswith('/tiles/'):
+            self._send_tile(radar_server, path, send_body)
+        elif path == '/overlay.png' or path.startswith('/overlay/'):
+            self._send_overlay(radar_server, path, send_body)
+        elif path == '/history':
+            self._send_json(radar_server.get_history_document(), send_body)
+        elif path == '/analysis.json':
+            self._send_json(radar_server.get_analysis_document(), send_body)
+        elif path == '/':
+            body = radar_server.INDEX_HTML.encode('utf-8')
+            self._send(200, 'text/html; charset=utf-8', body, None, send_body)
+        else:
+            self._send_error(404, send_body)
+
+    def _send_frame(self, frame, fmt, send_body):
+        if frame is None or fmt not in ('png', 'webp') or frame[fmt] is None:
+            self._send_error(404, send_body)
+            return
+        self._send(200, 'image/' + fmt, frame[fmt], frame['etag'] + '-' + fmt, send_body)
+
+    def _send_tile(self, radar_server, path, send_body):
+        # /tiles/<z>/<x>/<y>.png rendered on demand from the decoded composite
+        try:
+            z, x, y = path[len('/tiles/'):].rsplit('.', 1)[0].split('/')
+            z, x, y = int(z), int(x), int(y)
+        except ValueError:
+            self._send_error(404, send_body)
+            return
+        result = radar_server.radar.get_xyz_tile_png(z, x, y) if radar_server.radar else None
+        if result is None:
+            self._send_error(404, send_body)
+            return
+        frame_key, png = result
+        etag = hashlib.sha1(f"{frame_key}/{z}/{x}/{y}".encode('utf-8')).hexdigest()[:20]
+        self._send(200, 'image/png', png, etag, send_body)
+
+    def _send_overlay(self, radar_server, path, send_body):
+        # /overlay.png or /overlay/<n>.png - radar only, as small indexed PNG with transparency
+        try:
+            index = 0 if path == '/overlay.png' else int(path[len('/overlay/'):].rsplit('.', 1)[0])
+        except ValueError:
+            self._send_error(404, send_body)
+            return
+        result = radar_server.radar.get_overlay_png(index) if radar_server.radar else None
+        if result is None:
+            self._send_error(404, send_body)
+            return
+        _, png = result
+        self._send(200, 'image/png', png, hashlib.sha1(png).hexdigest()[:20], send_body)
+
+    def _send_json(self, document, send_body):
+        if document is None:
+            self._send_error(404, send_body)
+            return
+        # Pre-compressed once per frame, only choose the variant here
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            self._send(200, 'application/json', document['gzip'], document['etag'] + '-gz',
+                       send_body, content_encoding='gzip')
+        else:
+            self._send(200, 'application/json', document['json'], document['etag'], send_body)
+
+    def _send_error(self, status, send_body):
+        self._send(status, 'text/plain; charset=utf-8', b'Not found\n', None, send_body)
+
+    def _send(self, status, content_type, body, etag, send_body, content_encoding=None):
+        # Conditional request: answer with 304 if the client already has this version
+        if etag is not None and self._etag_matches(etag):
+            self.server.radar_server.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', '"' + etag + '"')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', '"' + etag + '"')
+            self.send_header('Cache-Control', 'no-cache')  # Always revalidate, 304 is cheap
+            self.send_header('Vary', 'Accept-Encoding')
+        if content_encoding:
+            self.send_header('Content-Encoding', content_encoding)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _etag_matches(self, etag):
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        candidates = [tag.strip() for tag in header.split(',')]
+        return any(tag.removeprefix('W/').strip('"') == etag for tag in candidates)
+
+
+# ---------- RadarServer class ----------
+class RadarServer:
+    INDEX_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Radar</title>
+<style>body{margin:0;background:#000}img{display:block;margin:auto;max-width:100%}</style>
+</head><body><img id="radar" src="/radar.png">
+<script>setInterval(function(){document.getElementById('radar').src='/radar.png?'+Date.now();},60000);</script>
+</body></html>
+"""
+
+    def __init__(self, host='0.0.0.0', port=8080, history_length=12, radar=None):
+        """Initialize the server (call start() to begin serving)
+
+        Args:
+            host: Interface to listen on ('0.0.0.0' = all interfaces)
+            port: TCP port
+            history_length: Number of recent frames kept in memory
+            radar: Optional RadarProcessor used to render /tiles/<z>/<x>/<y>.png on demand
+        """
+        self.host = host
+        self.port = int(port)
+        self.radar = radar
+
+        # Encoded frames, newest last - each frame is encoded exactly once
+        self.frames = deque(maxlen=history_length)
+        self.analysis = None    # Latest analysis document (plain and gzipped JSON)
+        self._lock = threading.Lock()
+
+        # WebP is optional in some Pillow builds
+        self.webp_supported = features.check('webp')
+
+        # Server statistics
+        self.stats = {'requests': 0, 'not_modified': 0, 'frames_published': 0}
+
+        self.httpd = None
+        self.thread = None
+
+    def count(self, name):
+        """Increment a statistics counter (thread-safe)."""
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def publish_frame(self, image, timestamp=None, analysis=None):
+        """Encode a new composited radar image once and make it available to all clients.
+
+        Args:
+            image: PIL image of the composited radar map
+            timestamp: datetime of the radar frame (shown in /history)
+            analysis: Optional dict with analysis results (see RadarProcessor.get_analysis)
+        """
+        rgb_image = image.convert('RGB')  # Map is opaque, RGB encodes smaller
+
+        buf = io.BytesIO()
+        rgb_image.save(buf, format='PNG', compress_level=6)
+        png = buf.getvalue()
+
+        webp = None
+        if self.webp_supported:
+            buf = io.BytesIO()
+            rgb_image.save(buf, format='WEBP', quality=85, method=4)
+            webp = buf.getvalue()
+
+        frame = {
+            'timestamp': timestamp.isoformat() if timestamp is not None else None,
+            'published': time.time(),
+            'etag': hashlib.sha1(png).hexdigest()[:20],
+            'png': png,
+            'webp': webp,
+        }
+        with self._lock:
+            self.frames.append(frame)
+            self.stats['frames_published'] += 1
+
+        if analysis is not None:
+            self.publish_analysis(analysis)
+
+    def publish_analysis(self, analysis):
+        """Serialize and compress analysis results once for all clients."""
+        body = json.dumps(analysis, separators=(',', ':')).encode('utf-8')
+        document = {
+            'etag': hashlib.sha1(body).hexdigest()[:20],
+            'json': body,
+            'gzip': gzip.compress(body, compresslevel=6),
+        }
+        with self._lock:
+            self.analysis = document
+
+    def get_frame(self, index=0):
+        """Return an encoded frame, index 0 = newest, or None if not available."""
+        with self._lock:
+            if 0 <= index < len(self.frames):
+                return self.frames[-1 - index]
+        return None
+
+    def get_analysis_document(self):
+        """Return the latest analysis document, or None."""
+        with self._lock:
+            return self.analysis
+
+    def get_history_document(self):
+        """Build the /history listing (small, so it is serialized per request)."""
+        with self._lock:
+            frames = list(self.frames)
+        listing = [{'index': i, 'timestamp': frame['timestamp'], 'etag': frame['etag']}
+                   for i, frame in enumerate(reversed(frames))]
+        body = json.dumps(listing, separators=(',', ':')).encode('utf-8')
+        return {'etag': hashlib.sha1(body).hexdigest()[:20], 'json': body,
+                'gzip': gzip.compress(body, compresslevel=6)}
+
+    def start(self):
+        """Start serving in a background thread (one thread per client connection)."""
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _RadarRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.radar_server = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='RadarServer', daemon=True)
+        self.thread.start()
+        # Port 0 lets the OS choose a free port
+        print(f"Radar server listening on http://{self.host}:{self.httpd.server_address[1]}/")
+
+    def stop(self):
+        """Stop the HTTP server."""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def main():
+    """Headless mode: download, render and serve the radar without a GUI."""
+    from RadarProcessor import RadarProcessor
+
+    parser = argparse.ArgumentParser(description="Serve rendered DWD radar frames over HTTP")
+    parser.add_argument('--port', type=int, default=8080, help="TCP port (default 8080)")
+    parser.add_argument('--history', type=int, default=12, help="Number of frames kept in memory")
+    parser.add_argument('--background', default='esri_topo', help="Map background type")
+    parser.add_argument('--zoom', type=int, default=11, help="Zoom level [8-12]")
+    parser.add_argument('--lon', type=float, default=8.862, help="Center longitude")
+    parser.add_argument('--lat', type=float, default=48.806, help="Center latitude")
+    parser.add_argument('--local', action='store_true', help="Use composite_hx_test.hd5 instead of DWD")
+    parser.add_argument('--preset', default='quality', help="Render preset: fast, balanced or quality")
+    parser.add_argument('--archive', help="Keep every frame in this radar archive directory")
+    args = parser.parse_args()
+
+    radar = RadarProcessor(satellite_source=args.background, zoom_level=args.zoom,
+                           center_lon=args.lon, center_lat=args.lat, render_preset=args.preset,
+                           archive_dir=args.archive)
+    server = RadarServer(port=args.port, history_length=args.history, radar=radar)
+    server.start()
+
+    def render_and_publish():
+        image = radar.create_smooth_heatmap_grid(sigma=1.5)
+        server.publish_frame(image, radar.data_time, radar.get_analysis())
+
+    if radar.load_and_process_data(use_local=args.local):
+        render_and_publish()
+
+    try:
+        while True:
+            time.sleep(60)
+            if args.local:
+                continue
+            has_new_data, server_modified = radar.check_for_new_data()
+            if has_new_data and radar.load_and_process_data(use_local=False, server_modified=server_modified):
+                if not radar.last_load_skipped:
+                    render_and_publish()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        if radar.archive:
+            radar.archive.close()
+
+
+if __name__ == '__main__':
+    main()
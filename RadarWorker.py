@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+"""
+RadarWorker class - runs RadarProcessor in a separate process
+Decoding, blurring and compositing the radar competes with Tk for the GIL when it
+runs in the GUI process, which makes the clock tick stutter. The worker process
+writes finished RGBA frames into a shared memory double buffer; the GUI process
+reads the latest complete frame without copying or pickling it.
+"""
+import time
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from PIL import Image
+from RadarProcessor import RadarProcessor
+
+
+# Shared memory layout: 64 byte header followed by two RGBA frame buffers
+HEADER_BYTES = 64
+HDR_SEQUENCE = 0    # Number of the last complete frame (frame n lives in buffer n % 2)
+HDR_WIDTH = 1       # Frame width in pixels
+HDR_HEIGHT = 2      # Frame height in pixels
+HDR_HEARTBEAT = 3   # Last sign of life from the worker (time.time() in ms)
+HDR_PRESET = 4      # Requested render preset (index into RENDER_PRESETS + 1, 0 = keep)
+
+PRESET_NAMES = list(RadarProcessor.RENDER_PRESETS)
+
+
+def _attach_shared_memory(name):
+    """Attach to an existing shared memory block without registering it for cleanup.
+
+    The creating process owns the block; a worker that exits (or crashes) must not unlink it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _frame_views(shm, width, height):
+    """Return numpy views on the header and both frame buffers of the shared memory block."""
+    header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=shm.buf)
+    frame_bytes = width * height * 4
+    buffers = [np.ndarray((height, width, 4), dtype=np.uint8, buffer=shm.buf,
+                          offset=HEADER_BYTES + i * frame_bytes)
+               for i in range(2)]
+    return header, buffers
+
+
+def _worker_main(shm_name, radar_config, sigma, check_interval, use_local, metadata_queue, stop_event):
+    """Entry point of the worker process: load, render and publish frames until stopped.
+
+    Args:
+        shm_name: Name of the shared memory block created by RadarWorker
+        radar_config: Keyword arguments for RadarProcessor
+        sigma: Gaussian blur strength used for rendering
+        check_interval: Seconds between checks for new DWD data
+        use_local: Use composite_hx_test.hd5 instead of downloading
+        metadata_queue: Queue for small per-frame metadata (time, analysis, dirty regions)
+        stop_event: Set by the GUI process to end the worker
+    """
+    shm = _attach_shared_memory(shm_name)
+    width = radar_config.get('image_width_pixels', 512)
+    height = radar_config.get('image_height_pixels', 512)
+    header, buffers = _frame_views(shm, width, height)
+
+    def heartbeat():
+        header[HDR_HEARTBEAT] = int(time.time() * 1000)
+
+    def render_and_publish():
+        requested = int(header[HDR_PRESET])
+        if requested:
+            radar.set_render_preset(PRESET_NAMES[requested - 1])
+        image = radar.create_smooth_heatmap_grid(sigma=sigma)
+        # Continue the sequence of a previous (crashed) worker
+        sequence = int(header[HDR_SEQUENCE]) + 1
+        np.copyto(buffers[sequence % 2], np.asarray(image))
+        image.close()
+        header[HDR_SEQUENCE] = sequence  # Publish only after the buffer is complete
+        metadata_queue.put({
+            'sequence': sequence,
+            'data_time': radar.data_time,
+            'dirty_rects': radar.get_dirty_rects(),
+            'analysis': radar.get_analysis(),
+            'stage_timings': dict(radar.stage_timings),
+        })
+
+    try:
+        heartbeat()
+        radar = RadarProcessor(**radar_config)
+        if radar.load_and_process_data(use_local=use_local):
+            render_and_publish()
+
+        while not stop_event.is_set():
+            heartbeat()
+            if stop_event.wait(check_interval):
+                break
+            heartbeat()
+            if use_local:
+                continue
+            has_new_data, server_modified = radar.check_for_new_data()
+            if has_new_data and radar.load_and_process_data(use_local=False, server_modified=server_modified):
+                if not radar.last_load_skipped:
+                    render_and_publish()
+    except KeyboardInterrupt:
+        pass  # Ctrl+C reaches the whole process group, the GUI process handles it
+    finally:
+        del header, buffers  # Release the views before closing the mapping
+        shm.close()
+
+
+# ---------- RadarWorker class ----------
+class RadarWorker:
+    def __init__(self, radar_config, sigma=1.5, check_interval=60, use_local=False,
+                 heartbeat_timeout=300, max_restarts=10):
+        """Initialize the worker (call start() to launch the process)
+
+        Args:
+            radar_config: Keyword arguments for RadarProcessor (image size must be included
+                          if it differs from the 512x512 default)
+            sigma: Gaussian blur strength used for rendering
+            check_interval: Seconds between checks for new DWD data
+            use_local: Use composite_hx_test.hd5 instead of downloading
+            heartbeat_timeout: Seconds without a heartbeat before the worker is considered hung
+            max_restarts: Restarts allowed before giving up (counter resets after every good frame)
+        """
+        self.radar_config = dict(radar_config)
+        self.sigma = sigma
+        self.check_interval = check_interval
+        self.use_local = use_local
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_restarts = max_restarts
+
+        self.width = self.radar_config.get('image_width_pixels', 512)
+        self.height = self.radar_config.get('image_height_pixels', 512)
+
+        # Spawn a fresh interpreter - do not inherit Tk, GPIO or MQTT state from the GUI process
+        self._context = multiprocessing.get_context('spawn')
+        self.shm = None
+        self.process = None
+        self._metadata_queue = None
+        self._stop_event = None
+
+        self._last_sequence = 0     # Last frame handed to the GUI
+        self._metadata = {}         # Metadata of recent frames by sequence number
+        self.restart_count = 0
+        self._failed_restarts = 0
+        self.stats = {'frames_received': 0, 'frames_dropped': 0, 'restarts': 0}
+
+    def start(self):
+        """Create the shared memory double buffer and launch the worker process."""
+        size = HEADER_BYTES + 2 * self.width * self.height * 4
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self._header, self._buffers = _frame_views(self.shm, self.width, self.height)
+        self._header[:] = 0
+        self._header[HDR_WIDTH] = self.width
+        self._header[HDR_HEIGHT] = self.height
+        self._launch()
+
+    def _launch(self):
+        """Start a new worker process attached to the existing shared memory."""
+        self._metadata_queue = self._context.Queue()
+        self._stop_event = self._context.Event()
+        self._header[HDR_HEARTBEAT] = int(time.time() * 1000)
+        self.process = self._context.Process(
+            target=_worker_main,
+            args=(self.shm.name, self.radar_config, self.sigma, self.check_interval,
+                  self.use_local, self._metadata_queue, self._stop_event),
+            name='RadarWorker', daemon=True)
+        self.process.start()
+
+    def _check_worker(self):
+        """Restart the worker if it died or stopped sending heartbeats."""
+        heartbeat_age = time.time() - self._header[HDR_HEARTBEAT] / 1000.0
+        if self.process.is_alive() and heartbeat_age < self.heartbeat_timeout:
+            return
+
+        if self._failed_restarts >= self.max_restarts:
+            return  # Keep showing the last frame rather than restarting forever
+        if self.process.is_alive():
+            print(f"Radar worker hung (no heartbeat for {heartbeat_age:.0f} s), restarting")
+            self.process.terminate()
+        else:
+            print(f"Radar worker exited with code {self.process.exitcode}, restarting")
+        self.process.join(timeout=5)
+        self.restart_count += 1
+        self._failed_restarts += 1
+        self.stats['restarts'] += 1
+        self._launch()
+
+    def poll(self):
+        """Return the newest complete frame if there is one the GUI has not seen yet.
+
+        Call from the GUI thread. Also restarts a crashed or hung worker.
+
+        Returns:
+            dict: {'image': PIL RGBA image backed by shared memory, 'sequence': int,
+                   'dirty_rects': list of (x0, y0, x1, y1) or None for a full redraw,
+                   'data_time': datetime, 'analysis': dict, 'stage_timings': dict}
+            or None if nothing is new.
+            The image is only valid until the next poll() - convert it right away.
+        """
+        if self.process is None:
+            return None
+        self._check_worker()
+
+        # Collect metadata of finished frames (small dicts only, never pixels)
+        while True:
+            try:
+                metadata = self._metadata_queue.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                break
+            self._metadata[metadata['sequence']] = metadata
+
+        sequence = int(self._header[HDR_SEQUENCE])
+        if sequence == self._last_sequence:
+            return None
+        metadata = self._metadata.get(sequence)
+        if metadata is None:
+            return None  # Pixels are ready but the metadata is still in transit
+
+        image = Image.frombuffer('RGBA', (self.width, self.height), self._buffers[sequence % 2],
+                                 'raw', 'RGBA', 0, 1)
+
+        # Dirty regions are relative to the previous frame - only usable if none were missed
+        dirty_rects = metadata['dirty_rects'] if sequence == self._last_sequence + 1 else None
+        self.stats['frames_dropped'] += max(0, sequence - self._last_sequence - 1)
+        self.stats['frames_received'] += 1
+        self._last_sequence = sequence
+        self._failed_restarts = 0
+        self._metadata = {s: m for s, m in self._metadata.items() if s > sequence}
+
+        return {'image': image, 'sequence': sequence, 'dirty_rects': dirty_rects,
+                'data_time': metadata['data_time'], 'analysis': metadata['analysis'],
+                'stage_timings': metadata['stage_timings']}
+
+    def set_render_preset(self, name):
+        """Ask the worker to use another render preset from its next frame on.
+
+        Returns:
+            bool: True if the preset is known
+        """
+        if name not in PRESET_NAMES or self.shm is None:
+            return False
+        self._header[HDR_PRESET] = PRESET_NAMES.index(name) + 1
+        return True
+
+    def stop(self):
+        """Stop the worker process and release the shared memory."""
+        if self.process is not None:
+            self._stop_event.set()
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=5)
+            self.process = None
+        if self.shm is not None:
+            del self._header, self._buffers
+            self.shm.close()  # Frames from poll() are views on the buffers - the GUI does not keep them
+            self.shm.unlink()
+            self.shm = None
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+"""
+RenderGovernor class - thermal and load aware pacing of the weather clock
+A Pi in a closed frame behind the display throttles in summer. The governor samples
+the SoC temperature, the system load and the measured radar stage timings, and
+chooses the radar render preset, the clock tick interval and the MQTT poll interval
+within configured bounds. All system files are read relative to sysfs_root, so the
+governor can be tested against a fake directory tree.
+"""
+import os
+import glob
+
+
+# ---------- RenderGovernor class ----------
+class RenderGovernor:
+    # Render preset per pressure level (0 = relaxed, 1 = warm/busy, 2 = hot/overloaded)
+    LEVEL_PRESETS = ('quality', 'balanced', 'fast')
+
+    def __init__(self, sysfs_root='/', temp_warm=65.0, temp_hot=75.0, temp_hysteresis=5.0,
+                 load_busy=None, render_budget_ms=1500.0,
+                 tick_interval_bounds=(100, 500), mqtt_poll_bounds=(100, 1000),
+                 base_preset='quality'):
+        """Initialize the governor
+
+        Args:
+            sysfs_root: Root directory for /sys/class/thermal and /proc/loadavg ('/' on the Pi)
+            temp_warm: SoC temperature (deg C) from which level 1 is used
+            temp_hot: SoC temperature (deg C) from which level 2 is used
+            temp_hysteresis: A level is only left when the temperature is this much below its threshold
+            load_busy: 1-minute load average for level 1 (level 2 at twice the value),
+                       None = number of CPU cores
+            render_budget_ms: Radar render time above which at least level 1 is used
+            tick_interval_bounds: (min, max) clock tick interval in ms
+            mqtt_poll_bounds: (min, max) MQTT poll interval in ms
+            base_preset: Render preset used at level 0, higher levels step down from it
+        """
+        self.sysfs_root = sysfs_root
+        self.temp_warm = temp_warm
+        self.temp_hot = temp_hot
+        self.temp_hysteresis = temp_hysteresis
+        self.load_busy = load_busy if load_busy is not None else float(os.cpu_count() or 1)
+        self.render_budget_ms = render_budget_ms
+        self.tick_interval_bounds = tick_interval_bounds
+        self.mqtt_poll_bounds = mqtt_poll_bounds
+        start = self.LEVEL_PRESETS.index(base_preset) if base_preset in self.LEVEL_PRESETS else 0
+        self.presets = tuple(self.LEVEL_PRESETS[min(start + level, len(self.LEVEL_PRESETS) - 1)]
+                             for level in range(len(self.LEVEL_PRESETS)))
+
+        self.level = 0
+        self.temperature = None   # Last sampled temperature (deg C), None if not available
+        self.load = None          # Last sampled 1-minute load average
+        self.level_changes = 0
+
+    def read_temperature(self):
+        """Return the highest temperature of all thermal zones in deg C, or None."""
+        pattern = os.path.join(self.sysfs_root, 'sys', 'class', 'thermal', 'thermal_zone*', 'temp')
+        temperatures = []
+        for path in glob.glob(pattern):
+            try:
+                with open(path) as f:
+                    temperatures.append(int(f.read().strip()) / 1000.0)  # Millidegrees
+            except (OSError, ValueError):
+                continue  # Zone without a readable sensor
+        return max(temperatures) if temperatures else None
+
+    def read_load(self):
+        """Return the 1-minute load average, or None."""
+        try:
+            with open(os.path.join(self.sysfs_root, 'proc', 'loadavg')) as f:
+                return float(f.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _temperature_level(self, temperature):
+        """Pressure level from the temperature, with hysteresis against the current level."""
+        if temperature is None:
+            return 0
+        thresholds = (self.temp_warm, self.temp_hot)
+        level = sum(1 for threshold in thresholds if temperature >= threshold)
+        # Stay on a higher level until cooled down below threshold - hysteresis
+        while level < self.level and temperature >= thresholds[level] - self.temp_hysteresis:
+            level += 1
+        return level
+
+    def _interval(self, bounds):
+        """Interpolate an interval between its bounds according to the current level."""
+        low, high = bounds
+        return int(round(low + (high - low) * self.level / (len(self.presets) - 1)))
+
+    def update(self, stage_timings=None):
+        """Sample temperature and load and recompute the settings.
+
+        Args:
+            stage_timings: Last radar stage timings in ms (RadarProcessor.stage_timings)
+
+        Returns:
+            dict: 'level', 'preset', 'tick_interval', 'mqtt_poll_interval' (ms),
+                  'temperature', 'load', 'changed' (True if the level changed)
+        """
+        self.temperature = self.read_temperature()
+        self.load = self.read_load()
+
+        level = self._temperature_level(self.temperature)
+        if self.load is not None:
+            if self.load >= 2 * self.load_busy:
+                level = max(level, 2)
+            elif self.load >= self.load_busy:
+                level = max(level, 1)
+        if stage_timings and stage_timings.get('render', 0.0) > self.render_budget_ms:
+            level = max(level, 1)
+        level = min(level, len(self.presets) - 1)
+
+        changed = level != self.level
+        if changed:
+            self.level = level
+            self.level_changes += 1
+        return self.get_settings(changed)
+
+    def get_settings(self, changed=False):
+        """Return the settings for the current level (see update)."""
+        return {
+            'level': self.level,
+            'preset': self.presets[self.level],
+            'tick_interval': self._interval(self.tick_interval_bounds),
+            'mqtt_poll_interval': self._interval(self.mqtt_poll_bounds),
+            'temperature': self.temperature,
+            'load': self.load,
+            'changed': changed,
+        }
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+"""
+SensorHistory class - time based history of the MQTT values, persisted in memory-mapped files
+Every topic (value slot) gets one file with three NumPy rings: the raw samples
+(6 hours at up to one sample per second), 5-minute buckets for 7 days and hourly
+buckets for a year. Buckets hold mean, minimum, maximum and sample count and are
+closed on the fly while appending, so an append is O(1) and a range query is a
+searchsorted on the time column. The open buckets and the ring positions live in the
+file header, the history survives restarts.
+
+The files are memory-mapped: an append only touches the page cache, the kernel's
+writeback coalesces many samples into one page write. msync is called at most every
+flush_interval seconds (and on close) to keep SD card writes in batches.
+"""
+import os
+import time
+import numpy as np
+
+
+# Ring record of the raw samples
+RAW_DTYPE = np.dtype([('time', '<f8'), ('value', '<f4')])
+# Ring record of a closed bucket: bucket start time, mean, min, max and number of samples
+BUCKET_DTYPE = np.dtype([('time', '<f8'), ('value', '<f4'), ('min', '<f4'), ('max', '<f4'), ('count', '<u4')])
+
+# Tiers: (name, bucket width in seconds (0 = raw samples), ring capacity, time span served by the tier)
+TIERS = (
+    ('raw', 0, 6 * 3600, 6 * 3600),
+    ('5min', 300, 7 * 288, 7 * 86400),
+    ('hour', 3600, 366 * 24, 366 * 86400),
+)
+
+HEADER_MAGIC = b'SHST'
+HEADER_VERSION = 1
+# File header: ring positions per tier and the open buckets of the aggregated tiers
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'), ('version', '<u4'),
+    ('capacity', '<i8', 3), ('head', '<i8', 3), ('count', '<i8', 3),
+    ('bucket_start', '<f8', 2), ('bucket_sum', '<f8', 2), ('bucket_min', '<f8', 2),
+    ('bucket_max', '<f8', 2), ('bucket_count', '<i8', 2),
+])
+HEADER_SIZE = 256
+
+
+# ---------- Series of one value slot ----------
+class _Series:
+    def __init__(self, path, capacities):
+        """Open (or create) the history file of one slot."""
+        self.path = path
+        sizes = [capacities[0] * RAW_DTYPE.itemsize] + [c * BUCKET_DTYPE.itemsize for c in capacities[1:]]
+        file_size = HEADER_SIZE + sum(sizes)
+
+        header = None
+        if os.path.exists(path) and os.path.getsize(path) == file_size:
+            header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)[0]
+            if (header['magic'] != HEADER_MAGIC or header['version'] != HEADER_VERSION
+                    or list(header['capacity']) != list(capacities)):
+                header = None
+        if header is None:
+            if os.path.exists(path):
+                print(f"Sensor history {path} has another layout, starting a new one")
+            with open(path, 'wb') as f:
+                f.truncate(file_size)  # Sparse zero file, rings are empty
+            self.mm = np.memmap(path, dtype=np.uint8, mode='r+', shape=(file_size,))
+            self.header = self.mm[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)
+            self.header['magic'] = HEADER_MAGIC
+            self.header['version'] = HEADER_VERSION
+            self.header['capacity'] = capacities
+            self.header['bucket_start'] = np.nan
+        else:
+            self.mm = np.memmap(path, dtype=np.uint8, mode='r+', shape=(file_size,))
+            self.header = self.mm[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)
+
+        # Views of the rings inside the mapping
+        self.rings = []
+        offset = HEADER_SIZE
+        for size, dtype in zip(sizes, (RAW_DTYPE, BUCKET_DTYPE, BUCKET_DTYPE)):
+            self.rings.append(self.mm[offset:offset + size].view(dtype))
+            offset += size
+        self.h = self.header[0]  # Scalar view: field access without array indexing overhead
+
+    def push(self, tier, record):
+        """Append a record to a ring, overwriting the oldest one when full (O(1))."""
+        h = self.h
+        head = h['head'][tier]
+        self.rings[tier][head] = record
+        h['head'][tier] = (head + 1) % h['capacity'][tier]
+        if h['count'][tier] < h['capacity'][tier]:
+            h['count'][tier] += 1
+
+    def newest(self, tier):
+        """Newest record of a ring, None if empty."""
+        h = self.h
+        if h['count'][tier] == 0:
+            return None
+        return self.rings[tier][(h['head'][tier] - 1) % h['capacity'][tier]]
+
+    def oldest_time(self, tier):
+        """Time of the oldest record of a ring, None if empty."""
+        h = self.h
+        if h['count'][tier] == 0:
+            return None
+        index = h['head'][tier] if h['count'][tier] == h['capacity'][tier] else 0
+        return float(self.rings[tier]['time'][index])
+
+    def halves(self, tier):
+        """Records of a ring as two sorted views, older half first (no copy)."""
+        h = self.h
+        ring = self.rings[tier]
+        count, head = int(h['count'][tier]), int(h['head'][tier])
+        if count < len(ring):
+            return ring[:0], ring[:count]
+        return ring[head:], ring[:head]
+
+
+# ---------- SensorHistory class ----------
+class SensorHistory:
+    def __init__(self, directory='history', raw_capacity=TIERS[0][2], flush_interval=300):
+        """Open (or create) a history directory
+
+        Args:
+            directory: Directory holding one .hist file per value slot
+            raw_capacity: Raw samples per slot (default 6 h at one sample per second;
+                          faster slots keep a shorter raw window, the buckets are complete)
+            flush_interval: Seconds between msync calls of the files (0 = after every append)
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.capacities = [raw_capacity] + [capacity for _, _, capacity, _ in TIERS[1:]]
+        self.flush_interval = flush_interval
+        self._series = {}
+        self._last_flush = time.monotonic()
+        self.stats = {'samples': 0, 'rejected': 0, 'buckets_closed': 0, 'flushes': 0}
+
+    def _get(self, name, create):
+        series = self._series.get(name)
+        if series is None:
+            path = os.path.join(self.directory, name + '.hist')
+            if not create and not os.path.exists(path):
+                return None
+            series = _Series(path, self.capacities)
+            self._series[name] = series
+        return series
+
+    def append(self, name, value, when=None):
+        """Record a sample (O(1)).
+
+        Args:
+            name: Value slot, e.g. 'pressure'
+            value: Number
+            when: Epoch seconds, None = now
+
+        Returns:
+            tuple: Names of the tiers in which a bucket closed ('5min', 'hour'), usually empty
+        """
+        when = time.time() if when is None else float(when)
+        value = float(value)
+        series = self._get(name, create=True)
+        last = series.newest(0)
+        if not np.isfinite(value) or (last is not None and when < last['time']):
+            self.stats['rejected'] += 1  # NaN/inf or clock stepped back
+            return ()
+        series.push(0, (when, value))
+        self.stats['samples'] += 1
+
+        closed = []
+        h = series.h
+        for tier in (1, 2):
+            width = TIERS[tier][1]
+            bucket = when - when % width
+            i = tier - 1
+            if h['bucket_start'][i] != bucket:  # Also true for NaN = no open bucket
+                if h['bucket_count'][i] > 0:
+                    count = h['bucket_count'][i]
+                    series.push(tier, (h['bucket_start'][i], h['bucket_sum'][i] / count,
+                                       h['bucket_min'][i], h['bucket_max'][i], count))
+                    closed.append(TIERS[tier][0])
+                    self.stats['buckets_closed'] += 1
+                h['bucket_start'][i] = bucket
+                h['bucket_sum'][i] = 0.0
+                h['bucket_min'][i] = value
+                h['bucket_max'][i] = value
+                h['bucket_count'][i] = 0
+            h['bucket_sum'][i] += value
+            if value < h['bucket_min'][i]:
+                h['bucket_min'][i] = value
+            if value > h['bucket_max'][i]:
+                h['bucket_max'][i] = value
+            h['bucket_count'][i] += 1
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        return tuple(closed)
+
+    def query(self, name, start=None, end=None, tier=None):
+        """Samples or buckets of a slot in [start, end] (vectorized).
+
+        Args:
+            name: Value slot
+            start, end: Epoch seconds, None = open end
+            tier: 'raw', '5min' or 'hour', None = finest tier that covers start
+
+        Returns:
+            NumPy structured array, oldest first: 'time' and 'value' (raw), plus 'min',
+            'max' and 'count' for buckets (time = bucket start). Empty if there is no data.
+        """
+        series = self._get(name, create=False)
+        if tier is None:
+            tier = self.tier_for(name, start)
+        index = [t[0] for t in TIERS].index(tier)
+        if series is None:
+            return np.zeros(0, dtype=RAW_DTYPE if index == 0 else BUCKET_DTYPE)
+        # Search both halves of the ring in place, only the matching records are copied
+        parts = []
+        for records in series.halves(index):
+            times = records['time']
+            first = 0 if start is None else np.searchsorted(times, start, side='left')
+            last = len(records) if end is None else np.searchsorted(times, end, side='right')
+            parts.append(records[first:last])
+        return np.concatenate(parts)
+
+    def tier_for(self, name, start):
+        """Name of the finest tier whose ring reaches back to start (None = all data)."""
+        series = self._get(name, create=False)
+        if start is None or series is None:
+            return TIERS[-1][0] if start is None else TIERS[0][0]
+        age = time.time() - start
+        for index, (tier, _, _, span) in enumerate(TIERS[:-1]):
+            oldest = series.oldest_time(index)
+            # Raw ring full of fast samples: it may span less than its nominal window
+            complete = series.h['count'][index] < series.h['capacity'][index]
+            if age <= span and (oldest is None or oldest <= start or complete):
+                return tier
+        return TIERS[-1][0]
+
+    def last(self, name):
+        """Newest raw sample as (time, value), None if there is none."""
+        series = self._get(name, create=False)
+        record = series.newest(0) if series is not None else None
+        if record is None:
+            return None
+        return float(record['time']), float(record['value'])
+
+    def names(self):
+        """Value slots with a history file."""
+        return sorted(filename[:-5] for filename in os.listdir(self.directory) if filename.endswith('.hist'))
+
+    def flush(self):
+        """Write the changed pages of all files to disk (msync)."""
+        for series in self._series.values():
+            series.mm.flush()
+        self._last_flush = time.monotonic()
+        self.stats['flushes'] += 1
+
+    def close(self):
+        """Flush all files and drop the mappings."""
+        self.flush()
+        self._series = {}  # The last views go away with the series, numpy unmaps the files
+
+    def report(self):
+        """Return a one-line summary of the counters."""
+        return (f"Sensor history: {len(self._series)} series, {self.stats['samples']} samples "
+                f"({self.stats['rejected']} rejected), {self.stats['buckets_closed']} buckets closed, "
+                f"{self.stats['flushes']} flushes")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""
+TopicRouter class - MQTT topic routing table of the weather clock
+Maps topics and wildcard patterns ('+' = one level, '#' = all remaining levels) to named
+value slots. Every message is looked up once (exact topics in a dict, patterns in a
+trie of topic levels, results cached per topic), its payload is parsed once with the
+route's parser (float, int, str or JSON) and the typed value is stored and handed to
+the route's handler. Parse failures are counted per slot instead of surfacing later
+as exceptions in a renderer. All routes are subscribed with one SUBSCRIBE packet.
+"""
+import json
+
+PARSERS = {
+    'float': float,
+    'int': int,
+    'str': lambda text: text,
+    'json': json.loads,
+}
+
+
+# ---------- TopicRouter class ----------
+class TopicRouter:
+    def __init__(self):
+        """Initialize an empty routing table (see add)"""
+        self._exact = {}     # topic -> list of routes
+        self._trie = {}      # level -> child node, key None = routes ending at this node
+        self._patterns = []  # (pattern, qos) in insertion order
+        self._cache = {}     # topic -> routes, filled by match()
+        self.values = {}     # slot name -> last parsed value
+        self.stats = {'messages': 0, 'unrouted': 0}
+        self.counts = {}     # slot name -> {'messages': n, 'failures': n}
+
+    def add(self, pattern, name, parser='float', handler=None, qos=0):
+        """Route a topic or wildcard pattern to a value slot.
+
+        Args:
+            pattern: Topic, may contain '+' and a trailing '#'
+            name: Slot name (values[name], handler argument)
+            parser: 'float', 'int', 'str', 'json' or a function str -> value
+            handler: Optional function(name, value, topic), called after the value is stored
+            qos: Subscription QoS
+        """
+        route = (name, PARSERS.get(parser, parser), handler)
+        if '+' in pattern or '#' in pattern:
+            node = self._trie
+            for level in pattern.split('/'):
+                node = node.setdefault(level, {})
+            node.setdefault(None, []).append(route)
+        else:
+            self._exact.setdefault(pattern, []).append(route)
+        if pattern not in (p for p, _ in self._patterns):
+            self._patterns.append((pattern, qos))
+        self.counts.setdefault(name, {'messages': 0, 'failures': 0})
+        self._cache.clear()
+
+    def subscriptions(self):
+        """Return [(pattern, qos), ...] for one batched client.subscribe() call."""
+        return list(self._patterns)
+
+    def match(self, topic):
+        """Return the routes of a topic (exact routes first, then matching patterns)."""
+        routes = self._cache.get(topic)
+        if routes is None:
+            routes = list(self._exact.get(topic, ()))
+            if self._trie:
+                levels = topic.split('/')
+                # Wildcards do not match system topics like $SYS/...
+                if not levels[0].startswith('$'):
+                    self._match_levels(self._trie, levels, 0, routes)
+            if len(self._cache) >= 1024:
+                self._cache.clear()  # Bound the cache against topic floods
+            self._cache[topic] = routes
+        return routes
+
+    def _match_levels(self, node, levels, index, routes):
+        if '#' in node:
+            routes.extend(node['#'].get(None, ()))  # 'a/#' also matches 'a'
+        if index == len(levels):
+            routes.extend(node.get(None, ()))
+            return
+        child = node.get(levels[index])
+        if child is not None:
+            self._match_levels(child, levels, index + 1, routes)
+        child = node.get('+')
+        if child is not None:
+            self._match_levels(child, levels, index + 1, routes)
+
+    def dispatch(self, topic, payload):
+        """Parse a message once per parser and deliver it to the matching slots.
+
+        Args:
+            topic: Message topic
+            payload: Message payload (bytes or str)
+
+        Returns:
+            int: Number of slots updated
+        """
+        self.stats['messages'] += 1
+        routes = self.match(topic)
+        if not routes:
+            self.stats['unrouted'] += 1
+            return 0
+        try:
+            text = payload.decode('utf-8') if isinstance(payload, (bytes, bytearray)) else payload
+        except UnicodeDecodeError:
+            text = None
+        parsed = {}  # parser -> value (or the exception) of this message
+        updated = 0
+        for name, parser, handler in routes:
+            counts = self.counts[name]
+            counts['messages'] += 1
+            if parser not in parsed:
+                try:
+                    if text is None:
+                        raise ValueError("payload is not UTF-8")
+                    parsed[parser] = parser(text)
+                except ValueError as e:  # json.JSONDecodeError is a ValueError, too
+                    parsed[parser] = e
+            value = parsed[parser]
+            if isinstance(value, ValueError):
+                counts['failures'] += 1
+                print(f"MQTT {topic}: payload {payload[:40]!r} not accepted for {name} ({value})")
+                continue
+            self.values[name] = value
+            if handler is not None:
+                handler(name, value, topic)
+            updated += 1
+        return updated
+
+    def report(self):
+        """Return a one-line summary of the counters."""
+        failures = {name: counts['failures'] for name, counts in self.counts.items() if counts['failures']}
+        return (f"MQTT router: {self.stats['messages']} messages, {self.stats['unrouted']} unrouted, "
+                f"parse failures {failures or 'none'}")
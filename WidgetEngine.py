@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+"""
+WidgetEngine class - declarative value tiles of the weather clock
+A tile is declared by position, size, background, static layers (labels, fixed icons)
+and a formatter that turns the current value into the dynamic layers. The static part
+is drawn once into a cached base image; an update copies the base into the tile's
+scratch image, draws only the value layers and pastes the result into the tile's
+existing PhotoImage, so the canvas item is created once and never replaced.
+All tiles share one change detection (set) and one Tk update path (refresh).
+
+set() only stores the value and marks the tile dirty; the GUI calls tick() at a fixed
+frame rate, which draws every dirty tile once. A burst of MQTT messages (the inverter
+publishes all power values at once, often several times per second) costs one render
+per tile and frame instead of one per message.
+
+Chart layers draw time series (e.g. 5-minute buckets of the SensorHistory) straight
+into a small RGBA NumPy buffer: the samples are decimated to one min/max pair per pixel
+column and the line/area is filled with boolean masks, no plotting library involved.
+NumPy is imported by the first chart, not before the window is shown.
+"""
+from collections import namedtuple
+from PIL import Image, ImageColor, ImageDraw
+
+# Layers of a tile, coordinates relative to the tile
+Text = namedtuple('Text', 'xy text size color')      # TrueType text of the asset font
+Digits = namedtuple('Digits', 'xy text size color')  # Digit string drawn from the GlyphAtlas
+Icon = namedtuple('Icon', 'name xy crop', defaults=(None,))  # Icon with alpha, crop = (l, t, r, b)
+# Time series chart: series drawn over [start, end), y range (low, high) or None = fit the data
+Chart = namedtuple('Chart', 'xy size start end series y_range', defaults=(None,))
+# One series of a chart: sample times with the low/high value of each sample (bucket min/max),
+# drawn as line or as area filled down to the bottom of the chart
+Series = namedtuple('Series', 'times low high color area', defaults=(False,))
+
+AREA_ALPHA = 96  # Opacity of the area below a series, the line itself is opaque
+
+_UNSET = object()  # Rendered value of a tile that was never drawn
+
+
+# ---------- Widget class ----------
+class Widget:
+    def __init__(self, name, x, y, size, background, static=(), layers=None, value=None):
+        """Declare a tile (see WidgetEngine.add)
+
+        Args:
+            name: Widget name, used for set() and as canvas tag
+            x, y: Canvas position of the tile frame, the image is placed at (x + 1, y + 1)
+            size: (width, height) of the image
+            background: Background color
+            static: Layers drawn once into the cached base image
+            layers: Formatter value -> list of dynamic layers, None for a static tile
+            value: Initial value (shown until the first set)
+        """
+        self.name = name
+        self.x = x
+        self.y = y
+        self.size = size
+        self.background = background
+        self.static = tuple(static)
+        self.layers = layers
+        self.value = value
+        self.rendered = _UNSET  # Value currently on screen
+        self.base = None        # Background + static layers
+        self.image = None       # Scratch image the tile is composed in
+        self.photo = None       # PhotoImage shown by the canvas item
+
+
+# ---------- WidgetEngine class ----------
+class WidgetEngine:
+    def __init__(self, canvas, assets, create_photo):
+        """Initialize the engine
+
+        Args:
+            canvas: Tk canvas the tiles are shown on
+            assets: AssetCache providing fonts, glyph atlases and icons
+            create_photo: Function PIL image -> PhotoImage or None (main thread check)
+        """
+        self.canvas = canvas
+        self.assets = assets
+        self.create_photo = create_photo
+        self.widgets = {}
+        self.dirty = set()  # Names of the tiles to draw at the next tick
+        self.stats = {'sets': 0, 'unchanged': 0, 'renders': 0, 'frames': 0}
+
+    def add(self, widget):
+        """Register a tile, it is drawn by the next tick() or refresh()."""
+        self.widgets[widget.name] = widget
+        self.dirty.add(widget.name)
+        return widget
+
+    def set(self, name, value):
+        """Store a new value of a tile and mark it dirty (nothing is drawn here).
+
+        Returns:
+            bool: True if the tile has to be redrawn
+        """
+        widget = self.widgets[name]
+        self.stats['sets'] += 1
+        widget.value = value
+        if value == widget.rendered:
+            self.stats['unchanged'] += 1
+            self.dirty.discard(name)  # Changed and changed back within one frame
+            return False
+        self.dirty.add(name)
+        return True
+
+    def get(self, name):
+        """Return the current value of a tile."""
+        return self.widgets[name].value
+
+    def is_dirty(self, name):
+        """True if the value of the tile differs from the one on screen."""
+        widget = self.widgets[name]
+        return widget.value != widget.rendered
+
+    def tick(self):
+        """Frame tick: draw each dirty tile once with its latest value (main thread only).
+
+        Returns:
+            int: Number of tiles drawn
+        """
+        if not self.dirty:
+            return 0
+        names, self.dirty = self.dirty, set()
+        self.stats['frames'] += 1
+        return self.refresh(names)
+
+    def refresh(self, names=None):
+        """Redraw the tiles whose value changed (main thread only).
+
+        Args:
+            names: Iterable of widget names, None = all tiles
+
+        Returns:
+            int: Number of tiles drawn
+        """
+        widgets = self.widgets.values() if names is None else (self.widgets[name] for name in names)
+        drawn = 0
+        for widget in widgets:
+            if widget.value == widget.rendered:
+                continue
+            try:
+                if self._render(widget):
+                    drawn += 1
+                    self.dirty.discard(widget.name)
+                else:
+                    self.dirty.add(widget.name)  # No PhotoImage (wrong thread), try again
+            except Exception as e:
+                # E.g. a malformed MQTT value - keep the old picture, the other tiles still update
+                print(f"Widget {widget.name} could not show {widget.value!r}: {e}")
+                widget.rendered = widget.value
+        return drawn
+
+    def invalidate(self):
+        """Redraw every tile at the next refresh (e.g. after the canvas was cleared)."""
+        for widget in self.widgets.values():
+            widget.rendered = _UNSET
+            widget.photo = None
+            self.dirty.add(widget.name)
+
+    def _render(self, widget):
+        if widget.base is None:
+            widget.base = Image.new("RGBA", widget.size, widget.background)
+            self._draw_layers(widget.base, widget.static)
+            widget.image = widget.base.copy()
+        else:
+            widget.image.paste(widget.base, (0, 0))  # Reset the scratch image, no allocation
+        if widget.layers is not None:
+            self._draw_layers(widget.image, widget.layers(widget.value))
+
+        if widget.photo is not None:
+            widget.photo.paste(widget.image)  # Same Tk image and canvas item, pixels replaced
+        else:
+            photo = self.create_photo(widget.image)
+            if photo is None:
+                return False
+            self.canvas.delete(widget.name)
+            self.canvas.create_image(widget.x + 1, widget.y + 1, anchor='nw', image=photo,
+                                     tags=(widget.name,))
+            widget.photo = photo  # prevent garbage collection
+        widget.rendered = widget.value
+        self.stats['renders'] += 1
+        return True
+
+    def _draw_layers(self, image, layers):
+        draw = None
+        for layer in layers:
+            if isinstance(layer, Icon):
+                icon = self.assets.icon(layer.name)
+                if icon is None:
+                    continue
+                if layer.crop is not None:
+                    icon = icon.crop(layer.crop)
+                image.paste(icon, layer.xy, icon)
+            elif isinstance(layer, Chart):
+                chart = Image.fromarray(render_chart(layer), 'RGBA')
+                image.paste(chart, layer.xy, chart)
+            elif isinstance(layer, Digits):
+                self.assets.atlas(layer.size).draw_text(image, layer.xy, layer.text, layer.color)
+            else:
+                if draw is None:
+                    draw = ImageDraw.Draw(image)
+                draw.text(layer.xy, layer.text, font=self.assets.font(layer.size), fill=layer.color)
+
+    def report(self):
+        """Return a one-line summary of the counters."""
+        return (f"Widgets: {len(self.widgets)} tiles, {self.stats['sets']} values received "
+                f"({self.stats['unchanged']} unchanged), {self.stats['renders']} renders "
+                f"in {self.stats['frames']} frames")
+
+
+# ---------- Charts ----------
+def decimate(times, low, high, start, end, width):
+    """Reduce samples to one min/max pair per pixel column (vectorized).
+
+    Args:
+        times: Sample times, ascending
+        low, high: Minimum and maximum of each sample (the same array for raw samples)
+        start, end: Time range mapped to the columns 0 .. width - 1
+        width: Number of columns
+
+    Returns:
+        tuple: (columns, minimum, maximum) of the columns that hold at least one sample
+    """
+    import numpy as np  # Deferred to the first chart
+    times = np.asarray(times, dtype=np.float64)
+    inside = (times >= start) & (times < end)
+    columns = ((times[inside] - start) * (width / (end - start))).astype(np.intp)
+    if len(columns) == 0:
+        empty = np.zeros(0)
+        return columns, empty, empty
+    # Times are sorted, so the samples of a column are one run: reduce each run at once
+    runs = np.flatnonzero(np.diff(columns, prepend=-1))
+    low = np.minimum.reduceat(np.asarray(low, dtype=np.float64)[inside], runs)
+    high = np.maximum.reduceat(np.asarray(high, dtype=np.float64)[inside], runs)
+    return columns[runs], low, high
+
+
+def render_chart(chart):
+    """Draw a Chart layer into an RGBA array of chart.size (transparent background).
+
+    Returns:
+        numpy.ndarray: (height, width, 4) uint8
+    """
+    import numpy as np  # Deferred to the first chart
+    width, height = chart.size
+    buffer = np.zeros((height, width, 4), dtype=np.uint8)
+    decimated = [(series, decimate(series.times, series.low, series.high, chart.start, chart.end, width))
+                 for series in chart.series]
+    if chart.y_range is not None:
+        y_low, y_high = chart.y_range
+    else:
+        lows = [low.min() for _, (_, low, _) in decimated if len(low)]
+        highs = [high.max() for _, (_, _, high) in decimated if len(high)]
+        if not lows:
+            return buffer
+        y_low, y_high = min(lows), max(highs)
+    if y_high <= y_low:
+        y_low, y_high = y_low - 0.5, y_high + 0.5  # Flat line in the middle
+    scale = (height - 1) / (y_high - y_low)
+    rows = np.arange(height)[:, None]
+
+    for series, (columns, low, high) in decimated:
+        if len(columns) == 0:
+            continue
+        # Pixel rows, row 0 at the top
+        top = np.clip(np.round((height - 1) - (high - y_low) * scale), 0, height - 1).astype(np.intp)
+        bottom = np.clip(np.round((height - 1) - (low - y_low) * scale), 0, height - 1).astype(np.intp)
+        color = ImageColor.getrgb(series.color)[:3]
+        target = buffer[:, columns]
+        if series.area:
+            target[rows > bottom] = color + (AREA_ALPHA,)  # Below the line down to the bottom edge
+        # Stretch each column to the previous one, so steep changes are drawn as a connected line
+        joined = np.flatnonzero(np.diff(columns) == 1) + 1
+        line_top, line_bottom = top.copy(), bottom.copy()
+        line_top[joined] = np.minimum(top[joined], bottom[joined - 1])
+        line_bottom[joined] = np.maximum(bottom[joined], top[joined - 1])
+        line = (rows >= line_top) & (rows <= line_bottom)
+        target[line] = color + (255,)
+        buffer[:, columns] = target
+    return buffer
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks for the radar rendering pipeline, using the bundled composite_hx_test.hd5
+
+Example: python3 ./benchmark.py workers --max-workers 4 --size 1024
+         python3 ./benchmark.py presets
+         python3 ./benchmark.py importtime
+         python3 ./benchmark.py text
+         python3 ./benchmark.py mqtt
+"""
+import argparse
+import glob
+import os
+import queue
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+# Modules imported before the weather clock window is shown, and the deferred heavy modules
+# with the point where they are loaded now
+STARTUP_MODULES = ['PIL.ImageTk', 'paho.mqtt.client', 'RenderGovernor', 'AssetCache', 'WidgetEngine',
+                   'TopicRouter', 'PressureTendency']
+DEFERRED_MODULES = ['SensorHistory', 'numpy', 'RadarProcessor', 'RadarWorker', 'RadarServer', 'requests',
+                    'h5py', 'pyproj', 'matplotlib.figure']
+
+
+def create_radar(size, **kwargs):
+    """Create a RadarProcessor with the simple background and load the bundled test file."""
+    from RadarProcessor import RadarProcessor
+
+    radar = RadarProcessor(satellite_source='simple', center_lon=8.862, center_lat=48.806,
+                           image_width_pixels=size, image_height_pixels=size, **kwargs)
+    if not radar.load_and_process_data(use_local=True):
+        raise SystemExit("Could not load composite_hx_test.hd5")
+    return radar
+
+
+def time_full_render(radar, sigma, repeats):
+    """Render the default viewport from scratch repeatedly.
+
+    Returns:
+        tuple: (median render time in ms, median blur time in ms, last image as bytes)
+    """
+    render_times = []
+    blur_times = []
+    image_bytes = None
+    for _ in range(repeats):
+        # Forget per-frame results so blur, colorize and the full composite run every time
+        radar._smoothed.clear()
+        radar.viewports['default']['output'] = None
+        start = time.perf_counter()
+        image = radar.create_smooth_heatmap_grid(sigma=sigma)
+        render_times.append((time.perf_counter() - start) * 1000.0)
+        blur_times.append(radar.stage_timings.get('blur', 0.0))
+        image_bytes = image.tobytes()
+        image.close()
+    return statistics.median(render_times), statistics.median(blur_times), image_bytes
+
+
+def benchmark_workers(args):
+    """Speed-up of banded blur/colorize/composite for 1..max_workers threads."""
+    radar = create_radar(args.size)
+    radar.create_smooth_heatmap_grid(sigma=args.sigma)  # Warm up background and remap caches
+
+    print(f"Output {args.size}x{args.size}, radar crop {radar.scaled_data.shape[1]}x{radar.scaled_data.shape[0]}, "
+          f"sigma {args.sigma}, {args.repeats} repeats, {os.cpu_count()} CPU cores")
+    print("workers  render ms  blur ms  speed-up  identical")
+    reference = None
+    single_ms = None
+    for workers in range(1, args.max_workers + 1):
+        radar.render_workers = workers
+        render_ms, blur_ms, image_bytes = time_full_render(radar, args.sigma, args.repeats)
+        if reference is None:
+            reference, single_ms = image_bytes, render_ms
+        print(f"{workers:7d}  {render_ms:9.1f}  {blur_ms:7.1f}  {single_ms / render_ms:7.2f}x  "
+              f"{'yes' if image_bytes == reference else 'NO'}")
+
+
+def benchmark_presets(args):
+    """Render time of every render preset (RadarProcessor.RENDER_PRESETS)."""
+    radar = create_radar(args.size, render_workers=args.workers)
+    radar.create_smooth_heatmap_grid(sigma=args.sigma)  # Warm up background and remap caches
+
+    print(f"Output {args.size}x{args.size}, radar crop {radar.scaled_data.shape[1]}x{radar.scaled_data.shape[0]}, "
+          f"sigma {args.sigma}, {args.repeats} repeats, {radar.render_workers} render workers")
+    print("preset    render ms  blur ms")
+    for name in radar.RENDER_PRESETS:
+        radar.set_render_preset(name)
+        render_ms, blur_ms, _ = time_full_render(radar, args.sigma, args.repeats)
+        print(f"{name:8s}  {render_ms:9.1f}  {blur_ms:7.1f}")
+
+
+def import_times(module):
+    """Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        tuple: (cumulative import time in ms, list of (ms, name) of its direct imports)
+    """
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=script_dir)
+    if result.returncode != 0:
+        return None, []
+    children = []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package" - nesting by 2 spaces
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 1:
+            children.append((int(cumulative) / 1000.0, name))
+        elif depth == 0:
+            if name == module:
+                return int(cumulative) / 1000.0, sorted(children, reverse=True)
+            children = []  # Imports of interpreter startup or a parent package
+    return 0.0, []  # Already imported by the interpreter itself
+
+
+def benchmark_importtime(args):
+    """Import time of the modules on and off the weather clock startup path (-X importtime)."""
+    print(f"Median of {args.repeats} fresh interpreters, python -X importtime")
+    for title, modules in (("Before the window is shown", STARTUP_MODULES),
+                           ("Deferred (history after the first paint, radar start, first download/ingest/render)",
+                            DEFERRED_MODULES)):
+        print(title)
+        print("  module              import ms  slowest imports")
+        total = 0.0
+        for module in modules:
+            times = []
+            children = []
+            for _ in range(args.repeats):
+                ms, children = import_times(module)
+                if ms is None:
+                    break
+                times.append(ms)
+            if not times:
+                print(f"  {module:18s}  not installed")
+                continue
+            median = statistics.median(times)
+            total += median
+            slowest = ', '.join(f"{name} {ms:.0f}" for ms, name in children[:3])
+            print(f"  {module:18s}  {median:9.1f}  {slowest}")
+        print(f"  {'sum':18s}  {total:9.1f}  (shared imports are counted per module)")
+
+    # A startup module importing a deferred one would undo the deferral
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    check = (f"import sys\nfor m in {STARTUP_MODULES!r}: __import__(m)\n"
+             f"print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, cwd=script_dir)
+    loaded = result.stdout.split() if result.returncode == 0 else None
+    if loaded is None:
+        print("Deferred modules loaded at startup: check failed")
+    else:
+        print(f"Deferred modules loaded at startup: {', '.join(loaded) or 'none'}")
+
+
+def benchmark_text(args):
+    """Per-update cost of the 125 pt clock/temperature text: draw.text versus the glyph atlas."""
+    from PIL import Image, ImageDraw
+    from AssetCache import AssetCache
+
+    assets = AssetCache(os.path.dirname(os.path.realpath(__file__)))
+    font = assets.font(args.size)
+    start = time.perf_counter()
+    atlas = assets.atlas(args.size)
+    print(f"Atlas of {len(atlas.charset)} glyphs built in {(time.perf_counter() - start) * 1000.0:.1f} ms")
+
+    # Every clock minute and the temperature range of the outdoor widget
+    strings = ([f"{hour:02d}:{minute:02d}" for hour in range(24) for minute in range(60)]
+               + [f"{value / 10.0:.1f}" for value in range(-300, 460)] + ["--.-"])
+    background = Image.new("RGBA", (351, 159), "#202020")
+    results = {}
+    for name, draw_text in (("draw.text", lambda image, text: ImageDraw.Draw(image).text((10, -10), text, font=font,
+                                                                                          fill="#ff8000")),
+                            ("atlas", lambda image, text: atlas.draw_text(image, (10, -10), text, "#ff8000"))):
+        images = []
+        times = []
+        for _ in range(args.repeats):
+            images = []
+            start = time.perf_counter()
+            for text in strings:
+                image = background.copy()
+                draw_text(image, text)
+                images.append(image)
+            times.append((time.perf_counter() - start) / len(strings))
+        # Cost of the copy, measured the same way, is left out of the text time
+        start = time.perf_counter()
+        for _ in strings:
+            background.copy()
+        copy_time = (time.perf_counter() - start) / len(strings)
+        results[name] = ((min(times) - copy_time) * 1e6, images)
+
+    base_us, base_images = results["draw.text"]
+    print(f"{len(strings)} strings, best of {args.repeats}")
+    print("  method       us/update  speed-up  identical")
+    for name, (us, images) in results.items():
+        identical = all(a.tobytes() == b.tobytes() for a, b in zip(images, base_images))
+        print(f"  {name:10s}  {us:10.1f}  {base_us / us:7.2f}x  {'yes' if identical else 'NO'}")
+
+
+class _FakeBroker:
+    """Minimal MQTT 3.1.1 broker stand-in on localhost (CONNECT, SUBSCRIBE, PINGREQ, PUBLISH QoS 0).
+
+    stop() closes the listening socket and all connections like a broker restart,
+    start() listens again on the same port.
+    """
+
+    def __init__(self, port=0):
+        self.port = port
+        self.server = None
+        self.connections = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('127.0.0.1', self.port))
+        self.port = self.server.getsockname()[1]
+        self.server.listen(4)
+        threading.Thread(target=self._accept, args=(self.server,), daemon=True).start()
+
+    def stop(self):
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)  # Wakes the thread blocked in accept()
+        except OSError:
+            pass
+        self.server.close()
+        with self._lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+
+    def publish(self, topic, payload):
+        topic = topic.encode('utf-8')
+        body = len(topic).to_bytes(2, 'big') + topic + payload
+        packet = b'\x30' + self._length(len(body)) + body
+        with self._lock:
+            for connection in self.connections:
+                try:
+                    connection.sendall(packet)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _length(length):
+        encoded = b''
+        while True:
+            byte, length = length % 128, length // 128
+            encoded += bytes([byte | (0x80 if length else 0)])
+            if not length:
+                return encoded
+
+    def _accept(self, server):
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return  # Listening socket closed (stop)
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        stream = connection.makefile('rb')
+        try:
+            while True:
+                header = stream.read(1)
+                if not header:
+                    return
+                length, shift = 0, 0
+                while True:
+                    byte = stream.read(1)[0]
+                    length |= (byte & 0x7f) << shift
+                    shift += 7
+                    if not byte & 0x80:
+                        break
+                body = stream.read(length)
+                kind = header[0] >> 4
+                if kind == 1:    # CONNECT -> CONNACK accepted
+                    connection.sendall(b'\x20\x02\x00\x00')
+                    with self._lock:
+                        self.connections.append(connection)
+                elif kind == 8:  # SUBSCRIBE -> SUBACK, QoS 0 for every filter
+                    count, position = 0, 2
+                    while position < len(body):
+                        position += 2 + int.from_bytes(body[position:position + 2], 'big') + 1
+                        count += 1
+                    connection.sendall(b'\x90' + self._length(2 + count) + body[:2] + b'\x00' * count)
+                elif kind == 12:  # PINGREQ -> PINGRESP
+                    connection.sendall(b'\xd0\x00')
+                elif kind == 14:  # DISCONNECT
+                    return
+        except (OSError, IndexError):
+            return
+        finally:
+            with self._lock:
+                if connection in self.connections:
+                    self.connections.remove(connection)
+            connection.close()
+
+
+def _context_switches():
+    """Voluntary context switches (= wakeups after sleeping) of all threads of this process."""
+    total = 0
+    for path in glob.glob('/proc/self/task/*/status'):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith('voluntary_ctxt_switches'):
+                        total += int(line.split()[1])
+        except OSError:
+            pass  # Thread ended meanwhile
+    return total
+
+
+def _legacy_mqtt_poll(mqtt, client, port, state):
+    """The former Tk-thread MQTT polling (condensed): client.loop() every 100 ms and
+    reconnects that sleep on the GUI thread.
+
+    Returns:
+        float: Seconds until the next poll
+    """
+    result = client.loop(timeout=0.01)
+    if result == mqtt.MQTT_ERR_SUCCESS:
+        return 0.1
+    connection_lost = result == mqtt.MQTT_ERR_CONN_LOST
+    if state['reconnects'] < (20 if connection_lost else 15):
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+        if connection_lost:
+            time.sleep(min(5.0, 2.0 + state['reconnects'] * 0.5))
+        else:
+            time.sleep(min(3.0, 1.0 + state['reconnects'] * 0.5))
+        try:
+            client.connect('127.0.0.1', port, keepalive=60)
+            state['reconnects'] += 1
+            return 5.0 if connection_lost else 3.0
+        except OSError:
+            state['reconnects'] += 1
+    return 2.0 if state['reconnects'] < 5 else 10.0
+
+
+def _run_mqtt_mode(mode, args):
+    """Connect a paho client in the given mode ('poll' or 'thread') to a fake broker,
+    measure idle wakeups, then restart the broker and measure how long the GUI thread blocks."""
+    import paho.mqtt.client as mqtt
+
+    broker = _FakeBroker()
+    broker.start()
+    received = queue.SimpleQueue()
+    connected = threading.Event()
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.on_connect = lambda client, userdata, flags, reason_code, properties: (
+        client.subscribe([('/bench/+', 0)]), connected.set(), state.update(reconnects=0))
+    client.on_disconnect = lambda client, userdata, flags, reason_code, properties: connected.clear()
+    client.on_message = lambda client, userdata, message: received.put((message.topic, message.payload))
+    state = {'reconnects': 0}
+
+    if mode == 'thread':
+        client.reconnect_delay_set(min_delay=1, max_delay=60)
+        client.connect_async('127.0.0.1', broker.port, keepalive=60)
+        client.loop_start()
+        gui_interval = 0.25  # Frame tick draining the queue
+
+        def gui_work():
+            while True:
+                try:
+                    received.get_nowait()
+                except queue.Empty:
+                    return gui_interval
+    else:
+        client.connect('127.0.0.1', broker.port, keepalive=60)
+
+        def gui_work():
+            interval = _legacy_mqtt_poll(mqtt, client, broker.port, state)
+            while True:
+                try:
+                    received.get_nowait()
+                except queue.Empty:
+                    return interval
+
+    # Simulated GUI event loop: only the MQTT related timer, blocking time of each call
+    blocked = []
+    stop = threading.Event()
+
+    def gui_loop():
+        next_time = time.perf_counter()
+        while not stop.is_set():
+            delay = next_time - time.perf_counter()
+            if delay > 0 and stop.wait(delay):
+                return
+            start = time.perf_counter()
+            interval = gui_work()
+            end = time.perf_counter()
+            blocked.append((start, end - start))
+            next_time = end + interval
+
+    gui = threading.Thread(target=gui_loop, daemon=True)
+    gui.start()
+    if not connected.wait(10.0):
+        stop.set()
+        broker.stop()
+        raise SystemExit(f"{mode}: no connection to the fake broker")
+    time.sleep(0.5)  # SUBACK
+
+    # Idle: nothing is published
+    switches = _context_switches()
+    time.sleep(args.idle)
+    wakeups = (_context_switches() - switches) / args.idle
+
+    # Broker restart
+    broker.stop()
+    restart = time.perf_counter()
+    time.sleep(args.downtime)
+    broker.start()
+    back = time.perf_counter()
+    reconnected = connected.wait(60.0)
+    reconnect_s = time.perf_counter() - back if reconnected else None
+
+    stop.set()
+    gui.join()  # Waits for a blocking call still in progress
+    outage = [duration for start, duration in blocked if start + duration >= restart]
+    client.disconnect()
+    if mode == 'thread':
+        client.loop_stop()
+    broker.stop()
+    return {'wakeups': wakeups, 'max_block_ms': max(outage, default=0.0) * 1000.0,
+            'blocked_ms': sum(outage) * 1000.0, 'reconnect_s': reconnect_s}
+
+
+def benchmark_mqtt(args):
+    """Tk-thread MQTT polling versus the MQTT network thread, against a local fake broker."""
+    print(f"Idle {args.idle:.0f} s, then broker restart with {args.downtime:.0f} s downtime")
+    print("  mode    wakeups/s  GUI max block ms  GUI blocked ms  reconnected after s")
+    for mode in ('poll', 'thread'):
+        result = _run_mqtt_mode(mode, args)
+        reconnect = f"{result['reconnect_s']:.1f}" if result['reconnect_s'] is not None else "no"
+        print(f"  {mode:6s}  {result['wakeups']:9.1f}  {result['max_block_ms']:16.1f}  "
+              f"{result['blocked_ms']:14.1f}  {reconnect:>19s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Radar rendering benchmarks (bundled test file)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    workers_parser = subparsers.add_parser('workers', help="Speed-up of banded rendering for 1..N threads")
+    workers_parser.add_argument('--max-workers', type=int, default=4, help="Highest thread count (default 4)")
+    workers_parser.add_argument('--size', type=int, default=512, help="Output image size in pixels (default 512)")
+    workers_parser.add_argument('--sigma', type=float, default=1.5, help="Gaussian blur sigma (default 1.5)")
+    workers_parser.add_argument('--repeats', type=int, default=10, help="Renders per thread count (default 10)")
+    workers_parser.set_defaults(func=benchmark_workers)
+
+    presets_parser = subparsers.add_parser('presets', help="Render time of the fast/balanced/quality presets")
+    presets_parser.add_argument('--size', type=int, default=512, help="Output image size in pixels (default 512)")
+    presets_parser.add_argument('--sigma', type=float, default=1.5, help="Blur sigma (default 1.5)")
+    presets_parser.add_argument('--repeats', type=int, default=10, help="Renders per preset (default 10)")
+    presets_parser.add_argument('--workers', type=int, default=1, help="Render threads (default 1)")
+    presets_parser.set_defaults(func=benchmark_presets)
+
+    importtime_parser = subparsers.add_parser('importtime', help="Import time report of startup and deferred modules")
+    importtime_parser.add_argument('--repeats', type=int, default=5, help="Interpreter runs per module (default 5)")
+    importtime_parser.set_defaults(func=benchmark_importtime)
+
+    text_parser = subparsers.add_parser('text', help="Clock digits: draw.text versus the glyph atlas")
+    text_parser.add_argument('--size', type=int, default=125, help="Font size (default 125)")
+    text_parser.add_argument('--repeats', type=int, default=5, help="Runs over all strings (default 5)")
+    text_parser.set_defaults(func=benchmark_text)
+
+    mqtt_parser = subparsers.add_parser('mqtt', help="MQTT polling on the GUI thread versus the network thread")
+    mqtt_parser.add_argument('--idle', type=float, default=5.0, help="Idle measurement in seconds (default 5)")
+    mqtt_parser.add_argument('--downtime', type=float, default=5.0, help="Broker downtime in seconds (default 5)")
+    mqtt_parser.set_defaults(func=benchmark_mqtt)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+"""
+Per-pixel rain statistics (climatology) over a collection of DWD radar composites (HDF5)
+Every file is cropped to the area of interest and scaled to dBZ with the same code
+RadarProcessor uses for the live radar. The files are processed in chunks on a process
+pool; each chunk is reduced to small per-pixel counters (frames above each threshold,
+valid frames, sum and maximum), so memory use does not grow with the number of files.
+The crop bounds are computed once and handed to the workers, no pyproj work is repeated.
+
+Results are written as .npy files and rendered as maps through the normal render path.
+
+Example: python3 ./radar_climatology.py archive/ -o climatology --thresholds 10 20 30 40
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+
+from RadarProcessor import RadarProcessor
+
+# Values of the exceedance maps (0..1) are rendered with the dBZ colors, 100 % = this many dBZ
+FREQUENCY_DBZ_SCALE = 75.0
+
+_worker_radar = None    # RadarProcessor of a pool worker process
+_worker_geometry = None  # Crop geometry every file must match
+
+
+def collect_files(inputs):
+    """Expand files/directories/patterns into a sorted list of HDF5 filenames."""
+    filenames = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in ('*.hd5', '*.h5', '*-hd5'):
+                filenames.extend(glob.glob(os.path.join(item, pattern)))
+        else:
+            filenames.extend(glob.glob(item) or [item])
+    return sorted(set(filenames))
+
+
+def _geometry(raw_data, meta):
+    """Key of the crop geometry - statistics can only be summed over identical grids."""
+    return (meta['projdef'], meta['row_start'], meta['col_start'], raw_data.shape)
+
+
+def _init_worker(radar_config, bounds_cache, geometry):
+    """Pool initializer: one RadarProcessor per worker with the precomputed crop bounds."""
+    global _worker_radar, _worker_geometry
+    _worker_radar = RadarProcessor(**radar_config)
+    _worker_radar._bounds_cache.update(bounds_cache)
+    _worker_geometry = geometry
+
+
+def _reduce_chunk(filenames, thresholds):
+    """Reduce a chunk of files to per-pixel counters (runs in a worker process).
+
+    Returns:
+        dict: 'exceed' (thresholds x H x W uint32), 'valid' (uint32), 'sum' (float64),
+              'max' (float32, -inf where never valid), 'files', 'skipped', 'first', 'last'
+    """
+    result = None
+    skipped = 0
+    times = []
+    for filename in filenames:
+        crop = _worker_radar.read_crop(filename)
+        if crop is None or _geometry(crop[0], crop[1]) != _worker_geometry:
+            skipped += 1  # Unreadable or other radar grid
+            continue
+        raw_data, meta, data_time = crop
+        dbz = RadarProcessor.scale_counts(raw_data, meta['gain'], meta['offset'],
+                                          meta['nodata'], meta['undetect'])
+        valid = ~np.isnan(dbz)
+        if result is None:
+            shape = raw_data.shape
+            result = {'exceed': np.zeros((len(thresholds),) + shape, dtype=np.uint32),
+                      'valid': np.zeros(shape, dtype=np.uint32),
+                      'sum': np.zeros(shape, dtype=np.float64),
+                      'max': np.full(shape, -np.inf, dtype=np.float32)}
+        result['valid'] += valid
+        with np.errstate(invalid='ignore'):
+            for i, threshold in enumerate(thresholds):
+                result['exceed'][i] += dbz >= threshold  # NaN compares False
+        dbz[~valid] = -np.inf
+        np.maximum(result['max'], dbz, out=result['max'])
+        dbz[~valid] = 0.0
+        result['sum'] += dbz
+        if data_time is not None:
+            times.append(data_time)
+    if result is None:
+        result = {}
+    result.update(files=len(filenames) - skipped, skipped=skipped,
+                  first=min(times) if times else None, last=max(times) if times else None)
+    return result
+
+
+def _merge(total, part):
+    """Add the counters of a chunk to the running total."""
+    if total is None:
+        return part
+    if 'valid' in part:
+        if 'valid' in total:
+            total['exceed'] += part['exceed']
+            total['valid'] += part['valid']
+            total['sum'] += part['sum']
+            np.maximum(total['max'], part['max'], out=total['max'])
+        else:
+            for key in ('exceed', 'valid', 'sum', 'max'):
+                total[key] = part[key]
+    total['files'] += part['files']
+    total['skipped'] += part['skipped']
+    times = [t for t in (total['first'], total['last'], part['first'], part['last']) if t is not None]
+    total['first'] = min(times) if times else None
+    total['last'] = max(times) if times else None
+    return total
+
+
+def _reduce_task(args):
+    """imap helper: unpack (filenames, thresholds)."""
+    return _reduce_chunk(*args)
+
+
+def compute_climatology(filenames, radar_config, thresholds, processes=None, chunk_size=50):
+    """Reduce all files to per-pixel statistics on a process pool.
+
+    Args:
+        filenames: HDF5 files (sorted)
+        radar_config: Keyword arguments for RadarProcessor (defines the area of interest)
+        thresholds: dBZ thresholds for the exceedance counts
+        processes: Worker processes, None = number of CPU cores
+        chunk_size: Files per task (larger chunks mean fewer partial results to merge)
+
+    Returns:
+        tuple: (statistics dict as returned by _reduce_chunk, meta of the reference crop)
+    """
+    # The first readable file defines the crop - and fills the geometry cache once
+    radar = RadarProcessor(**radar_config)
+    reference = None
+    for filename in filenames:
+        reference = radar.read_crop(filename)
+        if reference is not None:
+            break
+    if reference is None:
+        raise SystemExit("None of the files could be read")
+    geometry = _geometry(reference[0], reference[1])
+
+    chunks = [filenames[i:i + chunk_size] for i in range(0, len(filenames), chunk_size)]
+    total = None
+    # Spawn fresh interpreters like RadarWorker, the parent may hold threads (render pool)
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes, initializer=_init_worker,
+                      initargs=(radar_config, radar._bounds_cache, geometry)) as pool:
+        tasks = pool.imap_unordered(_reduce_task, [(chunk, tuple(thresholds)) for chunk in chunks])
+        for done, part in enumerate(tasks, 1):
+            total = _merge(total, part)  # Partial counters are merged as soon as they arrive
+            print(f"\r{min(done * chunk_size, len(filenames))}/{len(filenames)} files", end='', flush=True)
+    print()
+    if 'valid' not in total:
+        raise SystemExit("No file matched the radar grid of the first file")
+    return total, reference[1]
+
+
+def save_results(stats, meta, thresholds, output_dir):
+    """Write the statistics as .npy files plus a JSON description.
+
+    Returns:
+        dict: Name -> float32 map (NaN where no valid frame was seen)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    valid = stats['valid']
+    seen = valid > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        maps = {
+            'max_dbz': np.where(seen, stats['max'], np.nan).astype(np.float32),
+            'mean_dbz': np.where(seen, stats['sum'] / valid, np.nan).astype(np.float32),
+        }
+        for threshold, exceed in zip(thresholds, stats['exceed']):
+            maps[f'exceed_{threshold:g}dbz'] = np.where(seen, exceed / valid, np.nan).astype(np.float32)
+    maps['valid_count'] = valid
+
+    for name, values in maps.items():
+        np.save(os.path.join(output_dir, name + '.npy'), values)
+    info = {
+        'files': stats['files'], 'skipped': stats['skipped'],
+        'first': stats['first'].isoformat() if stats['first'] else None,
+        'last': stats['last'].isoformat() if stats['last'] else None,
+        'thresholds_dbz': list(thresholds),
+        'crop': {key: value for key, value in meta.items() if key != 'time'},
+    }
+    with open(os.path.join(output_dir, 'climatology.json'), 'w') as f:
+        json.dump(info, f, indent=2)
+    return maps
+
+
+def render_map(radar, values, meta, filename, sigma):
+    """Render a per-pixel map (in dBZ units) with the normal radar render path.
+
+    The values are stored as raw counts with the composite's gain/offset and processed
+    by RadarProcessor exactly like a downloaded frame, so background, cities, presets
+    and colors match the live radar.
+    """
+    gain, offset = meta['gain'], meta['offset']
+    nodata, undetect = meta['nodata'], meta['undetect']
+    counts = np.round((np.nan_to_num(values, nan=0.0) - offset) / gain)
+    counts = np.clip(counts, undetect + 1, nodata - 1)  # Keep the special values free
+    with np.errstate(invalid='ignore'):
+        counts[values < 1.0] = undetect     # Below the first color: transparent
+    counts[np.isnan(values)] = nodata
+    raw_data = counts.astype(np.uint16 if nodata <= 65535 else np.uint32)
+    if not radar._process_crop(raw_data, meta, None, time.perf_counter()):
+        return False
+    image = radar.create_smooth_heatmap_grid(sigma=sigma)
+    image.convert('RGB').save(filename)
+    image.close()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pixel rain statistics over archived radar composites")
+    parser.add_argument('inputs', nargs='+', help="HDF5 files, directories or glob patterns")
+    parser.add_argument('-o', '--output', default='climatology', help="Output directory (default climatology)")
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[10.0, 20.0, 30.0, 40.0],
+                        help="dBZ thresholds for exceedance frequencies (default 10 20 30 40)")
+    parser.add_argument('--processes', type=int, help="Worker processes (default number of CPU cores)")
+    parser.add_argument('--chunk-size', type=int, default=50, help="Files per task (default 50)")
+    parser.add_argument('--no-render', action='store_true', help="Only write the .npy files")
+    parser.add_argument('--background', default='esri_topo', help="Map background type")
+    parser.add_argument('--zoom', type=int, default=11, help="Zoom level [8-12]")
+    parser.add_argument('--lon', type=float, default=8.862, help="Center longitude")
+    parser.add_argument('--lat', type=float, default=48.806, help="Center latitude")
+    parser.add_argument('--size', type=int, default=512, help="Image size in pixels (default 512)")
+    parser.add_argument('--preset', default='quality', help="Render preset: fast, balanced or quality")
+    parser.add_argument('--sigma', type=float, default=1.5, help="Blur sigma (default 1.5)")
+    args = parser.parse_args()
+
+    filenames = collect_files(args.inputs)
+    if not filenames:
+        raise SystemExit("No radar files found")
+    radar_config = dict(satellite_source=args.background, zoom_level=args.zoom,
+                        center_lon=args.lon, center_lat=args.lat,
+                        image_width_pixels=args.size, image_height_pixels=args.size,
+                        render_preset=args.preset, render_workers=1)
+
+    start = time.perf_counter()
+    stats, meta = compute_climatology(filenames, radar_config, args.thresholds,
+                                      args.processes, args.chunk_size)
+    print(f"{stats['files']} files reduced in {time.perf_counter() - start:.1f} s "
+          f"({stats['skipped']} skipped), {stats['first']} to {stats['last']}")
+    maps = save_results(stats, meta, args.thresholds, args.output)
+    print(f"Statistics written to {args.output}/")
+
+    if args.no_render:
+        return
+    radar = RadarProcessor(**dict(radar_config, render_workers=None))
+    for name, values in maps.items():
+        if name == 'valid_count':
+            continue
+        if name.startswith('exceed_'):
+            values = values * FREQUENCY_DBZ_SCALE
+        render_map(radar, values, meta, os.path.join(args.output, name + '.png'), args.sigma)
+    print(f"Maps rendered to {args.output}/*.png")
+
+
+if __name__ == '__main__':
+    main()
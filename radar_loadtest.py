@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Load test for the radar HTTP service (RadarServer.py)
+Simulates many displays polling the same endpoint concurrently.
+
+Example: python3 ./radar_loadtest.py http://127.0.0.1:8080/radar.png --clients 50 --duration 10 --revalidate
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def client_loop(url, duration, revalidate, gzip_accept, results, lock):
+    """Send requests on one persistent connection until the duration has elapsed."""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    latencies = []
+    statuses = {}
+    errors = 0
+    received_bytes = 0
+    etag = None
+
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    end_time = time.perf_counter() + duration
+    while time.perf_counter() < end_time:
+        headers = {}
+        if revalidate and etag:
+            headers['If-None-Match'] = etag
+        if gzip_accept:
+            headers['Accept-Encoding'] = 'gzip'
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        received_bytes += len(body)
+        etag = response.getheader('ETag', etag)
+    conn.close()
+
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+        results['bytes'] += received_bytes
+        for status, count in statuses.items():
+            results['statuses'][status] = results['statuses'].get(status, 0) + count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the radar HTTP service")
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:8080/radar.png', help="URL to request")
+    parser.add_argument('--clients', type=int, default=20, help="Number of concurrent clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="Test duration in seconds")
+    parser.add_argument('--revalidate', action='store_true', help="Send If-None-Match with the last ETag")
+    parser.add_argument('--gzip', action='store_true', help="Send Accept-Encoding: gzip")
+    args = parser.parse_args()
+
+    results = {'latencies': [], 'errors': 0, 'bytes': 0, 'statuses': {}}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=client_loop,
+                                args=(args.url, args.duration, args.revalidate, args.gzip, results, lock))
+               for _ in range(args.clients)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(results['latencies'])
+    count = len(latencies)
+    print(f"Clients: {args.clients}, duration: {elapsed:.1f} s, requests: {count}, errors: {results['errors']}")
+    if count == 0:
+        return
+    print(f"Throughput: {count / elapsed:.0f} req/s, {results['bytes'] / elapsed / 1024:.0f} KiB/s")
+    print(f"Latency ms: p50 {latencies[count // 2] * 1000:.1f}, "
+          f"p95 {latencies[int(count * 0.95)] * 1000:.1f}, "
+          f"p99 {latencies[min(count - 1, int(count * 0.99))] * 1000:.1f}, "
+          f"max {latencies[-1] * 1000:.1f}")
+    print("Status codes: " + ", ".join(f"{status}: {n}" for status, n in sorted(results['statuses'].items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+
+"""
+Time-lapse export of archived DWD radar composites (HDF5) to animated WebP, APNG or GIF
+Works fully offline: every frame is rendered by RadarProcessor from a local HDF5 file,
+reusing the cached map background, city markers and remap table of the viewport.
+Frames are rendered one at a time and streamed to the encoder, so memory use does not
+grow with the number of frames.
+
+Example: python3 ./radar_timelapse.py archive/*.hd5 -o storm.webp --start 2025-11-17T12:00 --end 2025-11-17T18:00
+         python3 ./radar_timelapse.py composite_hx_test.hd5 -o test.gif
+         python3 ./radar_timelapse.py --archive radar_archive -o today.webp --start 2025-11-17T00:00
+"""
+import argparse
+import glob
+import os
+import struct
+import zlib
+import io
+from datetime import datetime, timezone
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, GifImagePlugin
+
+from RadarProcessor import RadarProcessor
+from RadarArchive import RadarArchive
+
+TRANSPARENT_INDEX = 255  # Palette entry reserved for "unchanged" pixels of difference frames
+
+
+# ---------- Frame source ----------
+def collect_files(inputs, radar, start=None, end=None):
+    """Expand files/directories/patterns and sort them by composite time.
+
+    Only the /what attributes are read here, the radar data is decoded while rendering.
+
+    Returns:
+        list: (filename, data_time) tuples in chronological order
+    """
+    filenames = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in ('*.hd5', '*.h5', '*-hd5'):
+                filenames.extend(glob.glob(os.path.join(item, pattern)))
+        else:
+            filenames.extend(glob.glob(item) or [item])
+
+    files = []
+    for filename in sorted(set(filenames)):
+        data_time = radar.read_data_time(filename)
+        if data_time is None:
+            continue
+        if (start and data_time < start) or (end and data_time > end):
+            continue
+        files.append((filename, data_time))
+    files.sort(key=lambda item: item[1])
+    return files
+
+
+def render_frames(radar, files, sigma, font):
+    """Render one RGB frame per file, one at a time.
+
+    A file that cannot be loaded repeats the previous frame, so the frame count
+    always matches the file count. Entries without a filename are read from radar.archive.
+
+    Yields:
+        PIL.Image: RGB frame with time label
+    """
+    previous = None
+    for filename, data_time in files:
+        if filename is None:
+            loaded = radar.load_archived_frame(data_time, exact=True)
+        else:
+            loaded = radar.load_and_process_data(use_local=True, local_filename=filename)
+        if loaded:
+            frame = radar.create_smooth_heatmap_grid(sigma=sigma).convert('RGB')
+            draw_time_label(frame, data_time, font)
+        elif previous is not None:
+            frame = previous
+        else:
+            frame = Image.new('RGB', (radar.image_width_pixels, radar.image_height_pixels), (0, 0, 0))
+        previous = frame
+        yield frame
+
+
+def draw_time_label(image, data_time, font):
+    """Draw the local composite time into the lower left corner."""
+    text = data_time.astimezone().strftime('%d.%m.%Y %H:%M')
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    x, y = 6, image.height - (bottom - top) - 12
+    draw.rectangle((x - 4, y + top - 4, x + right + 4, y + bottom + 4), fill=(32, 32, 32))
+    draw.text((x, y), text, font=font, fill=(255, 255, 255))
+
+
+# ---------- Shared palette and frame differences ----------
+def build_shared_palette(radar, first_frame):
+    """Quantize the map background blended with every radar color into one palette.
+
+    All frames share this palette (GIF global color table, APNG PLTE). Entry 255 is
+    reserved as transparent "unchanged" color for difference frames.
+
+    Returns:
+        PIL.Image: Palette image for Image.quantize
+    """
+    # Not cached if some map tiles could not be downloaded, the call then renders it again
+    background = radar._get_viewport_background(radar.viewports['default'], radar.satellite_source)
+    background = Image.fromarray(background).convert('RGB')
+    small = background.reduce(4)
+    samples = [first_frame.reduce(4)]
+    base = np.asarray(small, dtype=np.uint16)
+    for rgba in radar._get_dbz_palette()[1:]:
+        alpha = int(rgba[3])
+        blended = (rgba[:3].astype(np.uint16) * alpha + base * (255 - alpha) + 127) // 255
+        samples.append(Image.fromarray(blended.astype(np.uint8), 'RGB'))
+
+    sample = Image.new('RGB', (small.width, small.height * len(samples)))
+    for i, image in enumerate(samples):
+        sample.paste(image, (0, i * small.height))
+    quantized = sample.quantize(colors=TRANSPARENT_INDEX, method=Image.Quantize.MEDIANCUT)
+
+    palette = quantized.getpalette()[:TRANSPARENT_INDEX * 3]
+    palette += palette[:3] * (256 - len(palette) // 3)  # Pad, unused entries repeat color 0
+    palette_image = Image.new('P', (1, 1))
+    palette_image.putpalette(palette)
+    return palette_image
+
+
+def quantize_frame(frame, palette_image):
+    """Map an RGB frame onto the shared palette (no dithering, keeps flat areas stable)."""
+    indices = np.asarray(frame.quantize(palette=palette_image, dither=Image.Dither.NONE)).copy()
+    indices[indices >= TRANSPARENT_INDEX] = 0  # Same color as entry 0, 255 stays reserved
+    return indices
+
+
+def difference_region(previous, current):
+    """Return the changed bounding box and its pixels, unchanged pixels made transparent.
+
+    Returns:
+        tuple: ((x, y), uint8 index array) - a single transparent pixel if nothing changed
+    """
+    changed = previous != current
+    rows = np.flatnonzero(changed.any(axis=1))
+    if rows.size == 0:
+        return (0, 0), np.full((1, 1), TRANSPARENT_INDEX, dtype=np.uint8)
+    cols = np.flatnonzero(changed.any(axis=0))
+    y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    region = current[y0:y1, x0:x1].copy()
+    region[~changed[y0:y1, x0:x1]] = TRANSPARENT_INDEX
+    return (int(x0), int(y0)), region
+
+
+def palette_image(indices, palette):
+    image = Image.fromarray(indices, 'P')
+    image.putpalette(palette)
+    return image
+
+
+# ---------- Streaming encoders ----------
+class GifWriter:
+    """Write a GIF frame by frame with one global palette and difference frames."""
+
+    def __init__(self, fp, size, palette, duration, loop):
+        self.fp = fp
+        self.palette = palette
+        self.duration = duration
+        self.previous = None
+        header_image = palette_image(np.zeros((size[1], size[0]), dtype=np.uint8), palette)
+        header, _ = GifImagePlugin.getheader(header_image, info={'loop': loop, 'duration': duration})
+        for chunk in header:
+            fp.write(chunk)
+
+    def add(self, indices):
+        if self.previous is None:
+            offset, region, params = (0, 0), indices, {'duration': self.duration, 'disposal': 1}
+        else:
+            offset, region = difference_region(self.previous, indices)
+            params = {'duration': self.duration, 'disposal': 1, 'transparency': TRANSPARENT_INDEX}
+        for chunk in GifImagePlugin.getdata(palette_image(region, self.palette), offset, **params):
+            self.fp.write(chunk)
+        self.previous = indices
+
+    def close(self):
+        self.fp.write(b';')  # GIF trailer
+
+
+class ApngWriter:
+    """Write an animated PNG frame by frame with one palette and difference frames.
+
+    Frame pixels are compressed by Pillow's PNG encoder; its IDAT chunks are rewrapped
+    as APNG fdAT chunks, so no frame has to be kept after it was written.
+    """
+
+    def __init__(self, fp, size, palette, num_frames, duration, loop):
+        self.fp = fp
+        self.size = size
+        self.palette = palette
+        self.duration = duration
+        self.previous = None
+        self.sequence = 0
+
+        fp.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', size[0], size[1], 8, 3, 0, 0, 0))
+        self._chunk(b'acTL', struct.pack('>II', num_frames, loop))
+        self._chunk(b'PLTE', bytes(palette[:256 * 3]))
+        self._chunk(b'tRNS', b'\xff' * TRANSPARENT_INDEX + b'\x00')
+
+    def _chunk(self, chunk_type, data):
+        self.fp.write(struct.pack('>I', len(data)) + chunk_type + data)
+        self.fp.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+    def _compressed_pixels(self, indices):
+        """Encode an index image with Pillow and return the concatenated IDAT data."""
+        buf = io.BytesIO()
+        palette_image(indices, self.palette).save(buf, format='PNG', compress_level=9)
+        data = buf.getvalue()
+        pos = 8
+        idat = []
+        while pos < len(data):
+            length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+            if chunk_type == b'IDAT':
+                idat.append(data[pos + 8:pos + 8 + length])
+            pos += 12 + length
+        return b''.join(idat)
+
+    def add(self, indices):
+        if self.previous is None:
+            offset, region, blend_op = (0, 0), indices, 0       # APNG_BLEND_OP_SOURCE
+        else:
+            offset, region = difference_region(self.previous, indices)
+            blend_op = 1                                        # APNG_BLEND_OP_OVER
+        height, width = region.shape
+        self._chunk(b'fcTL', struct.pack('>IIIIIHHBB', self.sequence, width, height, offset[0], offset[1],
+                                         self.duration, 1000, 0, blend_op))
+        self.sequence += 1
+        pixels = self._compressed_pixels(region)
+        if self.previous is None:
+            self._chunk(b'IDAT', pixels)  # First frame is also the default image
+        else:
+            self._chunk(b'fdAT', struct.pack('>I', self.sequence) + pixels)
+            self.sequence += 1
+        self.previous = indices
+
+    def close(self):
+        self._chunk(b'IEND', b'')
+
+
+class LazyFrames(Image.Image):
+    """Multi-frame image whose frames are rendered on seek().
+
+    Pillow's animated WebP encoder walks the frames of a multi-frame image with
+    seek(), so every frame only exists while the encoder compresses it.
+    """
+
+    def __init__(self, frames, num_frames):
+        super().__init__()
+        self._frames = frames
+        self.n_frames = num_frames
+        self.is_animated = num_frames > 1
+        self._index = -1
+        self.seek(0)
+
+    def seek(self, frame):
+        # Only moving forward renders; the encoder seeks back to frame 0 when done
+        if frame == self._index + 1 and frame < self.n_frames:
+            image = next(self._frames)
+            self.im = image.im
+            self._mode = image.mode
+            self._size = image.size
+            self._index = frame
+
+    def tell(self):
+        return self._index
+
+
+def export(frames, files, output, radar, duration, loop, quality):
+    """Stream the rendered frames into the encoder chosen by the output file extension."""
+    ext = os.path.splitext(output)[1].lower()
+    first = next(frames)
+    if ext == '.webp':
+        def all_frames():
+            yield first
+            yield from frames
+        LazyFrames(all_frames(), len(files)).save(output, format='WEBP', save_all=True, duration=duration,
+                                                  loop=loop, quality=quality, method=4)
+        return
+
+    palette_img = build_shared_palette(radar, first)
+    shared_palette = palette_img.getpalette()
+    with open(output, 'wb') as fp:
+        if ext == '.gif':
+            writer = GifWriter(fp, first.size, shared_palette, duration, loop)
+        elif ext in ('.png', '.apng'):
+            writer = ApngWriter(fp, first.size, shared_palette, len(files), duration, loop)
+        else:
+            raise SystemExit(f"Unsupported output format '{ext}' (use .webp, .png/.apng or .gif)")
+        writer.add(quantize_frame(first, palette_img))
+        for frame in frames:
+            writer.add(quantize_frame(frame, palette_img))
+        writer.close()
+
+
+def parse_time(text):
+    """Parse an ISO time, interpreted as local time if it has no time zone."""
+    value = datetime.fromisoformat(text)
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export archived radar composites as animated WebP/APNG/GIF")
+    parser.add_argument('inputs', nargs='*', help="HDF5 files, directories or glob patterns")
+    parser.add_argument('--archive', help="Read the frames from a radar archive directory (see RadarArchive)")
+    parser.add_argument('-o', '--output', default='radar_timelapse.webp',
+                        help="Output file, format from extension: .webp, .png/.apng, .gif")
+    parser.add_argument('--start', type=parse_time, help="First composite time (ISO, local time)")
+    parser.add_argument('--end', type=parse_time, help="Last composite time (ISO, local time)")
+    parser.add_argument('--frame-ms', type=int, default=250, help="Display time per frame in ms (default 250)")
+    parser.add_argument('--loop', type=int, default=0, help="Number of loops, 0 = forever")
+    parser.add_argument('--quality', type=int, default=80, help="WebP quality (default 80)")
+    parser.add_argument('--background', default='esri_topo', help="Map background type")
+    parser.add_argument('--zoom', type=int, default=11, help="Zoom level [8-12]")
+    parser.add_argument('--lon', type=float, default=8.862, help="Center longitude")
+    parser.add_argument('--lat', type=float, default=48.806, help="Center latitude")
+    parser.add_argument('--size', type=int, default=512, help="Image size in pixels (default 512)")
+    parser.add_argument('--preset', default='quality', help="Render preset: fast, balanced or quality")
+    parser.add_argument('--sigma', type=float, default=1.5, help="Blur sigma (default 1.5)")
+    args = parser.parse_args()
+
+    radar = RadarProcessor(satellite_source=args.background, zoom_level=args.zoom,
+                           center_lon=args.lon, center_lat=args.lat,
+                           image_width_pixels=args.size, image_height_pixels=args.size,
+                           render_preset=args.preset)
+    if args.archive:
+        try:
+            radar.archive = RadarArchive(args.archive, read_only=True)
+        except OSError as e:
+            raise SystemExit(f"Cannot open radar archive: {e}")
+        files = [(None, data_time) for data_time in radar.archive.times(args.start, args.end)]
+    else:
+        files = collect_files(args.inputs, radar, args.start, args.end)
+    if not files:
+        raise SystemExit("No radar files found in the given range")
+    print(f"Rendering {len(files)} frames from {files[0][1]:%Y-%m-%d %H:%M} to {files[-1][1]:%Y-%m-%d %H:%M} UTC")
+
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), max(12, args.size // 32))
+    export(render_frames(radar, files, args.sigma, font), files, args.output, radar,
+           args.frame_ms, args.loop, args.quality)
+    print(f"Written {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+"""
+Tests of the RenderGovernor levels against a fake sysfs/proc tree (python -m pytest)
+"""
+import os
+from RenderGovernor import RenderGovernor
+
+
+def write_temperature(root, celsius, zone=0):
+    """Write a thermal zone temperature in millidegrees, like the kernel does."""
+    path = os.path.join(root, 'sys', 'class', 'thermal', f'thermal_zone{zone}')
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'temp'), 'w') as f:
+        f.write(f"{int(celsius * 1000)}\n")
+
+
+def write_load(root, load):
+    os.makedirs(os.path.join(root, 'proc'), exist_ok=True)
+    with open(os.path.join(root, 'proc', 'loadavg'), 'w') as f:
+        f.write(f"{load:.2f} 0.50 0.40 1/123 4567\n")
+
+
+def test_temperature_levels_with_hysteresis(tmp_path):
+    root = str(tmp_path)
+    write_load(root, 0.5)
+    governor = RenderGovernor(sysfs_root=root, load_busy=4)
+
+    levels = []
+    for celsius in (50, 66, 62, 59, 76, 72, 69):
+        write_temperature(root, celsius)
+        levels.append(governor.update()['level'])
+    # 62 stays warm and 72 stays hot (5 deg C hysteresis), 59 and 69 step down
+    assert levels == [0, 1, 1, 0, 2, 2, 1]
+    assert governor.level_changes == 4
+    assert governor.temperature == 69.0
+
+
+def test_load_raises_the_level(tmp_path):
+    root = str(tmp_path)
+    write_temperature(root, 50)
+    write_load(root, 9)
+    governor = RenderGovernor(sysfs_root=root, load_busy=4)
+
+    settings = governor.update()
+    assert settings['level'] == 2  # Twice load_busy
+    assert settings['load'] == 9.0
+    assert settings['changed']
+
+    write_load(root, 5)
+    assert governor.update()['level'] == 1
+    write_load(root, 1)
+    assert governor.update()['level'] == 0
+
+
+def test_settings_follow_the_level(tmp_path):
+    root = str(tmp_path)
+    write_load(root, 0.5)
+    write_temperature(root, 40, zone=0)
+    write_temperature(root, 80, zone=1)  # The hottest zone counts
+    governor = RenderGovernor(sysfs_root=root, load_busy=4, tick_interval_bounds=(100, 500),
+                              mqtt_poll_bounds=(100, 1000), base_preset='balanced')
+
+    settings = governor.update()
+    assert settings['temperature'] == 80.0
+    assert settings['level'] == 2
+    assert settings['preset'] == 'fast'
+    assert settings['tick_interval'] == 500
+    assert settings['mqtt_poll_interval'] == 1000
+    assert not governor.update()['changed']
+
+    write_temperature(root, 40, zone=1)
+    settings = governor.update()
+    assert (settings['level'], settings['preset'], settings['tick_interval']) == (0, 'balanced', 100)
+
+
+def test_missing_files_and_slow_render(tmp_path):
+    governor = RenderGovernor(sysfs_root=str(tmp_path), load_busy=4)
+
+    settings = governor.update()
+    assert settings['temperature'] is None and settings['load'] is None
+    assert settings['level'] == 0
+    assert governor.update({'render': 2000.0})['level'] == 1  # Above render_budget_ms
@@ -9,32 +9,53 @@ import threading
 import signal
 import gc
 import atexit
-from PIL import Image, ImageTk, ImageDraw, ImageFont
+import queue
+from PIL import Image, ImageTk, ImageDraw
 import urllib.request
 import io
 from io import BytesIO
 from datetime import datetime
 import json
-import requests
 import paho.mqtt.client as mqtt
-from RadarProcessor import RadarProcessor
+from RenderGovernor import RenderGovernor
+from AssetCache import AssetCache
+from WidgetEngine import WidgetEngine, Widget, Text, Digits, Icon, Chart, Series
+from TopicRouter import TopicRouter
+from PressureTendency import PressureTendency
+# requests and the radar modules (numpy, h5py, matplotlib, pyproj) are imported
+# after the window is shown - see start_radar() in main()
 import RPi.GPIO as GPIO
 
 script_dir = None
 window = None
 canvas = None
+# Fonts and icons, loaded once at startup (see AssetCache)
+assets = None
+# Value tiles (see create_widgets)
+widgets = None
+# MQTT topic -> parsed value -> tile (see create_router)
+router = None
+# Time based history of every MQTT value (history_dir setting)
+history = None
+# Pressure tendency of the last 3 hours (tendency icon of the pressure tile)
+pressure_tendency = None
 
 # Global radar processor instance
 radar = None
+# Optional HTTP service sharing the rendered radar with other displays
+radar_server = None
+# Optional radar worker process (radar_worker_process setting)
+radar_worker = None
+radar_stage_timings = {}  # Last stage timings reported by the radar worker process
+# Thermal/load governor (governor_enabled setting)
+governor = None
 
 # Shutdown flag for clean exit
 shutdown_flag = False
-mqtt_poll_count = 0
-mqtt_last_poll_time = 0
 mqtt_connected = False
-mqtt_reconnect_count = 0
-mqtt_last_successful_time = 0
-mqtt_connection_stale_threshold = 30  # Consider connection stale after 30 seconds of no activity
+mqtt_reconnect_count = 0  # Connections lost since start
+# Values parsed by the MQTT network thread, drained by the frame tick (update_widgets)
+mqtt_updates = queue.SimpleQueue()
 
 # local settings
 old_time = time.strftime('%H:%M:%S')
@@ -43,6 +64,17 @@ latitude  = "48.808"
 timezone = "Europe/Berlin"
 zoom = 11
 radar_background = "esri_topo"
+radar_render_preset = "quality"  # "fast" | "balanced" | "quality" (see README)
+radar_server_port = 0  # serve radar PNG/WebP + JSON on this port to other displays, 0 = disabled
+snapshot_dir = "snapshot"  # last radar image and forecast, shown right away at the next start, "" = disabled
+radar_archive_dir = "radar_archive"  # keep every radar frame on disk for replay/analysis, "" = disabled
+history_dir = "history"  # keep every MQTT value (raw 6 h, 5 min means 7 days, hourly 1 year), "" = disabled
+radar_worker_process = False  # render the radar in a separate process so it cannot delay the clock tick
+pressure_tendency_threshold = 0.6  # hPa per hour, slopes of the 1 h windows above count as rising, below the negative as falling
+widget_frame_rate = 4  # value tiles are redrawn at most this many times per second, MQTT bursts are coalesced
+governor_enabled = True  # use a cheaper radar preset and slower clock/MQTT polling when the Pi is hot or busy
+governor_tick_bounds = (100, 500)  # clock tick interval range in ms
+governor_mqtt_poll_bounds = (100, 1000)  # value tile frame interval range in ms (lower limit 1000 / widget_frame_rate)
 
 # mqtt settings
 mqtt_user = "**********"
@@ -65,6 +97,34 @@ mqtt_topic_sbatcharge = "/00d0935D9eb9/sbatcharge"
 mqtt_topic_eyield = "/00d0935D9eb9/eyield"
 mqtt_topic_eabsorb = "/00d0935D9eb9/eabsorb"
 
+# (topic, widget) pairs - several tiles may show the same topic
+mqtt_topic_widgets = [
+    (mqtt_topic_intemperature, 'intemperature'),
+    (mqtt_topic_inhumidity, 'inhumidity'),
+    (mqtt_topic_outtemperature, 'outtemperature'),
+    (mqtt_topic_outhumidity, 'outhumidity'),
+    (mqtt_topic_pressure, 'pressure'),
+    (mqtt_topic_staticiaq, 'staticiaq'),
+    (mqtt_topic_ppurchase, 'ppurchase'),
+    (mqtt_topic_pfeed, 'pfeed'),
+    (mqtt_topic_pconsume, 'pconsume'),
+    (mqtt_topic_pgenerate, 'pgenerate'),
+    (mqtt_topic_pdischarge, 'pdischarge'),
+    (mqtt_topic_pcharge, 'pcharge'),
+    (mqtt_topic_eabsorb, 'eabsorb'),
+    (mqtt_topic_eyield, 'eyield'),
+    (mqtt_topic_sbatcharge, 'sbatcharge'),
+]
+
+# chart redrawn when a 5-minute bucket of the value closes in the history
+history_charts = {
+    'outtemperature': 'outtemperature_chart',
+    'pressure': 'pressure_chart',
+    'staticiaq': 'staticiaq_chart',
+    'pgenerate': 'pv_chart',
+    'pconsume': 'pv_chart',
+}
+
 # coordinates
 big_day_weather_x = 512
 big_day_weather_y = 160
@@ -104,813 +164,243 @@ eyield_x         = 832
 eyield_y         = 448
 sbatcharge_x     = 832
 sbatcharge_y     = 480
-
-# variables to hold measured values
-mqtt_intemperature = "--.-"
+staticiaq_chart_x      = 512
+staticiaq_chart_y      = 142
+outtemperature_chart_x = 672
+outtemperature_chart_y = 384
+pressure_chart_x       = 790
+pressure_chart_y       = 384
+pv_chart_x             = 908
+pv_chart_y             = 384
+
+# values from the weather service
 dwd_intemperature = "--.-"
-mqtt_inhumidity = "---.-"
 dwd_inhumidity = "---.-"
-mqtt_outtemperature = "--.-"
 dwd_outtemperature = "--.-"
-mqtt_outhumidity = "---.-"
 dwd_outhumidity = "---.-"
-mqtt_pressure = "----.-"
 dwd_pressure = "----.-"
-mqtt_staticiaq = "---.-"
-mqtt_ppurchase = "-----"
-mqtt_pfeed = "-----"
-mqtt_pconsume = "-----"
-mqtt_pgenerate = "-----"
-mqtt_pdischarge = "-----"
-mqtt_pcharge = "-----"
-mqtt_eabsorb = "-----.-"
-mqtt_eyield = "-----.-"
-mqtt_sbatcharge = "--"
-
-# Previous values to track changes and avoid unnecessary redraws
-prev_intemperature = None
-prev_inhumidity = None
-prev_outtemperature = None
-prev_outhumidity = None
-prev_staticiaq = None
-prev_ppurchase = None
-prev_pfeed = None
-prev_pconsume = None
-prev_pgenerate = None
-prev_pdischarge = None
-prev_pcharge = None
-prev_eabsorb = None
-prev_eyield = None
-prev_sbatcharge = None
 
 # display settings
 display_on_time = 3000  # 5min
 display_onoff = "ON"
 
-class circularlist(object):
-    def __init__(self, size, data = []):
-        """Initialization"""
-        self.index = 0
-        self.size = size
-        self._data = list(data)[-size:]
-
-    def append(self, value):
-        """Append an element"""
-        if len(self._data) == self.size:
-            self._data[self.index] = value
-        else:
-            self._data.append(value)
-        self.index = (self.index + 1) % self.size
-
-    def length(self):
-        return(len(self._data))
-
-    def __getitem__(self, key):
-        """Get element by index, relative to the current index"""
-        if len(self._data) == self.size:
-            return(self._data[(key + self.index) % self.size])
-        else:
-            return(self._data[key])
-
-    def __repr__(self):
-        """Return string representation"""
-        return (self._data[self.index:] + self._data[:self.index]).__repr__() + ' (' + str(len(self._data))+'/{} items)'.format(self.size)
-
-def calc_pressure_tendency(l, start_index, end_index):
-    # define tendency by linear regression
-    avr_x = sum([x for x in range(start_index, end_index)]) / (end_index - start_index)
-    avr_y = sum([l[x] for x in range(start_index, end_index)]) / (end_index - start_index)
-    m = sum([(x - avr_x) * (l[x] - avr_y) for x in range(start_index, end_index)]) / sum([(x - avr_x) * (x - avr_x) for x in range(start_index, end_index)])
-    return (m)
-
-def get_pressure_tendency_icon(t1, t2, t3):
-    global script_dir
-
-    # zone limit 0.1 hPa
-    th =  0.1
-    tl = -0.1
-
-    if (t1 <= tl) and (t2 <= tl) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_7.png"))
-    if (t1 <= tl) and (t2 <= tl) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_6.png"))
-    if (t1 <= tl) and (t2 <= tl) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_5.png"))
-    if (t1 <= tl) and (t2 > tl) and (t2 <= th) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_7.png"))
-    if (t1 <= tl) and (t2 > tl) and (t2 <= th) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 <= tl) and (t2 > tl) and (t2 <= th) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 <= tl) and (t2 > th) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_7.png"))
-    if (t1 <= tl) and (t2 > th) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 <= tl) and (t2 > th) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_3.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 <= tl) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_8.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 <= tl) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 <= tl) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 > tl) and (t2 <= th) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 > tl) and (t2 <= th) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 > tl) and (t2 <= th) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 > th) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 > th) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > tl) and (t1 <= th) and (t2 > th) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_3.png"))
-    if (t1 > th) and (t2 <= tl) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_8.png"))
-    if (t1 > th) and (t2 <= tl) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > th) and (t2 <= tl) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_2.png"))
-    if (t1 > th) and (t2 > tl) and (t2 <= th) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > th) and (t2 > tl) and (t2 <= th) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png"))
-    if (t1 > th) and (t2 > tl) and (t2 <= th) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_2.png"))
-    if (t1 > th) and (t2 > th) and (t3 <= tl):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_0.png"))
-    if (t1 > th) and (t2 > th) and (t3 > tl) and (t3 <= th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_1.png"))
-    if (t1 > th) and (t2 > th) and (t3 > th):
-        icon_pre = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_2.png"))
-    return (icon_pre)
-
-def update_intemperature():
-    global script_dir
-    global prev_intemperature
-
-    # Only update if value has changed
-    if mqtt_intemperature == prev_intemperature:
-        return
-    prev_intemperature = mqtt_intemperature
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (353, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 352, 30), fill="#202020")
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((4, 0), "Raumtemperatur: ", font=font, fill="#ffffff")
-    draw.text((219, 0), mqtt_intemperature + " °C", font=font, fill="#ffff00")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('intemperature')
-        canvas.create_image(intemperature_x + 1, intemperature_y + 1, anchor = NW, image = photo_image, tags=('intemperature'))
-        # prevent garbage collection
-        canvas.intemperature = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_inhumidity():
-    global script_dir
-    global prev_inhumidity
-
-    # Only update if value has changed
-    if mqtt_inhumidity == prev_inhumidity:
-        return
-    prev_inhumidity = mqtt_inhumidity
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (353, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 352, 30), fill="#202020")
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((4, 0), "Raumluftfeuchte: ", font=font, fill="#ffffff")
-    draw.text((216, 0), mqtt_inhumidity + " %rF", font=font, fill="#ffff00")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('inhumidity')
-        canvas.create_image(inhumidity_x + 1, inhumidity_y + 1, anchor = NW, image = photo_image, tags=('inhumidity'))
-        # prevent garbage collection
-        canvas.inhumidity = photo_image
-    temp_image.close()  # Close PIL image
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (353, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 352, 30), fill="#202020")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('inhumidity_empty')
-        canvas.create_image(inhumidity_x + 1, inhumidity_y + 33, anchor = NW, image = photo_image, tags=('inhumidity_empty'))
-        # prevent garbage collection
-        canvas.inhumidity_empty = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_outtemperature():
-    global script_dir
-    global prev_outtemperature
-
-    # Only update if value has changed
-    if mqtt_outtemperature == prev_outtemperature:
-        return
-    prev_outtemperature = mqtt_outtemperature
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (353, 127), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 352, 126), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/temp.png")).convert("RGBA")
-    temp_image.paste(icon, (5, 4), icon)
-    # Draw the text onto the temporary image
-    temp_font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 125)
-    unit_font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((34, -1), "°C", font=unit_font, fill="#ffffff")
-    if (mqtt_outtemperature == "--.-"):
-        color = "#ffffff"
+# clock tick jitter measurement (how late the tick fires)
+clock_last_tick = None
+clock_tick_jitter = []
+
+# polling intervals in ms (adapted by the governor)
+clock_tick_interval = 100
+widget_frame_interval = int(1000 / widget_frame_rate)
+
+def outtemperature_color(temperature):
+    """Color of the outdoor temperature digits"""
+    if (temperature is None):
+        return "#ffffff"
+
+    if (temperature < -10):
+        return "#0080ff"
+    elif ((temperature >= -10) and (temperature < -5)):
+        return "#3380ff"
+    elif ((temperature >= -5) and (temperature < 0)):
+        return "#6680ff"
+    elif ((temperature >= 0) and (temperature < 5)):
+        return "#9980ff"
+    elif ((temperature >= 5) and (temperature < 10)):
+        return "#cc80ff"
+    elif ((temperature >= 10) and (temperature < 15)):
+        return "#ff80cc"
+    elif ((temperature >= 15) and (temperature < 20)):
+        return "#ff8099"
+    elif ((temperature >= 20) and (temperature < 25)):
+        return "#ff8066"
+    elif ((temperature >= 25) and (temperature < 30)):
+        return "#ff8033"
     else:
-        temperature = float(mqtt_outtemperature)
-
-        if (temperature < -10):
-            color = "#0080ff"
-        elif ((temperature >= -10) and (temperature < -5)):
-            color = "#3380ff"
-        elif ((temperature >= -5) and (temperature < 0)):
-            color = "#6680ff"
-        elif ((temperature >= 0) and (temperature < 5)):
-            color = "#9980ff"
-        elif ((temperature >= 5) and (temperature < 10)):
-            color = "#cc80ff"
-        elif ((temperature >= 10) and (temperature < 15)):
-            color = "#ff80cc"
-        elif ((temperature >= 15) and (temperature < 20)):
-            color = "#ff8099"
-        elif ((temperature >= 20) and (temperature < 25)):
-            color = "#ff8066"
-        elif ((temperature >= 25) and (temperature < 30)):
-            color = "#ff8033"
+        return "#ff8000"
+
+def outhumidity_layers(value):
+    """Humidity drop filled up to the measured level"""
+    if (value is not None):
+        level = int(value * 1.07)
+        return [Icon("humidity_blue", (16, 126 - 9 - level), (0, 125 - 9 - level, 125, 125)),
+                Icon("humidity_grey", (16, 1), (0, 0, 125, 125 - 9 - level))]
+    return [Icon("humidity_grey", (16, 1))]
+
+def staticiaq_layers(value):
+    """Air quality icon"""
+    if (value is not None):
+        if (value < 100.0):
+            return [Icon("IAQ_good", (17, 17))]
+        elif (value >= 100.0) and (value <= 200.0):
+            return [Icon("IAQ_medium", (17, 17))]
         else:
-            color = "#ff8000"
-    draw.text((53, 0), mqtt_outtemperature, font=temp_font, fill=color)
-
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('outtemperature')
-        canvas.create_image(outtemperature_x + 1, outtemperature_y + 1, anchor = NW, image = photo_image, tags=('outtemperature'))
-        # prevent garbage collection
-        canvas.outtemperature = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_outhumidity():
-    global script_dir
-    global prev_outhumidity
-
-    # Only update if value has changed
-    if mqtt_outhumidity == prev_outhumidity:
-        return
-    prev_outhumidity = mqtt_outhumidity
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (159, 127), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 158, 126), fill="#202020")
-    # Paste the icon onto the temporary image
-    if (mqtt_outhumidity != "---.-"):
-        level = int(float(mqtt_outhumidity) * 1.07)
-        icon_hum_blue = Image.open(os.path.join(script_dir, "Icons/humidity_blue.png")).convert("RGBA").crop([0, 125 - 9 - level, 125, 125])
-        temp_image.paste(icon_hum_blue, (16, 126 - 9 - level), icon_hum_blue)
-        icon_hum_grey = Image.open(os.path.join(script_dir, "Icons/humidity_grey.png")).convert("RGBA").crop([0, 0, 125, 125 - 9 - level])
-        temp_image.paste(icon_hum_grey, (16, 1), icon_hum_grey)
-    else:
-        icon_hum = Image.open(os.path.join(script_dir, "Icons/humidity_grey.png")).convert("RGBA")
-        temp_image.paste(icon_hum, (16, 1), icon_hum)
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('outhumidity')
-        canvas.create_image(outhumidity_x + 1, outhumidity_y + 1, anchor = NW, image = photo_image, tags=('outhumidity'))
-        # prevent garbage collection
-        canvas.outhumidity = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_staticiaq():
-    global script_dir
-    global prev_staticiaq
-
-    # Only update if value has changed
-    if mqtt_staticiaq == prev_staticiaq:
+            return [Icon("IAQ_bad", (17, 17))]
+    return [Icon("IAQ_good", (17, 17))]
+
+def pressure_layers(value):
+    """Pressure text and tendency icon, value = (pressure, tendency icon name)"""
+    pressure, icon = value
+    text = "----.-" if pressure is None else f"{pressure:.1f}"
+    return [Icon(icon, (290, 1)), Text((130, 0), text + " hPa", 27, "#ffff00")]
+
+def format_value(value, placeholder, decimals=None):
+    """Number as shown on a tile, decimals=None drops the decimals, None = no value yet"""
+    if value is None:
+        return placeholder
+    if decimals is None:
+        return str(int(value))
+    return f"{value:.{decimals}f}"
+
+def value_text(xy, color, unit, placeholder, decimals=None):
+    """Formatter drawing the value plus unit"""
+    def layers(value):
+        return [Text(xy, format_value(value, placeholder, decimals) + " " + unit, 27, color)]
+    return layers
+
+def energy_widget(name, x, y, width, icon, color, unit, placeholder):
+    """Tile of the energy row: icon on the left, value in color"""
+    return Widget(name, x, y, (width, 31), "#303030", static=[Icon(icon, (0, 0))],
+                  layers=value_text((36, 0), color, unit, placeholder))
+
+def sparkline_layers(name, color, xy=(2, 2), size=(113, 27)):
+    """Formatter drawing the 5-minute buckets (min to max) of the 24 hours up to the time value"""
+    def layers(stamp):
+        if (history is None):
+            return []
+        buckets = history.query(name, stamp - 86400, stamp, tier='5min')
+        return [Chart(xy, size, stamp - 86400, stamp,
+                      (Series(buckets['time'], buckets['min'], buckets['max'], color),))]
+    return layers
+
+def pv_chart_layers(stamp):
+    """Day curve of the PV generation (area) and the consumption (line) since midnight"""
+    if (history is None):
+        return []
+    midnight = datetime.fromtimestamp(stamp).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    generate = history.query('pgenerate', midnight, stamp, tier='5min')
+    consume = history.query('pconsume', midnight, stamp, tier='5min')
+    return [Chart((2, 2), (113, 27), midnight, midnight + 86400,
+                  (Series(generate['time'], generate['value'], generate['value'], "#00ff00", True),
+                   Series(consume['time'], consume['value'], consume['value'], "#ffffff")))]
+
+def create_widgets():
+    """Declare all value tiles"""
+    global widgets
+    widgets = WidgetEngine(canvas, assets, safe_create_photoimage)
+
+    widgets.add(Widget('intemperature', intemperature_x, intemperature_y, (353, 31), "#202020",
+                       static=[Text((4, 0), "Raumtemperatur: ", 27, "#ffffff")],
+                       layers=value_text((219, 0), "#ffff00", "°C", "--.-", 1)))
+    widgets.add(Widget('inhumidity', inhumidity_x, inhumidity_y, (353, 31), "#202020",
+                       static=[Text((4, 0), "Raumluftfeuchte: ", 27, "#ffffff")],
+                       layers=value_text((216, 0), "#ffff00", "%rF", "---.-", 1)))
+    widgets.add(Widget('outtemperature', outtemperature_x, outtemperature_y, (353, 127), "#303030",
+                       static=[Icon("temp", (5, 4)), Text((34, -1), "°C", 27, "#ffffff")],
+                       # Digits pre-rendered once (GlyphAtlas)
+                       layers=lambda value: [Digits((53, 0), format_value(value, "--.-", 1), 125,
+                                                    outtemperature_color(value))]))
+    widgets.add(Widget('outhumidity', outhumidity_x, outhumidity_y, (159, 127), "#202020",
+                       layers=outhumidity_layers))
+    widgets.add(Widget('staticiaq', staticiaq_x, staticiaq_y, (159, 142), "#202020",
+                       layers=staticiaq_layers))
+    widgets.add(Widget('pressure', pressure_x, pressure_y, (353, 31), "#202020",
+                       static=[Text((4, 0), "Luftdruck: ", 27, "#ffffff")],
+                       layers=pressure_layers, value=(None, pressure_tendency.icon())))
+
+    widgets.add(energy_widget('ppurchase', ppurchase_x, ppurchase_y, 159, "P_purchase", "#ff0000", "W", "-----"))
+    widgets.add(energy_widget('pfeed', pfeed_x, pfeed_y, 159, "P_feed", "#ffff00", "W", "-----"))
+    widgets.add(energy_widget('pconsume', pconsume_x, pconsume_y, 159, "P_consume", "#ffffff", "W", "-----"))
+    widgets.add(energy_widget('pgenerate', pgenerate_x, pgenerate_y, 159, "P_generate", "#00ff00", "W", "-----"))
+    widgets.add(energy_widget('pdischarge', pdischarge_x, pdischarge_y, 159, "P_batdischarge", "#8080ff", "W", "-----"))
+    widgets.add(energy_widget('pcharge', pcharge_x, pcharge_y, 159, "P_batcharge", "#8080ff", "W", "-----"))
+    widgets.add(energy_widget('eabsorb', eabsorb_x, eabsorb_y, 191, "E_absorb", "#ff0000", "kWh", "-----"))
+    widgets.add(energy_widget('eyield', eyield_x, eyield_y, 191, "E_yield", "#ffff00", "kWh", "-----"))
+    widgets.add(energy_widget('sbatcharge', sbatcharge_x, sbatcharge_y, 191, "S_batcharge", "#8080ff", "%", "--"))
+
+    # Charts of the history, value = time of the newest bucket (see show_value)
+    now = time.time()
+    widgets.add(Widget('staticiaq_chart', staticiaq_chart_x, staticiaq_chart_y, (159, 17), "#202020",
+                       layers=sparkline_layers('staticiaq', "#ffffff", (17, 1), (125, 15)), value=now))
+    widgets.add(Widget('outtemperature_chart', outtemperature_chart_x, outtemperature_chart_y, (117, 31), "#202020",
+                       layers=sparkline_layers('outtemperature', "#ff8066"), value=now))
+    widgets.add(Widget('pressure_chart', pressure_chart_x, pressure_chart_y, (117, 31), "#202020",
+                       layers=sparkline_layers('pressure', "#ffff00"), value=now))
+    widgets.add(Widget('pv_chart', pv_chart_x, pv_chart_y, (117, 31), "#202020",
+                       layers=pv_chart_layers, value=now))
+
+def queue_value(name, value, topic):
+    """Router handler (MQTT network thread): hand the parsed value to the GUI thread"""
+    mqtt_updates.put((name, value))
+
+def show_value(name, value):
+    """Record a parsed value and give it to its tile, drawn by the frame tick (GUI thread)"""
+    if not math.isfinite(value):
+        print(f"MQTT value {value} for {name} ignored")
         return
-    prev_staticiaq = mqtt_staticiaq
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (159, 159), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 158, 158), fill="#202020")
-    # Paste the icon onto the temporary image
-    if (mqtt_staticiaq != "---.-"):
-        if (float(mqtt_staticiaq) < 100.0):
-            icon = Image.open(os.path.join(script_dir, "Icons/IAQ_good.png")).convert("RGBA")
-        elif (float(mqtt_staticiaq) >= 100.0) and (float(mqtt_staticiaq) <= 200.0):
-            icon = Image.open(os.path.join(script_dir, "Icons/IAQ_medium.png")).convert("RGBA")
-        else:
-            icon = Image.open(os.path.join(script_dir, "Icons/IAQ_bad.png")).convert("RGBA")
-    else:
-        icon = Image.open(os.path.join(script_dir, "Icons/IAQ_good.png")).convert("RGBA")
-    temp_image.paste(icon, (17, 17), icon)
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('staticiaq')
-        canvas.create_image(staticiaq_x + 1, staticiaq_y + 1, anchor = NW, image = photo_image, tags=('staticiaq'))
-        # prevent garbage collection
-        canvas.staticiaq = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_pressure():
-    global script_dir
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (353, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 352, 30), fill="#202020")
-    # Paste the icon onto the temporary image
-    if (plist.length() == 18):
-        tend1 = calc_pressure_tendency(plist, 0, 6)
-        tend2 = calc_pressure_tendency(plist, 6, 12)
-        tend3 = calc_pressure_tendency(plist, 12, 18)
-        icon = get_pressure_tendency_icon(tend1, tend2, tend3)
-    else:
-        icon = Image.open(os.path.join(script_dir, "Icons/pressure_tendency_4.png")).convert("RGBA")
-    temp_image.paste(icon, (290, 1), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((4, 0), "Luftdruck: ", font=font, fill="#ffffff")
-    draw.text((130, 0), mqtt_pressure + " hPa", font=font, fill="#ffff00")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('pressure')
-        canvas.create_image(pressure_x + 1, pressure_y + 1, anchor = NW, image = photo_image, tags=('pressure'))
-        # prevent garbage collection
-        canvas.pressure = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_ppurchase():
-    global script_dir
-    global prev_ppurchase
-
-    # Only update if value has changed
-    if mqtt_ppurchase == prev_ppurchase:
-        return
-    prev_ppurchase = mqtt_ppurchase
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (159, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 158, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/P_purchase.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_ppurchase.split(".")[0] + " W", font=font, fill="#ff0000")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('ppurchase')
-        canvas.create_image(ppurchase_x + 1, ppurchase_y + 1, anchor = NW, image = photo_image, tags=('ppurchase'))
-        # prevent garbage collection
-        canvas.ppurchase = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_pfeed():
-    global script_dir
-    global prev_pfeed
-
-    # Only update if value has changed
-    if mqtt_pfeed == prev_pfeed:
-        return
-    prev_pfeed = mqtt_pfeed
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (159, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 158, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/P_feed.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_pfeed.split(".")[0] + " W", font=font, fill="#ffff00")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('pfeed')
-        canvas.create_image(pfeed_x + 1, pfeed_y + 1, anchor = NW, image = photo_image, tags=('pfeed'))
-        # prevent garbage collection
-        canvas.pfeed = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_pconsume():
-    global script_dir
-    global prev_pconsume
-
-    # Only update if value has changed
-    if mqtt_pconsume == prev_pconsume:
-        return
-    prev_pconsume = mqtt_pconsume
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (159, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 158, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/P_consume.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_pconsume.split(".")[0] + " W", font=font, fill="#ffffff")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('pconsume')
-        canvas.create_image(pconsume_x + 1, pconsume_y + 1, anchor = NW, image = photo_image, tags=('pconsume'))
-        # prevent garbage collection
-        canvas.ppconsume = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_pgenerate():
-    global script_dir
-    global prev_pgenerate
-
-    # Only update if value has changed
-    if mqtt_pgenerate == prev_pgenerate:
-        return
-    prev_pgenerate = mqtt_pgenerate
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (159, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 158, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/P_generate.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_pgenerate.split(".")[0] + " W", font=font, fill="#00ff00")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('pgenerate')
-        canvas.create_image(pgenerate_x + 1, pgenerate_y + 1, anchor = NW, image = photo_image, tags=('pgenerate'))
-        # prevent garbage collection
-        canvas.ppgenerate = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_pdischarge():
-    global script_dir
-    global prev_pdischarge
-
-    # Only update if value has changed
-    if mqtt_pdischarge == prev_pdischarge:
-        return
-    prev_pdischarge = mqtt_pdischarge
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (159, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 158, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/P_batdischarge.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_pdischarge.split(".")[0] + " W", font=font, fill="#8080ff")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('pdischarge')
-        canvas.create_image(pdischarge_x + 1, pdischarge_y + 1, anchor = NW, image = photo_image, tags=('pdischarge'))
-        # prevent garbage collection
-        canvas.ppdischarge = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_pcharge():
-    global script_dir
-    global prev_pcharge
-
-    # Only update if value has changed
-    if mqtt_pcharge == prev_pcharge:
-        return
-    prev_pcharge = mqtt_pcharge
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (159, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 158, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/P_batcharge.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_pcharge.split(".")[0] + " W", font=font, fill="#8080ff")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('pcharge')
-        canvas.create_image(pcharge_x + 1, pcharge_y + 1, anchor = NW, image = photo_image, tags=('pcharge'))
-        # prevent garbage collection
-        canvas.ppcharge = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_eabsorb():
-    global script_dir
-    global prev_eabsorb
-
-    # Only update if value has changed
-    if mqtt_eabsorb == prev_eabsorb:
-        return
-    prev_eabsorb = mqtt_eabsorb
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (191, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 190, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/E_absorb.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_eabsorb.split(".")[0] + " kWh", font=font, fill="#ff0000")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('eabsorb')
-        canvas.create_image(eabsorb_x + 1, eabsorb_y + 1, anchor = NW, image = photo_image, tags=('eabsorb'))
-        # prevent garbage collection
-        canvas.peabsorb = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_eyield():
-    global script_dir
-    global prev_eyield
-
-    # Only update if value has changed
-    if mqtt_eyield == prev_eyield:
-        return
-    prev_eyield = mqtt_eyield
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (191, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 190, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/E_yield.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_eyield.split(".")[0] + " kWh", font=font, fill="#ffff00")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('eyield')
-        canvas.create_image(eyield_x + 1, eyield_y + 1, anchor = NW, image = photo_image, tags=('eyield'))
-        # prevent garbage collection
-        canvas.peyield = photo_image
-    temp_image.close()  # Close PIL image
-
-def update_sbatcharge():
-    global script_dir
-    global prev_sbatcharge
-
-    # Only update if value has changed
-    if mqtt_sbatcharge == prev_sbatcharge:
-        return
-    prev_sbatcharge = mqtt_sbatcharge
-
-    # Create a temporary image to draw on
-    temp_image = Image.new("RGBA", (191, 31), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_image)
-    draw.rectangle((0, 0, 190, 30), fill="#303030")
-    # Paste the icon onto the temporary image
-    icon = Image.open(os.path.join(script_dir, "Icons/S_batcharge.png")).convert("RGBA")
-    temp_image.paste(icon, (0, 0), icon)
-    # Draw the text onto the temporary image
-    font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-    draw.text((36, 0), mqtt_sbatcharge + " %", font=font, fill="#8080ff")
-    # Convert to PhotoImage and display on canvas
-    photo_image = safe_create_photoimage(temp_image)
-    if photo_image:
-        canvas.delete('sbatcharge')
-        canvas.create_image(sbatcharge_x + 1, sbatcharge_y + 1, anchor = NW, image = photo_image, tags=('sbatcharge'))
-        # prevent garbage collection
-        canvas.psbatcharge = photo_image
-    temp_image.close()  # Close PIL image
+    now = time.time()
+    if history:
+        closed = history.append(name, value, now)
+        if ('5min' in closed) and (name in history_charts):
+            widgets.set(history_charts[name], now)
+    if (name == 'pressure'):
+        # The tendency icon is part of the value: the tile is only redrawn if text or icon change
+        pressure_tendency.append(value, now)
+        value = (value, pressure_tendency.icon())
+    widgets.set(name, value)
+
+def create_router():
+    """Route every MQTT topic to its tile, payloads are parsed once as float"""
+    global router
+    router = TopicRouter()
+    for topic, name in mqtt_topic_widgets:
+        router.add(topic, name, 'float', queue_value)
 
 def on_message(client, userdata, message):
-    global mqtt_intemperature
-    global mqtt_inhumidity
-    global mqtt_outtemperature
-    global mqtt_outhumidity
-    global mqtt_pressure
-    global mqtt_staticiaq
-    global mqtt_ppurchase
-    global mqtt_pfeed
-    global mqtt_pconsume
-    global mqtt_pgenerate
-    global mqtt_pdischarge
-    global mqtt_pcharge
-    global mqtt_eabsorb
-    global mqtt_eyield
-    global mqtt_sbatcharge
-
-    msg = str(message.payload.decode("utf-8"))
-    #print(f"MQTT message received - Topic: {message.topic}, Message: {msg}")
-    
-    def schedule_update(update_func):
-        """Schedule GUI update in main thread to prevent threading issues"""
-        try:
-            if window and hasattr(window, 'winfo_exists') and window.winfo_exists():
-                window.after(0, update_func)
-        except (RuntimeError, TclError):
-            pass
-    
-    if (message.topic == mqtt_topic_intemperature):
-        mqtt_intemperature = msg
-        schedule_update(update_intemperature)
-    if (message.topic == mqtt_topic_inhumidity):
-        mqtt_inhumidity = msg
-        schedule_update(update_inhumidity)
-    if (message.topic == mqtt_topic_outtemperature):
-        mqtt_outtemperature = msg
-        schedule_update(update_outtemperature)
-    if (message.topic == mqtt_topic_outhumidity):
-        mqtt_outhumidity = msg
-        schedule_update(update_outhumidity)
-    if (message.topic == mqtt_topic_pressure):
-        mqtt_pressure = msg
-        try:
-           plist.append(float(mqtt_pressure))
-        except:
-           print("Pressure value has wrong format.")
-        schedule_update(update_pressure)
-    if (message.topic == mqtt_topic_staticiaq):
-        mqtt_staticiaq = msg
-        schedule_update(update_staticiaq)
-    if (message.topic == mqtt_topic_ppurchase):
-        mqtt_ppurchase = msg
-        schedule_update(update_ppurchase)
-    if (message.topic == mqtt_topic_pfeed):
-        mqtt_pfeed = msg
-        schedule_update(update_pfeed)
-    if (message.topic == mqtt_topic_pconsume):
-        mqtt_pconsume = msg
-        schedule_update(update_pconsume)
-    if (message.topic == mqtt_topic_pgenerate):
-        mqtt_pgenerate = msg
-        schedule_update(update_pgenerate)
-    if (message.topic == mqtt_topic_pdischarge):
-        mqtt_pdischarge = msg
-        schedule_update(update_pdischarge)
-    if (message.topic == mqtt_topic_pcharge):
-        mqtt_pcharge = msg
-        schedule_update(update_pcharge)
-    if (message.topic == mqtt_topic_eabsorb):
-        mqtt_eabsorb = msg
-        schedule_update(update_eabsorb)
-    if (message.topic == mqtt_topic_eyield):
-        mqtt_eyield = msg
-        schedule_update(update_eyield)
-    if (message.topic == mqtt_topic_sbatcharge):
-        mqtt_sbatcharge = msg
-        schedule_update(update_sbatcharge)
+    #print(f"MQTT message received - Topic: {message.topic}, Message: {message.payload}")
+    router.dispatch(message.topic, message.payload)
 
 def on_connect(client, userdata, flags, reason_code, properties):
-    global mqtt_connected, mqtt_last_successful_time, mqtt_reconnect_count
+    global mqtt_connected
+    # Called in the MQTT network thread
     if reason_code.is_failure:
         print(f"MQTT connection failed with code {reason_code}")
         mqtt_connected = False
     else:
         print(f"MQTT connected successfully (rc={reason_code})")
         mqtt_connected = True
-        mqtt_last_successful_time = time.time()
-        mqtt_reconnect_count = 0  # Reset counter on successful connection
         # Subscribe to all topics
-        topics = [
-            mqtt_topic_intemperature, mqtt_topic_inhumidity,
-            mqtt_topic_outtemperature, mqtt_topic_outhumidity,
-            mqtt_topic_pressure, mqtt_topic_staticiaq,
-            mqtt_topic_ppurchase, mqtt_topic_pfeed,
-            mqtt_topic_pconsume, mqtt_topic_pgenerate,
-            mqtt_topic_pdischarge, mqtt_topic_pcharge,
-            mqtt_topic_eabsorb, mqtt_topic_eyield,
-            mqtt_topic_sbatcharge
-        ]
-        for topic in topics:
-            client.subscribe(topic)
-        print(f"Total: {len(topics)} MQTT topics subscription attempts completed")
+        topics = router.subscriptions()
+        client.subscribe(topics)  # One SUBSCRIBE packet for all topics
+        print(f"Total: {len(topics)} MQTT topics subscribed")
 
 def on_disconnect(client, userdata, disconnect_flags, reason_code, properties):
     global mqtt_connected, mqtt_reconnect_count
+    # Called in the MQTT network thread, which reconnects by itself with exponential backoff
     mqtt_connected = False
-    # Reset reconnection counter on disconnect to allow fresh attempts
     if reason_code != 0:
-        print(f"MQTT unexpected disconnection (rc={reason_code}) - resetting reconnection counter")
-        if reason_code == 5:  # MQTT_ERR_CONN_LOST - likely broker restart
-            print("Disconnection appears to be due to broker restart or network loss")
-        mqtt_reconnect_count = 0  # Reset counter for fresh attempts after unexpected disconnect
+        mqtt_reconnect_count += 1
+        print(f"MQTT unexpected disconnection (rc={reason_code}) - reconnecting in the background")
     else:
         print("MQTT disconnected normally")
 
+# Icons of the forecast service, each one as <name>.png and <name>-big.png
+WEATHER_ICONS = {
+    "clear-day", "clear-night", "cloudy", "fog", "hail",
+    "partly-cloudy-day", "partly-cloudy-day-rain", "partly-cloudy-day-snow",
+    "partly-cloudy-night", "partly-cloudy-night-rain", "partly-cloudy-night-snow",
+    "rain", "sleet", "snow", "thunderstorm", "wind",
+}
+
 def open_weather_icon(icon):
-    global script_dir
-
-    if (icon == "clear-day"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/clear-day.png")).convert("RGBA")
-    elif (icon == "clear-night"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/clear-night.png")).convert("RGBA")
-    elif (icon == "cloudy"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/cloudy.png")).convert("RGBA")
-    elif (icon == "fog"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/fog.png")).convert("RGBA")
-    elif (icon == "hail"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/hail.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-day"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-day.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-day-rain"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-day-rain.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-day-snow"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-day-snow.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-night"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-night.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-night-rain"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-night-rain.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-night-snow"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-night-snow.png")).convert("RGBA")
-    elif (icon == "rain"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/rain.png")).convert("RGBA")
-    elif (icon == "sleet"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/sleet.png")).convert("RGBA")
-    elif (icon == "snow"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/snow.png")).convert("RGBA")
-    elif (icon == "thunderstorm"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/thunderstorm.png")).convert("RGBA")
-    elif (icon == "wind"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/wind.png")).convert("RGBA")
-    else:
-        weather_icon = None
-    return weather_icon
+    return assets.icon(icon) if icon in WEATHER_ICONS else None
 
 def open_weather_icon_big(icon):
-    global script_dir
-
-    if (icon == "clear-day"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/clear-day-big.png")).convert("RGBA")
-    elif (icon == "clear-night"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/clear-night-big.png")).convert("RGBA")
-    elif (icon == "cloudy"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/cloudy-big.png")).convert("RGBA")
-    elif (icon == "fog"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/fog-big.png")).convert("RGBA")
-    elif (icon == "hail"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/hail-big.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-day"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-day-big.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-day-rain"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-day-rain-big.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-day-snow"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-day-snow-big.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-night"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-night-big.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-night-rain"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-night-rain-big.png")).convert("RGBA")
-    elif (icon == "partly-cloudy-night-snow"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/partly-cloudy-night-snow-big.png")).convert("RGBA")
-    elif (icon == "rain"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/rain-big.png")).convert("RGBA")
-    elif (icon == "sleet"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/sleet-big.png")).convert("RGBA")
-    elif (icon == "snow"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/snow-big.png")).convert("RGBA")
-    elif (icon == "thunderstorm"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/thunderstorm-big.png")).convert("RGBA")
-    elif (icon == "wind"):
-        weather_icon = Image.open(os.path.join(script_dir, "Icons/wind-big.png")).convert("RGBA")
-    else:
-        weather_icon = None
-    return weather_icon
+    return assets.icon(icon + "-big") if icon in WEATHER_ICONS else None
 
 def draw_weather(now_hour, first_hour, last_hour, start_pos, url):
-    global script_dir
-
     x = start_pos
     try:
+        import requests
         Response = requests.get(url)
         WeatherData = Response.json()
 
@@ -931,6 +421,7 @@ def draw_weather(now_hour, first_hour, last_hour, start_pos, url):
                 canvas.create_image(big_day_weather_x + 1, big_day_weather_y + 1, anchor = NW, image = photo_image, tags=('now_weather'))
                 # prevent garbage collection
                 canvas.now_weather = photo_image
+            save_snapshot('forecast_now', temp_image, {'saved': datetime.now().astimezone().isoformat()})
             temp_image.close()  # Close PIL image
 
         for h in range(first_hour, last_hour+1, 4):
@@ -954,8 +445,8 @@ def draw_weather(now_hour, first_hour, last_hour, start_pos, url):
             if icon:
                 temp_image.paste(icon, (0, 12), icon)
             # Draw the text onto the temporary image
-            font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
-            font2 = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 18)
+            font = assets.font(27)
+            font2 = assets.font(18)
             draw.text((66, 2), str(h) + ":00", font=font, fill="#ffffff")
             draw.text((66, 30), temperature + " °C", font=font2, fill="#ffff00")
             draw.text((66, 48), pressure + " hPa", font=font2, fill="#ffff00")
@@ -969,6 +460,7 @@ def draw_weather(now_hour, first_hour, last_hour, start_pos, url):
                 if not hasattr(canvas, 'dayhour_weather'):
                     canvas.dayhour_weather = {}
                 canvas.dayhour_weather[x] = photo_image
+            save_snapshot('forecast_' + str(x), temp_image, {'saved': datetime.now().astimezone().isoformat()})
             temp_image.close()  # Close PIL image
             x = x + 1
     except:
@@ -1043,17 +535,62 @@ def display_off():
         display_onoff = "OFF"
         os.system('vcgencmd display_power 0')
 
+def report_tick_jitter():
+    """Print statistics of the clock tick delay and start a new measurement period"""
+    global clock_tick_jitter
+    samples = sorted(clock_tick_jitter)
+    clock_tick_jitter = []
+    if not samples:
+        return
+    count = len(samples)
+    mode = "radar worker process" if radar_worker else "radar in GUI process"
+    print(f"Clock tick jitter ({mode}, {count} ticks): "
+          f"p50 {samples[count // 2]:.1f} ms, p95 {samples[int(count * 0.95)]:.1f} ms, "
+          f"p99 {samples[min(count - 1, int(count * 0.99))]:.1f} ms, max {samples[-1]:.1f} ms")
+    print(assets.report())
+    print(widgets.report())
+    if history:
+        print(history.report())
+    print(router.report() + f", {'connected' if mqtt_connected else 'disconnected'}, "
+          f"{mqtt_reconnect_count} connections lost")
+
+def update_widgets():
+    """Frame tick: draw the value tiles changed since the last tick, each at most once"""
+    # Values received by the MQTT network thread since the last tick
+    while True:
+        try:
+            name, value = mqtt_updates.get_nowait()
+        except queue.Empty:
+            break
+        show_value(name, value)
+    widgets.tick()
+
+    try:
+        if not shutdown_flag and window and hasattr(window, 'winfo_exists'):
+            if window.winfo_exists():
+                window.after(widget_frame_interval, update_widgets)
+    except (RuntimeError, TclError):
+        pass  # Main thread may no longer be in main loop
+
 def update_clock():
-    global script_dir
     global old_time
     global display_on_time
+    global clock_last_tick
+
+    # measure how late this tick fired compared to the requested interval
+    now = time.perf_counter()
+    if clock_last_tick is not None:
+        clock_tick_jitter.append((now - clock_last_tick) * 1000.0 - clock_tick_interval)
+    clock_last_tick = now
+    if len(clock_tick_jitter) >= 3000:  # report every ~5 min
+        report_tick_jitter()
 
     if GPIO.input(16):
         display_on_time = 3000  # keep display on for 5 minutes
 
     if (display_on_time > 0):
         display_on()
-        display_on_time = display_on_time - 1
+        display_on_time = display_on_time - clock_tick_interval // 100
     else:
         display_off()
 
@@ -1072,11 +609,11 @@ def update_clock():
         
         # Draw the text onto the temporary image
         # Main clock font
-        clock_font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 125)
-        date_font = ImageFont.truetype(os.path.join(script_dir, "arial.ttf"), 27)
+        clock_glyphs = assets.atlas(125)  # Digits pre-rendered once
+        date_font = assets.font(27)
         
         # Draw time (main clock)
-        draw.text((10, -10), loc_time, font=clock_font, fill="#ff8000")
+        clock_glyphs.draw_text(temp_image, (10, -10), loc_time, "#ff8000")
         # Draw date and week
         draw.text((10, 119), date_txt, font=date_font, fill="#ffffff")
         draw.text((160, 119), week_txt, font=date_font, fill="#ffff00")
@@ -1090,11 +627,37 @@ def update_clock():
             canvas.clock = photo_image
         temp_image.close()  # Close PIL image
     
-    # update every 100 msec
+    # update every 100 msec (slower when the governor throttles)
     try:
         if not shutdown_flag and window and hasattr(window, 'winfo_exists'):
             if window.winfo_exists():
-                window.after(100, update_clock)
+                window.after(clock_tick_interval, update_clock)
+    except (RuntimeError, TclError):
+        pass  # Main thread may no longer be in main loop
+
+def update_governor():
+    """Adapt radar preset and polling intervals to SoC temperature and system load"""
+    global clock_tick_interval, widget_frame_interval
+    timings = radar.stage_timings if radar else radar_stage_timings
+    settings = governor.update(timings)
+    if settings['changed']:
+        temperature = settings['temperature']
+        print(f"Governor level {settings['level']}: preset {settings['preset']}, "
+              f"tick {settings['tick_interval']} ms, tiles {settings['mqtt_poll_interval']} ms "
+              f"(temperature {temperature if temperature is not None else '--'} C, load {settings['load']})")
+        if radar:
+            radar.set_render_preset(settings['preset'])
+        if radar_worker:
+            radar_worker.set_render_preset(settings['preset'])
+    clock_tick_interval = settings['tick_interval']
+    # The governor's MQTT interval throttles the value tiles, MQTT itself is not polled
+    widget_frame_interval = max(int(1000 / widget_frame_rate), settings['mqtt_poll_interval'])
+
+    # check every 30 sec
+    try:
+        if not shutdown_flag and window and hasattr(window, 'winfo_exists'):
+            if window.winfo_exists():
+                window.after(30000, update_governor)
     except (RuntimeError, TclError):
         pass  # Main thread may no longer be in main loop
 
@@ -1104,6 +667,7 @@ def update_mqtt_data():
     global dwd_outhumidity
     today = time.strftime('%Y-%m-%d')
     try:
+        import requests
         Response = requests.get("https://api.brightsky.dev/weather?lat=" + latitude + "&lon=" + longitude + "&date=" + today + "&tz=" +timezone)
         WeatherData = Response.json()
         dwd_pressure = str(WeatherData["weather"][int(time.strftime('%H'))]["pressure_msl"])
@@ -1111,21 +675,6 @@ def update_mqtt_data():
         dwd_outhumidity = str(WeatherData["weather"][int(time.strftime('%H'))]["relative_humidity"])
     except:
         print("Couldn't load weather data.")
-    update_intemperature()
-    update_inhumidity()
-    update_outtemperature()
-    update_outhumidity()
-    update_pressure()
-    update_staticiaq()
-    update_ppurchase()
-    update_pfeed()
-    update_pconsume()
-    update_pgenerate()
-    update_pdischarge()
-    update_pcharge()
-    update_eabsorb()
-    update_eyield()
-    update_sbatcharge()
 
     # update every 1 min
     try:
@@ -1135,26 +684,68 @@ def update_mqtt_data():
     except (RuntimeError, TclError):
         pass  # Main thread may no longer be in main loop
 
-def update_weathermap_in_gui():
+def update_weathermap_in_gui(frame=None):
     global window
     global canvas
-    """Update the displayed image in the GUI (thread-safe)"""
+    """Update the displayed image in the GUI (thread-safe)
+
+    frame: finished frame from the radar worker process, None = render with the local radar
+    """
     try:
         # Ensure we're in the main thread
         if threading.current_thread() != threading.main_thread():
             print("Warning: Weather map update attempted from background thread")
             return
             
-        new_pil_image = radar.create_smooth_heatmap_grid(sigma=1.5)
+        if frame is None and radar.scaled_data is None:
+            return  # Nothing loaded yet - keep the map (or snapshot) on screen
+
+        if frame is None:
+            new_pil_image = radar.create_smooth_heatmap_grid(sigma=1.5)
+            dirty_rects = radar.get_dirty_rects()
+            data_time = radar.data_time
+            analysis = radar.get_analysis() if radar_server else None
+        else:
+            new_pil_image = frame['image']
+            dirty_rects = frame['dirty_rects']
+            data_time = frame['data_time']
+            analysis = frame['analysis']
+
+        # A snapshot of the last run is shown - replace all of it, not only the changed regions
+        if getattr(window, 'snapshot_shown', False):
+            dirty_rects = None
+            window.snapshot_shown = False
+        # Only a real radar frame replaces the snapshot of the last run
+        if snapshot_dir and dirty_rects != [] and data_time is not None:
+            save_snapshot('radar', new_pil_image,
+                          {'data_time': data_time.isoformat()})
+
+        # Same size as the displayed map - only copy the changed regions into the existing Tk image
+        old_photo = getattr(window, 'photo', None)
+        if (dirty_rects is not None and old_photo is not None
+                and (old_photo.width(), old_photo.height()) == new_pil_image.size):
+            for (x0, y0, x1, y1) in dirty_rects:
+                region_photo = safe_create_photoimage(new_pil_image.crop((x0, y0, x1, y1)))
+                if region_photo:
+                    window.tk.call(str(old_photo), 'copy', str(region_photo),
+                                   '-to', x0, y0, '-compositingrule', 'set')
+            if radar_server and dirty_rects:
+                radar_server.publish_frame(new_pil_image, data_time, analysis)
+            return
+
         photo = safe_create_photoimage(new_pil_image)
         
         if photo:
             canvas.delete('weather_map')
             canvas.create_image(0, 0, anchor = NW, image = photo, tags=('weather_map'))
 
-            # Store references to prevent garbage collection
+            # Keep the PhotoImage referenced - the PIL image is not kept, in worker mode it is
+            # a view on the shared-memory buffer the worker renders the next frame into
             window.photo = photo
-            window.current_pil_image = new_pil_image
+
+            # Share the new frame with other displays (encoded once per frame)
+            if radar_server:
+                radar_server.publish_frame(new_pil_image, data_time, analysis)
         else:
             new_pil_image.close()  # Close if PhotoImage creation failed
     except Exception as e:
@@ -1162,20 +753,28 @@ def update_weathermap_in_gui():
 
 def cleanup_and_exit():
     """Cleanup function to gracefully shutdown the application"""
-    global shutdown_flag, client, window, canvas, radar
+    global shutdown_flag, client, window, canvas, radar, radar_server, radar_worker, history
     
     print("Cleaning up...")
     shutdown_flag = True
     
-    # Stop MQTT client properly for manual polling mode
+    # Stop the MQTT client and its network thread
     try:
         if 'client' in globals() and client:
-            client.disconnect()  # Just disconnect, no loop_stop needed for manual polling
-            time.sleep(0.1)  # Give it time to disconnect
+            client.disconnect()
+            client.loop_stop()  # Network thread ends after sending DISCONNECT
             client = None
     except:
         pass
     
+    # Write the open pages of the value history
+    try:
+        if history:
+            history.close()
+            history = None
+    except:
+        pass
+    
     # Stop all window timers by destroying window immediately
     try:
         if window:
@@ -1184,9 +783,27 @@ def cleanup_and_exit():
     except:
         pass
     
-    # Clear radar processor
+    # Stop radar HTTP service
+    try:
+        if radar_server:
+            radar_server.stop()
+            radar_server = None
+    except:
+        pass
+    
+    # Stop radar worker process and release its shared memory
+    try:
+        if radar_worker:
+            radar_worker.stop()
+            radar_worker = None
+    except:
+        pass
+    
+    # Clear radar processor (stops the archive compaction thread)
     try:
         if radar:
+            if radar.archive:
+                radar.archive.close()
             radar = None
     except:
         pass
@@ -1247,6 +864,86 @@ def safe_create_photoimage(pil_image):
         print(f"Error creating PhotoImage: {e}")
         return None
 
+def save_snapshot(name, pil_image, info):
+    """Save an image shown on screen plus its JSON info to snapshot_dir (written by a background thread)"""
+    if not snapshot_dir:
+        return
+    image = pil_image.convert('RGB')  # Private copy - the caller may close or reuse its image
+
+    def write():
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            path = os.path.join(snapshot_dir, name)
+            # Write to temporary files and rename, a power cut never leaves a half written snapshot
+            image.save(path + '.png.tmp', format='PNG', compress_level=1)
+            with open(path + '.json.tmp', 'w') as f:
+                json.dump(info, f)
+            os.replace(path + '.png.tmp', path + '.png')
+            os.replace(path + '.json.tmp', path + '.json')
+        except OSError as e:
+            print(f"Could not save snapshot {name}: {e}")
+        finally:
+            image.close()
+
+    threading.Thread(target=write, name='SnapshotWriter', daemon=True).start()
+
+def load_snapshot(name):
+    """Return (PIL image, info dict) of a saved snapshot, or (None, None)"""
+    path = os.path.join(snapshot_dir, name)
+    try:
+        with open(path + '.json') as f:
+            info = json.load(f)
+        image = Image.open(path + '.png')
+        image.load()
+        return image, info
+    except (OSError, ValueError):
+        return None, None  # No snapshot yet (first start) or unreadable
+
+def draw_stale_label(image, since, font_size):
+    """Draw a "stale since" label into the lower left corner of a snapshot image"""
+    text = "stale since " + datetime.fromisoformat(since).astimezone().strftime('%d.%m. %H:%M')
+    font = assets.font(font_size)
+    draw = ImageDraw.Draw(image)
+    x0, y0, x1, y1 = draw.textbbox((0, 0), text, font=font)
+    height = image.height
+    draw.rectangle((0, height - (y1 - y0) - 10, x1 - x0 + 10, height), fill="#000000")
+    draw.text((5 - x0, height - (y1 - y0) - 5 - y0), text, font=font, fill="#ff8000")
+
+def show_snapshot():
+    """Show the radar image and forecast of the last run until live data arrives"""
+    if not snapshot_dir:
+        return
+    image, info = load_snapshot('radar')
+    if image is not None:
+        image = image.convert('RGB')
+        if info.get('data_time'):
+            draw_stale_label(image, info['data_time'], 18)
+        photo = safe_create_photoimage(image)
+        if photo:
+            canvas.delete('weather_map')
+            canvas.create_image(0, 0, anchor = NW, image = photo, tags=('weather_map'))
+            window.photo = photo
+            window.snapshot_shown = True  # First live frame must replace the whole image
+
+    image, info = load_snapshot('forecast_now')
+    if image is not None:
+        draw_stale_label(image, info['saved'], 14)
+        photo_image = safe_create_photoimage(image)
+        if photo_image:
+            canvas.create_image(big_day_weather_x + 1, big_day_weather_y + 1, anchor = NW, image = photo_image, tags=('now_weather'))
+            canvas.now_weather = photo_image
+        image.close()
+    canvas.dayhour_weather = {}
+    for x in range(6):
+        image, info = load_snapshot('forecast_' + str(x))
+        if image is None:
+            continue
+        photo_image = safe_create_photoimage(image)
+        if photo_image:
+            canvas.create_image(day_weather_x + x * 170 + 1, day_weather_y + 1, anchor = NW, image = photo_image, tags=('day_weather' + str(x)))
+            canvas.dayhour_weather[x] = photo_image
+        image.close()
+
 def on_window_close():
     """Handle window close event"""
     cleanup_and_exit()
@@ -1254,56 +951,71 @@ def on_window_close():
 def main():
    global window
    global canvas
-   global plist
+   global pressure_tendency
    global radar
+   global radar_server
+   global radar_worker
+   global governor
    global client
    global script_dir
+   global assets
+   global history
 
    # Register cleanup function to ensure it runs on exit
    atexit.register(cleanup_and_exit)
 
    script_dir = os.path.dirname(os.path.realpath(__file__))
 
+   # Every font size and icon used by the widgets, parsed/decoded once
+   assets = AssetCache(script_dir)
+   assets.preload(font_sizes=(14, 18, 27, 125), atlas_sizes=(125,))
+
    GPIO.setmode(GPIO.BCM)
    GPIO.setwarnings(False)
    GPIO.setup(16, GPIO.IN)
 
-   # Create radar processor
-   radar = RadarProcessor(
-        satellite_source=radar_background,
-        zoom_level=zoom,
-        center_lon=float(longitude),
-        center_lat=float(latitude),
-        image_width_pixels=512,
-        image_height_pixels=512,
-        cities={
-                    'Heimsheim': (8.863, 48.808, 'red'),
-                    'Leonberg': (9.014, 48.798, 'green'),
-                    'Rutesheim': (8.947, 48.808, 'green'),
-                    'Renningen': (8.934, 48.765, 'green'),
-                    'Weissach': (8.929, 48.847, 'green'),
-                    'Friolzheim': (8.835, 48.836, 'green'),
-                    'Wiernsheim': (8.851, 48.891, 'green'),
-                    'Liebenzell': (8.732, 48.771, 'green'),
-                    'Calw': (8.739, 48.715, 'green'),
-                    'Weil der Stadt': (8.871, 48.750, 'green'),
-                    'Böblingen': (9.011, 48.686, 'green'),
-                    'Hochdorf': (9.002, 48.886, 'green'),
-                    'Pforzheim': (8.704, 48.891, 'green'),
-                    'Sindelfingen': (9.005, 48.709, 'green'),
-               }
-        )
-
    window = Tk()
    canvas = Canvas(window, width = 1024, height = 600, bd = 0, highlightthickness = 0)
    canvas.pack()
    canvas.create_rectangle(0, 0, 1023, 599, fill='black')
 
-   plist = circularlist(18)
+   pressure_tendency = PressureTendency(threshold=pressure_tendency_threshold)
+   create_widgets()
+   create_router()
 
-   # Generate initial image
-   radar.load_and_process_data(use_local=False)
-   update_weathermap_in_gui()
+   # Show the clock and the last radar image/forecast first - nothing heavy has been imported yet
+   update_clock()
+   update_widgets()
+   show_snapshot()
+   window.update()
+
+   # The value history (NumPy) is opened after the first paint, before MQTT starts
+   if history_dir:
+       from SensorHistory import SensorHistory
+       history = SensorHistory(history_dir)
+       # The tendency continues where the last run stopped
+       samples = history.query('pressure', time.time() - 3 * 3600, tier='raw')
+       for when, pressure in zip(samples['time'].tolist(), samples['value'].tolist()):
+           pressure_tendency.append(pressure, when)
+       widgets.set('pressure', (None, pressure_tendency.icon()))
+       # The charts were drawn empty, the next frame tick fills them
+       now = time.time()
+       for chart in set(history_charts.values()):
+           widgets.set(chart, now)
+
+   # Take finished frames from the radar worker process (it downloads and renders by itself)
+   def poll_radar_worker():
+       if not shutdown_flag:
+           try:
+               frame = radar_worker.poll()
+               if frame:
+                   radar_stage_timings.update(frame['stage_timings'])
+                   update_weathermap_in_gui(frame)
+               
+               if window and hasattr(window, 'winfo_exists') and window.winfo_exists():
+                   window.after(500, poll_radar_worker)
+           except Exception as e:
+               print(f"Radar worker poll error: {e}")
 
    # Add periodic radar check in main thread instead of relying on background thread
    def check_radar_update():
@@ -1313,19 +1025,96 @@ def main():
                if has_new_data:
                    # Load data in background but update GUI in main thread
                    if radar.load_and_process_data(use_local=False, server_modified=server_modified):
-                       update_weathermap_in_gui()
+                       # Republished but identical data needs no new render
+                       if not radar.last_load_skipped:
+                           update_weathermap_in_gui()
                
                if window and hasattr(window, 'winfo_exists') and window.winfo_exists():
                    window.after(60000, check_radar_update)  # Check every minute
            except Exception as e:
                print(f"Radar check error: {e}")
    
-   # Start radar checking in main thread
-   window.after(5000, check_radar_update)  # Start after 5 seconds
-
-   update_clock()
-   update_day_weather()
-   update_mqtt_data()
+   def start_radar():
+       """Import and start the radar - deferred so the window appears before numpy/h5py/matplotlib load"""
+       global radar, radar_server, radar_worker
+       from RadarProcessor import RadarProcessor
+       from RadarServer import RadarServer
+       from RadarWorker import RadarWorker
+
+       # Create radar processor (in this process or in the radar worker process)
+       radar_config = dict(
+            satellite_source=radar_background,
+            zoom_level=zoom,
+            center_lon=float(longitude),
+            center_lat=float(latitude),
+            image_width_pixels=512,
+            image_height_pixels=512,
+            render_preset=radar_render_preset,
+            archive_dir=radar_archive_dir or None,
+            cities={
+                        'Heimsheim': (8.863, 48.808, 'red'),
+                        'Leonberg': (9.014, 48.798, 'green'),
+                        'Rutesheim': (8.947, 48.808, 'green'),
+                        'Renningen': (8.934, 48.765, 'green'),
+                        'Weissach': (8.929, 48.847, 'green'),
+                        'Friolzheim': (8.835, 48.836, 'green'),
+                        'Wiernsheim': (8.851, 48.891, 'green'),
+                        'Liebenzell': (8.732, 48.771, 'green'),
+                        'Calw': (8.739, 48.715, 'green'),
+                        'Weil der Stadt': (8.871, 48.750, 'green'),
+                        'Böblingen': (9.011, 48.686, 'green'),
+                        'Hochdorf': (9.002, 48.886, 'green'),
+                        'Pforzheim': (8.704, 48.891, 'green'),
+                        'Sindelfingen': (9.005, 48.709, 'green'),
+                   }
+            )
+       if radar_worker_process:
+           radar_worker = RadarWorker(radar_config, sigma=1.5)
+           radar_worker.start()
+       else:
+           radar = RadarProcessor(**radar_config)
+
+       if radar_server_port:
+           # /tiles needs the decoded radar in this process (not available in worker mode)
+           radar_server = RadarServer(port=radar_server_port, radar=radar)
+           radar_server.start()
+
+       if radar_worker:
+           window.after(500, poll_radar_worker)
+       else:
+           # Download the first composite on a thread, the clock keeps ticking meanwhile
+           initial_load = {}
+
+           def load_first_frame():
+               initial_load['loaded'] = radar.load_and_process_data(use_local=False)
+
+           loader = threading.Thread(target=load_first_frame, name='RadarInitialLoad', daemon=True)
+           loader.start()
+
+           def finish_initial_load():
+               if shutdown_flag:
+                   return
+               if loader.is_alive():
+                   window.after(200, finish_initial_load)
+                   return
+               # A failed download keeps the snapshot of the last run on screen
+               if initial_load.get('loaded'):
+                   update_weathermap_in_gui()
+               # Start radar checking in main thread
+               window.after(5000, check_radar_update)  # Start after 5 seconds
+
+           window.after(200, finish_initial_load)
+
+   if governor_enabled:
+       governor = RenderGovernor(tick_interval_bounds=governor_tick_bounds,
+                                 mqtt_poll_bounds=governor_mqtt_poll_bounds,
+                                 base_preset=radar_render_preset)
+       update_governor()
+
+   # Network requests and the radar start from the event loop, after the first paint
+   window.after(100, update_mqtt_data)
+   window.after(200, update_day_weather)
+   window.after(500, start_radar)
    
    # Set up window close protocol
    window.protocol("WM_DELETE_WINDOW", on_window_close)
@@ -1340,211 +1129,14 @@ def main():
    client.max_inflight_messages_set(20)
    client.max_queued_messages_set(0)  # No limit on queued messages
    
-   try:
-      client.connect(mqtt_broker_address, mqtt_port, keepalive=60)  # Longer keepalive
-      print("MQTT connection initiated...")
-   except Exception as e:
-      print(f"MQTT connection failed: {e}")
-   
-   # Use timer-based MQTT polling in main thread to avoid threading issues
-   def mqtt_poll():
-       global mqtt_poll_count, mqtt_last_poll_time, mqtt_connected, mqtt_reconnect_count
-       global mqtt_last_successful_time, mqtt_connection_stale_threshold
-       
-       if shutdown_flag:
-           print("MQTT polling stopped due to shutdown flag")
-           return
-           
-       current_time = time.time()
-       mqtt_poll_count += 1
-       mqtt_last_poll_time = current_time
-       
-       # Check for stale connections (possible system resume scenario)
-       connection_age = current_time - mqtt_last_successful_time
-       is_connection_stale = mqtt_connected and connection_age > mqtt_connection_stale_threshold
-       
-       if is_connection_stale:
-           print(f"MQTT connection appears stale ({connection_age:.1f}s since last success) - forcing reconnect")
-           mqtt_connected = False
-           mqtt_reconnect_count = 0  # Reset for fresh attempts
-           try:
-               client.disconnect()
-               time.sleep(1.0)  # Wait for clean disconnect
-               print("Initiating fresh MQTT connection after stale detection...")
-               client.connect(mqtt_broker_address, mqtt_port, keepalive=60)
-               mqtt_reconnect_count = 1
-               print("MQTT reconnection initiated after stale connection detection")
-           except Exception as e:
-               print(f"MQTT reconnection after stale detection failed: {e}")
-               mqtt_reconnect_count += 1
-       
-       # Debug output every 100 polls (about every 10 seconds)
-       #if mqtt_poll_count % 100 == 1:
-       #    status = "Connected" if mqtt_connected else "Disconnected"
-       #    print(f"MQTT poll #{mqtt_poll_count} - Status: {status}, Reconnects: {mqtt_reconnect_count}")
-       
-       poll_success = True  # Assume success unless we encounter an error
-       schedule_next = True  # Always schedule next poll unless explicitly disabled
-       
-       try:
-           # Poll for MQTT messages with error detection
-           result = client.loop(timeout=0.01)  # Short timeout to prevent blocking
-           
-           if result == mqtt.MQTT_ERR_SUCCESS:
-               poll_success = True
-               if mqtt_connected:
-                   mqtt_last_successful_time = current_time  # Update successful activity time
-           elif result == mqtt.MQTT_ERR_NO_CONN:  # Error code 7
-               if not shutdown_flag and mqtt_reconnect_count < 15:  # Increased limit for resume scenarios
-                   print(f"MQTT no connection (error {result}) - attempting reconnect #{mqtt_reconnect_count + 1}...")
-                   try:
-                       # Force a clean disconnect first
-                       try:
-                           client.disconnect()
-                       except:
-                           pass  # Ignore disconnect errors
-                       
-                       # Progressive delay based on attempt count
-                       delay = min(3.0, 1.0 + (mqtt_reconnect_count * 0.5))
-                       time.sleep(delay)
-                       
-                       # Fresh connection attempt
-                       client.connect(mqtt_broker_address, mqtt_port, keepalive=60)
-                       mqtt_reconnect_count += 1
-                       print(f"MQTT reconnection attempt #{mqtt_reconnect_count} initiated (delay: {delay:.1f}s)")
-                       
-                       # After reconnection attempt, wait longer before next poll to allow connection to establish
-                       poll_success = False
-                       # Force longer interval for next poll after reconnection attempt
-                       if not shutdown_flag and window and hasattr(window, 'winfo_exists'):
-                           if window.winfo_exists():
-                               window.after(3000, mqtt_poll)  # Wait 3 seconds before next poll
-                               return  # Exit early to prevent normal scheduling
-                       
-                   except Exception as reconnect_error:
-                       print(f"MQTT reconnection failed: {reconnect_error}")
-                       mqtt_reconnect_count += 1
-                   poll_success = False
-               else:
-                   print(f"Maximum MQTT reconnection attempts reached ({mqtt_reconnect_count}), backing off...")
-                   poll_success = False
-           elif result == mqtt.MQTT_ERR_CONN_LOST:  # Error code 5 - broker restart/network loss
-               print(f"MQTT connection lost (error {result}) - broker restart or network issue detected")
-               mqtt_connected = False
-               if not shutdown_flag and mqtt_reconnect_count < 20:  # More attempts for broker restarts
-                   print(f"Attempting to reconnect after connection lost #{mqtt_reconnect_count + 1}...")
-                   try:
-                       try:
-                           client.disconnect()
-                       except:
-                           pass
-                       
-                       # Longer delay for broker restarts as they may take time to fully start
-                       delay = min(5.0, 2.0 + (mqtt_reconnect_count * 0.5))
-                       time.sleep(delay)
-                       
-                       client.connect(mqtt_broker_address, mqtt_port, keepalive=60)
-                       mqtt_reconnect_count += 1
-                       print(f"MQTT reconnection attempt #{mqtt_reconnect_count} after connection lost (delay: {delay:.1f}s)")
-                       
-                       # Wait longer for broker restart scenarios
-                       if not shutdown_flag and window and hasattr(window, 'winfo_exists'):
-                           if window.winfo_exists():
-                               window.after(5000, mqtt_poll)  # Wait 5 seconds for broker restarts
-                               return
-                       
-                   except Exception as reconnect_error:
-                       print(f"MQTT reconnection after connection lost failed: {reconnect_error}")
-                       mqtt_reconnect_count += 1
-               poll_success = False
-           else:
-               print(f"MQTT loop error code: {result}")
-               poll_success = False
-                       
-       except Exception as e:
-           print(f"MQTT poll exception: {e}")
-           poll_success = False
-           # Try to reconnect on exception with backoff
-           try:
-               if not shutdown_flag and mqtt_reconnect_count < 8:
-                   print("Attempting MQTT reconnection due to exception...")
-                   try:
-                       client.disconnect()
-                   except:
-                       pass
-                   time.sleep(1.5)  # Longer wait on exception
-                   client.connect(mqtt_broker_address, mqtt_port, keepalive=60)
-                   mqtt_reconnect_count += 1
-                   print(f"MQTT reconnection attempt #{mqtt_reconnect_count} initiated after exception")
-           except Exception as reconnect_error:
-               print(f"MQTT reconnection failed: {reconnect_error}")
-               mqtt_reconnect_count += 1
-       
-       # ALWAYS schedule next poll if not shutting down - this is critical
-       if not shutdown_flag and schedule_next:
-           try:
-               if window and hasattr(window, 'winfo_exists'):
-                   if window.winfo_exists():
-                       # Use appropriate intervals based on connection status and reconnection count
-                       if mqtt_connected and poll_success:
-                           interval = 100  # 100ms when connected and working
-                       elif mqtt_connected:
-                           interval = 500  # 500ms when connected but having issues
-                       elif mqtt_reconnect_count < 5:
-                           interval = 2000  # 2s when disconnected, trying to reconnect
-                       else:
-                           interval = 10000  # 10s when many reconnection failures (backoff)
-                       
-                       window.after(interval, mqtt_poll)
-                   else:
-                       print("Window no longer exists, stopping MQTT polling")
-                       schedule_next = False
-               else:
-                   print("Window object invalid, stopping MQTT polling")
-                   schedule_next = False
-           except Exception as schedule_error:
-               print(f"Failed to schedule next MQTT poll: {schedule_error}")
-               # Even if scheduling failed, try again in a moment
-               if not shutdown_flag:
-                   try:
-                       window.after(5000, mqtt_poll)  # Retry in 5 seconds
-                   except:
-                       print("Could not schedule retry poll")
-       
-       return poll_success
-   
-   # Add a watchdog function to monitor MQTT polling
-   def mqtt_watchdog():
-       global mqtt_last_poll_time, mqtt_connected, mqtt_reconnect_count
-       if not shutdown_flag:
-           current_time = time.time()
-           if mqtt_last_poll_time > 0:
-               time_since_poll = current_time - mqtt_last_poll_time
-               if time_since_poll > 3:  # Reduced from 5 to 3 seconds for faster detection
-                   print(f"MQTT polling appears stuck. Last poll: {time_since_poll:.1f}s ago")
-                   print(f"Status: Connected={mqtt_connected}, Polls={mqtt_poll_count}, Reconnects={mqtt_reconnect_count}")
-                   # Force restart polling immediately
-                   try:
-                       print("Force restarting MQTT polling...")
-                       window.after(0, mqtt_poll)  # Schedule immediately
-                   except Exception as e:
-                       print(f"Failed to restart MQTT polling: {e}")
-               elif mqtt_poll_count % 200 == 0:  # Status report every ~20 seconds (200 polls * 100ms)
-                   status = "Connected" if mqtt_connected else "Disconnected"
-                   print(f"MQTT Status: {status}, Polls: {mqtt_poll_count}, Reconnects: {mqtt_reconnect_count}")
-           
-           # Schedule next watchdog check more frequently
-           if window and hasattr(window, 'winfo_exists'):
-               try:
-                   if window.winfo_exists():
-                       window.after(5000, mqtt_watchdog)  # Check every 5 seconds (reduced from 30)
-               except:
-                   pass
-   
-   # Start MQTT polling in main thread
-   print("Starting MQTT polling system...")
-   window.after(500, mqtt_poll)  # Start polling after 500ms
-   window.after(10000, mqtt_watchdog)  # Start watchdog after 10 seconds
+   # Reconnects wait 1, 2, 4 ... 60 s - in the network thread, the GUI never blocks on MQTT
+   client.reconnect_delay_set(min_delay=1, max_delay=60)
+
+   # The network thread connects (and retries a failed first connection) by itself;
+   # messages are parsed there and handed to the frame tick through mqtt_updates
+   print("Starting MQTT network thread...")
+   client.connect_async(mqtt_broker_address, mqtt_port, keepalive=60)
+   client.loop_start()
 
    window.geometry("1024x600+0+0")
    window.overrideredirect(True)